@@ -38,27 +38,142 @@
 #    return video.subclipped(start_time, start_time+video_length)
 #
 
+import os
+import subprocess
+import tempfile
+
 from moviepy import VideoFileClip
 import pandas as pd
 
-def make_cuts_video(video_path, start_time, video_length):
-    clip = VideoFileClip(video_path).subclipped(start_time, start_time + video_length)
-    output_path = video_path.replace(".mp4", f"_cut_{start_time}s_{video_length}s.mp4")
-    clip.write_videofile(output_path, codec='libx264')
+import sensorstore
+import videoindex
+
+# Per source codec: encoder of the partial GOPs at the cut edges, its option to repeat the parameter sets
+# on every keyframe and the filter that puts them in-band on copied packets (parts with different
+# encoder settings can then be joined without re-encoding)
+EDGE_CODECS = {
+    'h264': {'encoder': 'libx264', 'params': '-x264-params', 'bsf': 'h264_mp4toannexb'},
+    'hevc': {'encoder': 'libx265', 'params': '-x265-params', 'bsf': 'hevc_mp4toannexb'},
+}
+
+CUT_MODES = ['auto', 'copy', 'smart', 'reencode']
+
+def make_cuts_video(video_path, start_time, video_length, output_path=None, mode='auto'):
+    """
+    Cuts the video between 'start_time' and 'start_time + video_length' (seconds) and saves it on 'output_path'.
+
+    modes:
+
+    'copy' -> packets are copied without decoding, from the keyframe at/before the start up to the keyframe
+              at/after the end (lossless, but may keep some extra frames on the edges);
+    'smart' -> only the frames between the cut points and the nearest keyframes inside the cut are re-encoded,
+               the whole GOPs in between are copied (frame accurate, lossless except on the edges);
+    'reencode' -> decodes and re-encodes the whole clip with MoviePy;
+    'auto' -> 'copy' when both cut points fall on keyframes, else 'smart' (or 'reencode' when there
+              is no edge encoder for the codec)
+    """
+    if mode not in CUT_MODES:
+        raise ValueError(f"Modo de corte inválido: {mode} (use um de {CUT_MODES})")
+    if output_path is None:
+        output_path = video_path.replace(".mp4", f"_cut_{start_time}s_{video_length}s.mp4")
+
+    if mode != 'reencode':
+        index = videoindex.load_frame_index(video_path)
+        first = int(index.frame_from(start_time))
+        end = int(index.frame_from(start_time + video_length))
+        if first >= end:
+            raise ValueError(f"O corte de {video_length}s a partir de {start_time}s não contém nenhum frame")
+        aligned = index.keyframes[first] and (end == len(index) or index.keyframes[end])
+        codec, pix_fmt = videoindex.probe_video(video_path)
+
+        if mode == 'auto':
+            mode = 'copy' if aligned else 'smart' if codec in EDGE_CODECS else 'reencode'
+        if mode == 'copy':
+            first = int(index.keyframe_before(first))
+            end = int(index.keyframe_after(end))
+            segments = [(first, end, False)]
+        elif mode == 'smart':
+            if codec not in EDGE_CODECS:
+                raise ValueError(f"Corte inteligente não suportado para o codec {codec}")
+            segments = gop_segments(index, first, end)
+
+    if mode == 'reencode':
+        clip = VideoFileClip(video_path).subclipped(start_time, start_time + video_length)
+        clip.write_videofile(output_path, codec='libx264')
+        clip.close()
+        return output_path
+
+    with tempfile.TemporaryDirectory() as tmp:
+        parts = []
+        for i, (seg_start, seg_end, encode) in enumerate(segments):
+            part_path = os.path.join(tmp, f'part_{i}.mkv')
+            cut_segment(video_path, index, seg_start, seg_end, part_path, EDGE_CODECS.get(codec), pix_fmt, encode)
+            parts.append((part_path, segment_end_time(index, seg_end) - float(index.time_of(seg_start))))
+        concat_segments(video_path, parts, output_path, float(index.time_of(first)), segment_end_time(index, end))
     return output_path
 
+def gop_segments(index, first, end):
+    """
+    Splits frames [first, end) on (start, end, encode) segments: the partial GOPs on the edges are
+    re-encoded, the whole GOPs between them are copied
+    """
+    copy_start = int(index.keyframe_after(first))
+    copy_end = int(index.keyframe_before(end)) if end < len(index) else end
+    if copy_start >= copy_end:
+        return [(first, end, True)]
+    segments = [(first, copy_start, True), (copy_start, copy_end, False), (copy_end, end, True)]
+    return [segment for segment in segments if segment[0] < segment[1]]
+
+def segment_end_time(index, end):
+    return index.duration if end >= len(index) else float(index.time_of(end))
+
+def run_ffmpeg(*args):
+    subprocess.run([videoindex.ffmpeg_exe(), '-hide_banner', '-loglevel', 'error', '-y', *args],
+                   capture_output=True, text=True, check=True)
+
+def cut_segment(video_path, index, start, end, part_path, codec=None, pix_fmt=None, encode=False):
+    """
+    Writes frames [start, end) of the first video stream to a Matroska part, copying the packets
+    ('start' must be a keyframe) or re-encoding them ('encode') with the settings of EDGE_CODECS 'codec'
+    """
+    n_frames = str(end - start)
+    if not encode:
+        # Input seeking lands on the last keyframe before the target: aim just after 'start' so it is
+        # that keyframe, and count the frames in decode order (a run of whole GOPs)
+        seek = (index.time_of(start) + index.time_of(start + 1)) / 2 if start + 1 < len(index) else index.time_of(start)
+        bsf = ['-bsf:v', codec['bsf']] if codec else []
+        run_ffmpeg('-ss', f'{seek:.6f}', '-i', video_path, '-map', '0:v:0', '-c', 'copy', *bsf,
+                   '-frames:v', n_frames, '-avoid_negative_ts', 'make_zero', part_path)
+    else:
+        # Transcoding seeks are accurate (earlier frames are decoded and dropped): aim just before 'start'.
+        # The part timestamps are rebased on its first frame, as the copied parts are
+        seek = (index.time_of(start - 1) + index.time_of(start)) / 2 if start > 0 else 0.0
+        pix = ['-pix_fmt', pix_fmt] if pix_fmt else []
+        run_ffmpeg('-ss', f'{seek:.6f}', '-i', video_path, '-map', '0:v:0', '-vf', 'setpts=PTS-STARTPTS',
+                   '-c:v', codec['encoder'],
+                   '-preset', 'fast', '-crf', '16', *pix, codec['params'], 'repeat-headers=1',
+                   '-frames:v', n_frames, part_path)
+
+def concat_segments(video_path, parts, output_path, start_time, end_time):
+    """
+    Joins the video parts, given as (path, duration), with the concat demuxer (no re-encoding) and muxes
+    the copied audio of [start_time, end_time]. The exact durations keep the parts from drifting apart.
+    """
+    list_path = os.path.join(os.path.dirname(parts[0][0]), 'parts.txt')
+    with open(list_path, 'w', encoding='utf-8') as f:
+        f.writelines(f"file '{part}'\nduration {duration:.6f}\n" for part, duration in parts)
+    run_ffmpeg('-f', 'concat', '-safe', '0', '-i', list_path,
+               '-ss', f'{start_time:.6f}', '-t', f'{end_time - start_time:.6f}', '-i', video_path,
+               '-map', '0:v', '-map', '1:a?', '-c', 'copy', '-movflags', '+faststart', output_path)
+
 def make_cuts_sensor(df, start_time=None, video_length=None):
+    """
+    Keeps the samples after 'start_time' and before 'start_time + video_length' (seconds), with
+    'seconds_passed' starting at 0 again. Cuts are binary searches on the time column and the returned
+    DataFrame shares the data columns with 'df' as read-only views: writing into them raises ValueError
+    (use .copy() on the cut to modify it in place), while assigning whole columns works as usual.
+    """
     if start_time is None and video_length is None:
         return df
 
-    if start_time:
-        df = df[df['seconds_passed'] > start_time]
-    
-    if start_time and video_length:
-        df = df[df['seconds_passed'] < (start_time + video_length)]
-    elif video_length:
-        df = df[df['seconds_passed'] < video_length]
-
-    df['seconds_passed'] = df['seconds_passed'] - df['seconds_passed'].min()
-
-    return df
\ No newline at end of file
+    return sensorstore.SensorStore.from_frame(df).cut(start_time, video_length).to_frame()
@@ -0,0 +1,190 @@
+# This module estimates the offset between a video and its sensor log by cross-correlating motion signals
+
+import subprocess
+
+import numpy as np
+import pandas as pd
+
+import sensordataIO
+import videoindex
+
+ACC_COLUMNS = ['AccX(g)', 'AccY(g)', 'AccZ(g)']
+
+def motion_energy(video_path, frame_index=None, start=0.0, duration=None, size=(160, 90), chunk_frames=512):
+    """
+    Mean absolute difference between consecutive frames of [start, start + duration] (seconds), decoded
+    by ffmpeg straight to small grayscale images (the full size frames never reach Python). Decoding is
+    the bottleneck, so the deblocking filter is skipped: it does not change the motion much.
+
+    returns:
+
+    t : array -> presentation time (s) of each frame, from the FrameIndex;
+    energy : array -> motion energy of each frame (0 on the first one)
+    """
+    if frame_index is None:
+        frame_index = videoindex.load_frame_index(video_path)
+    first = int(frame_index.frame_from(start))
+    window = ['-t', f'{duration:.6f}'] if duration else []
+    width, height = size
+    frame_bytes = width * height
+    # Accurate seek: the output starts on the first frame at/after 'start'
+    seek = (frame_index.time_of(first - 1) + frame_index.time_of(first)) / 2 if first > 0 else 0.0
+    proc = subprocess.Popen([videoindex.ffmpeg_exe(), '-hide_banner', '-loglevel', 'error', '-threads', '0',
+                             '-skip_loop_filter', 'all', '-ss', f'{seek:.6f}', *window, '-i', video_path,
+                             '-map', '0:v:0', '-fps_mode', 'passthrough',
+                             '-vf', f'scale={width}:{height}:flags=area,format=gray',
+                             '-f', 'rawvideo', '-'], stdout=subprocess.PIPE)
+
+    energy = [np.zeros(1, dtype=np.float32)]
+    previous = None
+    try:
+        while True:
+            data = proc.stdout.read(frame_bytes * chunk_frames)
+            n = len(data) // frame_bytes
+            if not n:
+                break
+            frames = np.frombuffer(data, dtype=np.uint8, count=n * frame_bytes).reshape(n, height, width)
+            if previous is not None:
+                frames = np.concatenate([previous, frames])
+            diff = np.abs(np.diff(frames.astype(np.int16), axis=0))
+            energy.append(diff.mean(axis=(1, 2), dtype=np.float32))
+            previous = frames[-1:]
+    finally:
+        proc.stdout.close()
+        proc.wait()
+
+    energy = np.concatenate(energy)
+    n = min(len(energy), len(frame_index) - first)
+    if n < 2:
+        raise ValueError(f"Não foi possível decodificar os frames de {video_path}")
+    return frame_index.pts[first:first + n], energy[:n]
+
+def acceleration_activity(df, columns=ACC_COLUMNS, time_col='seconds_passed', window=1.0):
+    """
+    Deviation of the acceleration magnitude from its moving average over 'window' seconds (removes
+    gravity and slow orientation changes, keeps the bursts of movement).
+
+    returns:
+
+    t : array -> sample times (s);
+    activity : array -> absolute deviation of each sample
+    """
+    t = df[time_col].to_numpy(dtype=np.float64)
+    # Compact (float32) channels stay float32
+    acc = df[columns].to_numpy(dtype=np.result_type(*df[columns].dtypes, np.float32))
+    magnitude = np.sqrt(np.einsum('ij,ij->i', acc, acc))
+    rate = (len(t) - 1) / (t[-1] - t[0]) if len(t) > 1 and t[-1] > t[0] else 1.0
+    return t, np.abs(magnitude - moving_average(magnitude, max(int(window * rate), 1)))
+
+def moving_average(y, n):
+    """
+    Centered moving average of 'n' samples (edges averaged over the samples available)
+    """
+    if n <= 1:
+        return np.asarray(y, dtype=np.float64)
+    kernel = np.ones(n)
+    return np.convolve(y, kernel, mode='same') / np.convolve(np.ones(len(y)), kernel, mode='same')
+
+def to_grid(t, y, rate):
+    """
+    Resamples (t, y) linearly on a uniform grid at 'rate' Hz starting at t[0]
+    """
+    df = pd.DataFrame({'seconds_passed': t, 'value': y}, copy=False)
+    timebase = sensordataIO.camera_timebase(t[0], t[-1], rate)
+    return sensordataIO.resample(df, timebase, method='linear')['value'].to_numpy()
+
+def normalized_xcorr(a, b, min_overlap=1):
+    """
+    Pearson correlation between a[i] and b[i + k] for every lag k with at least 'min_overlap' samples
+    in common. The products come from one FFT cross-correlation and the per-lag means and variances
+    from cumulative sums, so the cost is O((n + m) log(n + m)).
+
+    returns:
+
+    lags : array -> lags k in samples (b is delayed by k relative to a);
+    r : array -> correlation of each lag
+    """
+    a = np.asarray(a, dtype=np.float64) - np.mean(a)
+    b = np.asarray(b, dtype=np.float64) - np.mean(b)
+    n, m = len(a), len(b)
+    size = 1 << (n + m - 1).bit_length()
+    products = np.fft.irfft(np.conj(np.fft.rfft(a, size)) * np.fft.rfft(b, size), size)
+
+    lags = np.arange(-(n - 1), m)
+    i0 = np.maximum(0, -lags)
+    i1 = np.minimum(n, m - lags)
+    count = i1 - i0
+    valid = count >= max(min_overlap, 2)
+    lags, i0, i1, count = lags[valid], i0[valid], i1[valid], count[valid]
+
+    ca, ca2 = np.concatenate([[0], np.cumsum(a)]), np.concatenate([[0], np.cumsum(a * a)])
+    cb, cb2 = np.concatenate([[0], np.cumsum(b)]), np.concatenate([[0], np.cumsum(b * b)])
+    sa, saa = ca[i1] - ca[i0], ca2[i1] - ca2[i0]
+    sb, sbb = cb[i1 + lags] - cb[i0 + lags], cb2[i1 + lags] - cb2[i0 + lags]
+
+    covariance = products[lags % size] - sa * sb / count
+    variance = (saa - sa * sa / count) * (sbb - sb * sb / count)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        r = np.where(variance > 0, covariance / np.sqrt(np.maximum(variance, 0)), 0.0)
+    return lags, r
+
+def estimate_offset(video_path, df, video_start=0.0, video_duration=None, rate=20, max_lag=None, min_overlap=0.5,
+                    frame_index=None, columns=ACC_COLUMNS, time_col='seconds_passed', smooth=0.25):
+    """
+    Estimates the lag between the video and the sensor data, so that sensor time = video time + lag.
+    The cut of the data that matches a video cut starting at 'video_start' starts at video_start + lag.
+
+    params:
+
+    video_start, video_duration : float -> part of the video analysed (a couple of minutes with some
+                                           movement is enough, and decoding is the slow step);
+    rate : float -> rate (Hz) of the common grid where the signals are compared;
+    max_lag : float -> largest |lag| searched, in seconds (None searches every lag);
+    min_overlap : float -> smallest overlap between the signals, as a fraction of the shortest one;
+    smooth : float -> moving average (s) applied to both signals
+
+    returns:
+
+    lag : float -> best lag (s);
+    confidence : float -> correlation (0 to 1) of the signals at that lag
+    """
+    video_t, energy = motion_energy(video_path, frame_index, video_start, video_duration)
+    sensor_t, activity = acceleration_activity(df, columns, time_col)
+    lag, confidence = best_lag(video_t, energy, sensor_t, activity, rate, max_lag, min_overlap, smooth)
+    if lag is None:
+        raise ValueError("Vídeo e dados não se sobrepõem o suficiente para estimar o deslocamento")
+    return lag, confidence
+
+def best_lag(a_t, a, b_t, b, rate=20, max_lag=None, min_overlap=0.5, smooth=0.25):
+    """
+    Lag (s) that best matches the signal (b_t, b) with (a_t, a), so that b time = a time + lag: both
+    are resampled on 'rate' Hz grids, smoothed over 'smooth' seconds and cross-correlated.
+
+    returns:
+
+    lag : float -> best lag, None if the signals do not overlap enough;
+    confidence : float -> correlation (0 to 1) of the signals at that lag
+    """
+    a = to_grid(a_t, a, rate)
+    b = to_grid(b_t, b, rate)
+    window = max(int(smooth * rate), 1)
+    a, b = moving_average(a, window), moving_average(b, window)
+
+    lags, r = normalized_xcorr(a, b, min_overlap=int(min_overlap * min(len(a), len(b))))
+    # Grids start at the first sample: lag k pairs a time i / rate with b time (i + k) / rate
+    seconds = lags / rate + (b_t[0] - a_t[0])
+    if max_lag is not None:
+        keep = np.abs(seconds) <= max_lag
+        lags, r, seconds = lags[keep], r[keep], seconds[keep]
+    if not len(r):
+        return None, 0.0
+
+    best = int(np.argmax(r))
+    lag = seconds[best]
+    # Parabolic interpolation of the peak, for sub-sample precision
+    if 0 < best < len(r) - 1:
+        left, peak, right = r[best - 1], r[best], r[best + 1]
+        curvature = left - 2 * peak + right
+        if curvature < 0:
+            lag += 0.5 * (left - right) / curvature / rate
+    return float(lag), float(max(r[best], 0.0))
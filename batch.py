@@ -0,0 +1,210 @@
+# This module syncs and exports many video/sensor pairs without the GUI
+
+import argparse
+import csv
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import actionstart
+import alignment
+import overlay
+import plotting
+import sensordataIO
+
+DONE_FILE = 'job.json'
+
+def read_manifest(manifest_path):
+    """
+    Reads the jobs of a CSV or JSON manifest.
+
+    Each job has: video, sensor, video_start, video_duration, data_start, data_duration,
+    columns (list, or ';' separated on CSV) and optionally name. Relative paths are taken
+    from the manifest directory. data_start 'auto' estimates it from the video (alignment module).
+
+    returns:
+
+    jobs : list -> one dict per job
+    """
+    if manifest_path.lower().endswith('.json'):
+        with open(manifest_path, encoding='utf-8') as f:
+            jobs = json.load(f)
+        if isinstance(jobs, dict):
+            jobs = jobs['jobs']
+    else:
+        with open(manifest_path, newline='', encoding='utf-8-sig') as f:
+            jobs = list(csv.DictReader(f))
+
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+    return [parse_job(job, base_dir) for job in jobs]
+
+def parse_job(job, base_dir='.'):
+    """
+    Normalizes one job of a manifest (see read_manifest); relative paths are taken from 'base_dir'.
+    Without a name, it is the video (or sensor) file name and a short hash of the inputs and offsets,
+    so the jobs already done are still skipped when rows are added to or reordered on the manifest
+    """
+    columns = job.get('columns') or []
+    if isinstance(columns, str):
+        columns = [col.strip() for col in columns.split(';') if col.strip()]
+    video = job.get('video') or None
+    parsed = {
+        'name': job.get('name') or None,
+        'video': os.path.join(base_dir, video) if video else None,
+        'sensor': os.path.join(base_dir, job['sensor']),
+        'video_start': to_float(job.get('video_start')) or 0.0,
+        'video_duration': to_float(job.get('video_duration')),
+        'data_start': 'auto' if str(job.get('data_start')).lower() == 'auto' else to_float(job.get('data_start')),
+        'data_duration': to_float(job.get('data_duration')),
+        'columns': columns,
+    }
+    if parsed['name'] is None:
+        parsed['name'] = default_name(parsed)
+    return parsed
+
+def default_name(job):
+    """
+    '<video or sensor file name>_<hash>', the hash being of the absolute paths and the offsets of 'job'
+    """
+    key = [os.path.abspath(job['video']) if job['video'] else None, os.path.abspath(job['sensor']),
+           job['video_start'], job['video_duration'], job['data_start'], job['data_duration']]
+    digest = hashlib.sha1(json.dumps(key).encode('utf-8')).hexdigest()[:8]
+    return f"{os.path.splitext(os.path.basename(job['video'] or job['sensor']))[0]}_{digest}"
+
+def to_float(value):
+    if value is None or value == '':
+        return None
+    return float(value)
+
+def job_dir(out_dir, job):
+    return os.path.join(out_dir, job['name'])
+
+def is_done(out_dir, job):
+    return os.path.exists(os.path.join(job_dir(out_dir, job), DONE_FILE))
+
+def run_job(job, out_dir, video=True, plot=True, overlay_video=False):
+    """
+    Runs one job: reads and cuts the sensor data, cuts the video and plots the selected columns
+    (and, with 'overlay_video', exports the video cut with the plot and its cursor beside it).
+    Outputs go to out_dir/<name>/ and job.json (with stage timings) is written last, marking it done.
+
+    returns:
+
+    result : dict -> job name, outputs, sensor rows and stage timings (s)
+    """
+    path = job_dir(out_dir, job)
+    os.makedirs(path, exist_ok=True)
+    timings = {}
+    outputs = {}
+
+    start = time.perf_counter()
+    dropped = [col for col in sensordataIO.METADATA_COLUMNS if col in sensordataIO.read_header(job['sensor'])]
+    df = sensordataIO.read_data(job['sensor'], *dropped)
+    n_rows = len(df)
+    timings['read'] = time.perf_counter() - start
+
+    video_start, data_start = job['video_start'], job['data_start']
+    offset = None
+    if data_start == 'auto':
+        if not job['video']:
+            raise ValueError("data_start 'auto' precisa do vídeo")
+        start = time.perf_counter()
+        lag, confidence = alignment.estimate_offset(job['video'], df, video_start, job['video_duration'])
+        offset = {'lag': lag, 'confidence': confidence}
+        data_start = video_start + lag
+        if data_start < 0:
+            video_start, data_start = -lag, 0.0
+        timings['align'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    df = actionstart.make_cuts_sensor(df, data_start, job['data_duration'])
+    outputs['sensor'] = os.path.join(path, 'sensor.csv')
+    df.to_csv(outputs['sensor'], index=False)
+    timings['cut_sensor'] = time.perf_counter() - start
+
+    if video and job['video']:
+        start = time.perf_counter()
+        duration = job['video_duration'] or job['data_duration']
+        if duration is None:
+            raise ValueError("Informe video_duration (ou data_duration) para cortar o vídeo")
+        outputs['video'] = actionstart.make_cuts_video(job['video'], video_start, duration,
+                                                       output_path=os.path.join(path, 'video.mp4'))
+        timings['cut_video'] = time.perf_counter() - start
+
+    if overlay_video and job['video'] and job['columns']:
+        start = time.perf_counter()
+        outputs['overlay'] = overlay.export_overlay(job['video'], df, job['columns'], os.path.join(path, 'overlay.mp4'),
+                                                    video_start, job['video_duration'] or job['data_duration'])
+        timings['overlay'] = time.perf_counter() - start
+
+    if plot and job['columns']:
+        start = time.perf_counter()
+        outputs['plot'] = os.path.join(path, 'plot.png')
+        plotting.plot_graph(df, *job['columns'], plot_path=outputs['plot'])
+        timings['plot'] = time.perf_counter() - start
+
+    result = {'name': job['name'], 'outputs': outputs, 'sensor_rows': n_rows, 'timings': timings}
+    if offset is not None:
+        result['offset'] = offset
+    with open(os.path.join(path, DONE_FILE), 'w', encoding='utf-8') as f:
+        json.dump({'job': job, **result}, f, indent=2, ensure_ascii=False)
+    return result
+
+def run_batch(jobs, out_dir, workers=None, force=False, video=True, plot=True, overlay_video=False):
+    """
+    Runs 'jobs' on a process pool, skipping the ones already done (unless 'force'), and prints
+    per job progress and a throughput summary.
+
+    returns:
+
+    failures : list -> (job name, error message) of the failed jobs
+    """
+    pending = [job for job in jobs if force or not is_done(out_dir, job)]
+    skipped = len(jobs) - len(pending)
+    print(f"{len(jobs)} jobs, {skipped} já concluídos, {len(pending)} a processar")
+
+    start = time.perf_counter()
+    failures, results = [], []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(run_job, job, out_dir, video, plot, overlay_video): job for job in pending}
+        for i, future in enumerate(as_completed(futures), 1):
+            job = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                failures.append((job['name'], str(e)))
+                print(f"[{i}/{len(pending)}] {job['name']}: ERRO {e}")
+                continue
+            results.append(result)
+            print(f"[{i}/{len(pending)}] {job['name']}: ok ({sum(result['timings'].values()):.1f} s)")
+    elapsed = time.perf_counter() - start
+
+    print(f"\n{len(results)} concluídos, {len(failures)} com erro, {skipped} pulados em {elapsed:.1f} s")
+    if results and elapsed > 0:
+        rows = sum(result['sensor_rows'] for result in results)
+        print(f"{len(results) / elapsed * 60:.1f} jobs/min, {rows / elapsed:,.0f} amostras de sensor/s")
+        for stage in ['read', 'align', 'cut_sensor', 'cut_video', 'overlay', 'plot']:
+            times = [result['timings'][stage] for result in results if stage in result['timings']]
+            if times:
+                print(f"  {stage:<12} {sum(times) / len(times):8.2f} s/job")
+    return failures
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Syncs and exports many video/sensor pairs in parallel")
+    parser.add_argument('manifest', help="CSV or JSON with video, sensor, video_start, video_duration, "
+                                         "data_start, data_duration, columns and name of each job")
+    parser.add_argument('--out', default='./data/batch', help="output directory (one folder per job)")
+    parser.add_argument('--workers', type=int, default=None, help="number of processes (default: CPUs)")
+    parser.add_argument('--force', action='store_true', help="runs again jobs already done")
+    parser.add_argument('--no-video', action='store_true', help="does not cut the videos")
+    parser.add_argument('--no-plot', action='store_true', help="does not save the plots")
+    parser.add_argument('--overlay', action='store_true', help="also exports the video with the plot beside it")
+    args = parser.parse_args()
+
+    jobs = read_manifest(args.manifest)
+    failures = run_batch(jobs, args.out, workers=args.workers, force=args.force,
+                         video=not args.no_video, plot=not args.no_plot, overlay_video=args.overlay)
+    sys.exit(1 if failures else 0)
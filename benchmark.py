@@ -0,0 +1,622 @@
+# This module benchmarks the sensor data pipeline on synthetic WIT sensor logs
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import cv2
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from PIL import Image
+
+import actionstart
+import events
+import features
+import overlay
+import perfstats
+import playback
+import plotexport
+import plotting
+import sensordataIO
+import sensorstore
+import txtindex
+import videoindex
+
+WIT_COLUMNS = ['time', 'DeviceName',
+               'AccX(g)', 'AccY(g)', 'AccZ(g)',
+               'AsX(°/s)', 'AsY(°/s)', 'AsZ(°/s)',
+               'AngleX(°)', 'AngleY(°)', 'AngleZ(°)',
+               'HX(uT)', 'HY(uT)', 'HZ(uT)',
+               'Q0()', 'Q1()', 'Q2()', 'Q3()',
+               'Temperature(°C)', 'Version()', 'Battery level(%)']
+
+DROPPED_COLUMNS = ['DeviceName', 'Version()', 'Battery level(%)']
+
+# Metrics of the current run (benchmark name -> metric -> value), saved with --json
+results = {}
+
+# Metrics compared against a baseline: times, lower is better
+TIME_METRICS = ('seconds', 'p50_ms', 'p99_ms', 'mean_ms')
+
+def make_synthetic_log(fpath, n_rows, rate=200, seed=0):
+    """
+    Writes a deterministic WIT sensor .txt log with 'n_rows' samples at 'rate' Hz.
+
+    Milliseconds are written without zero padding, like the sensor does.
+    """
+    rng = np.random.default_rng(seed)
+    elapsed_ms = (np.arange(n_rows) * 1000) // rate
+    start = pd.Timestamp('2024-05-20 10:15:30')
+
+    # Each second is formatted once and reused for all of its samples
+    seconds = elapsed_ms // 1000
+    unique_seconds = np.unique(seconds)
+    second_str = (start + pd.to_timedelta(unique_seconds, unit='s')).strftime('%Y-%m-%d %H:%M:%S')
+    time_str = pd.Series(np.asarray(second_str)[np.searchsorted(unique_seconds, seconds)]) \
+        + ':' + pd.Series(elapsed_ms % 1000).astype(str)
+
+    t = elapsed_ms / 1000
+    data = {'time': time_str, 'DeviceName': 'WT901BLE68'}
+    for i, col in enumerate(WIT_COLUMNS[2:-3]):
+        wave = np.sin(2 * np.pi * (0.5 + 0.1 * i) * t)
+        data[col] = np.round(wave + 0.05 * rng.standard_normal(n_rows), 3)
+    data['Temperature(°C)'] = 25.0
+    data['Version()'] = '5.0.1'
+    data['Battery level(%)'] = 100.0
+
+    pd.DataFrame(data, columns=WIT_COLUMNS).to_csv(fpath, sep='\t', index=False)
+    return fpath
+
+def make_synthetic_frame(n_rows, rate=200, seed=0):
+    """
+    Numeric DataFrame like read_data(..., groupMethod='noGroup') of a synthetic log (seconds_passed
+    and the accelerometer/gyroscope channels), built without going through text
+    """
+    rng = np.random.default_rng(seed)
+    t = np.arange(n_rows) / rate
+    data = {'seconds_passed': t}
+    for i, col in enumerate(features.CHANNELS):
+        wave = np.sin(2 * np.pi * (0.5 + 0.1 * i) * t)
+        data[col] = wave + 0.05 * rng.standard_normal(n_rows)
+    return pd.DataFrame(data, copy=False)
+
+def legacy_read_data(fpath, *args):
+    """
+    Parsing path used before the C engine one (python engine + per row millisecond fix), kept as baseline
+    """
+    df = pd.read_csv(fpath, sep='\t', engine='python')
+    if args:
+        df = df.drop(columns=[*args])
+
+    def fix_milliseconds(time_str):
+        parts = time_str.rsplit(':', 1)
+        if len(parts) == 2:
+            milliseconds = parts[1].zfill(3)
+            return f"{parts[0]}:{milliseconds}"
+        return time_str
+
+    df['time'] = df['time'].apply(fix_milliseconds)
+    df['time'] = pd.to_datetime(df['time'], format='%Y-%m-%d %H:%M:%S:%f')
+    df['seconds_passed'] = (df['time'] - df['time'].iloc[0]).dt.total_seconds()
+    return df
+
+def timeit(func, *args, repeat=1, **kwargs):
+    """
+    Runs 'func' 'repeat' times and returns (best wall time in seconds, last result)
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def record(name, **metrics):
+    """
+    Keeps the metrics of benchmark 'name' on the results of this run
+    """
+    results.setdefault(name, {}).update(metrics)
+
+def report(name, seconds, n_rows):
+    print(f"{name:<32} {seconds:8.3f} s {n_rows / seconds:14,.0f} rows/s")
+    record(name, seconds=seconds, rows_per_s=n_rows / seconds)
+
+def stage_stats(seconds):
+    """
+    Median, 99th percentile and mean (ms) of per-iteration stage times (s)
+    """
+    ms = np.asarray(seconds) * 1000
+    return {'p50_ms': float(np.percentile(ms, 50)), 'p99_ms': float(np.percentile(ms, 99)), 'mean_ms': float(ms.mean())}
+
+def report_stages(name, stages):
+    """
+    Prints and records the stats of each stage ('stages': stage name -> per-iteration times in s)
+    """
+    for stage, seconds in stages.items():
+        stats = stage_stats(seconds)
+        print(f"  {name + ' ' + stage:<30} p50 {stats['p50_ms']:7.2f} ms  p99 {stats['p99_ms']:7.2f} ms")
+        record(f'{name} {stage}', **stats)
+
+def bench_read(fpath, n_rows, legacy=True, repeat=1):
+    """
+    Compares the legacy parser against sensordataIO.read_data (without grouping)
+    """
+    fast_time, fast = timeit(sensordataIO.read_data, fpath, *DROPPED_COLUMNS, groupMethod='noGroup', cache=False,
+                              repeat=repeat)
+    report('read_data (C engine)', fast_time, n_rows)
+
+    if legacy:
+        legacy_time, old = timeit(legacy_read_data, fpath, *DROPPED_COLUMNS, repeat=repeat)
+        report('legacy (python engine + apply)', legacy_time, n_rows)
+        pd.testing.assert_frame_equal(fast, old)
+        print(f"speedup: {legacy_time / fast_time:.1f}x")
+    return fast
+
+def legacy_resample(df, camera_freq):
+    """
+    camera_freq path used before sensordataIO.resample (linspace timebase, merge on float times and
+    interpolation by row), kept as baseline
+    """
+    start_time = df['seconds_passed'].iloc[0]
+    end_time = df['seconds_passed'].iloc[-1]
+    num_frames = int((end_time - start_time) * camera_freq) + 1
+    new_timebase = pd.DataFrame({'seconds_passed': np.linspace(start_time, end_time, num=num_frames)})
+    numeric_cols = df.select_dtypes(include='number').columns.drop('seconds_passed')
+    df_interp = pd.merge(new_timebase, df[['seconds_passed'] + list(numeric_cols)], on='seconds_passed', how='left')
+    df_interp[numeric_cols] = df_interp[numeric_cols].interpolate(method='linear')
+    return df_interp.reset_index(drop=True)
+
+def bench_resample(fpath, camera_freq=30, repeat=3):
+    """
+    Compares the legacy merge + interpolate resampling against sensordataIO.resample (all modes)
+    """
+    df = sensordataIO.read_data(fpath, *DROPPED_COLUMNS, groupMethod='noGroup', cache=False)
+    timebase = sensordataIO.camera_timebase(0, df['seconds_passed'].iloc[-1], camera_freq)
+
+    legacy_time, _ = timeit(legacy_resample, df, camera_freq, repeat=repeat)
+    report('legacy merge+interpolate', legacy_time, len(df))
+    for method in ['linear', 'nearest', 'zoh']:
+        seconds, _ = timeit(sensordataIO.resample, df, timebase, method=method, repeat=repeat)
+        report(f'resample ({method})', seconds, len(df))
+
+def peak_memory(func, *args, **kwargs):
+    """
+    Runs 'func' and returns (peak traced memory in bytes, result)
+    """
+    tracemalloc.start()
+    try:
+        result = func(*args, **kwargs)
+        return tracemalloc.get_traced_memory()[1], result
+    finally:
+        tracemalloc.stop()
+
+def bench_chunked(fpath, n_rows, chunksize=100_000):
+    """
+    Compares peak memory of read_data against consuming sensordataIO.iter_data chunk by chunk
+    """
+    def consume():
+        return sum(len(chunk) for chunk in sensordataIO.iter_data(fpath, *DROPPED_COLUMNS, chunksize=chunksize))
+
+    full_peak, df = peak_memory(sensordataIO.read_data, fpath, *DROPPED_COLUMNS, cache=False)
+    chunk_peak, n_out = peak_memory(consume)
+    assert n_out == len(df)
+    print(f"{'peak memory read_data':<32} {full_peak / 2**20:8.1f} MiB")
+    print(f"{'peak memory iter_data':<32} {chunk_peak / 2**20:8.1f} MiB (chunksize={chunksize:,})")
+    record('peak memory read_data', MiB=full_peak / 2**20)
+    record('peak memory iter_data', MiB=chunk_peak / 2**20)
+
+def bench_projection(fpath, n_rows, columns=features.CHANNELS[:3]):
+    """
+    Compares read_data of every channel against a 'columns' projection, then the deferred read of one
+    more channel (sensordataIO.read_columns, after its txtindex is built) against parsing it with pandas
+    """
+    full_time, full = timeit(sensordataIO.read_data, fpath, *DROPPED_COLUMNS, groupMethod='noGroup', cache=False)
+    report('read_data (all channels)', full_time, n_rows)
+    projected_time, projected = timeit(sensordataIO.read_data, fpath, columns=columns, groupMethod='noGroup',
+                                       cache=False)
+    report(f'read_data ({len(columns)} channels)', projected_time, n_rows)
+
+    other = next(col for col in full.columns if col not in ['time', 'seconds_passed', *columns])
+    index_time, _ = timeit(txtindex.load_index, fpath)
+    report('txtindex build', index_time, n_rows)
+    deferred_time, deferred = timeit(sensordataIO.read_columns, fpath, [other], groupMethod='noGroup', cache=False)
+    report('read_columns (1 channel)', deferred_time, n_rows)
+    pandas_time, _ = timeit(sensordataIO.read_txt, fpath, usecols=[other])
+    report('read_csv usecols (1 channel)', pandas_time, n_rows)
+    np.testing.assert_array_equal(deferred[other].to_numpy(), full[other].to_numpy())
+    np.testing.assert_array_equal(projected[columns[0]].to_numpy(), full[columns[0]].to_numpy())
+
+def bench_compact(fpath, n_rows, camera_freq=30):
+    """
+    Memory and time of read_data with float64 channels against compact=True (float32 channels,
+    microsecond 'time'), and of the operations that follow on each (cut, resample, features)
+    """
+    for compact in (False, True):
+        name = 'compact' if compact else 'float64'
+        seconds, df = timeit(sensordataIO.read_data, fpath, *DROPPED_COLUMNS, groupMethod='noGroup', compact=compact,
+                             cache=False)
+        report(f'read_data ({name})', seconds, n_rows)
+        peak, _ = peak_memory(sensordataIO.read_data, fpath, *DROPPED_COLUMNS, groupMethod='noGroup',
+                              compact=compact, cache=False)
+        size = df.memory_usage(index=False).sum()
+        print(f"{'  frame / peak memory':<32} {size / 2**20:8.1f} MiB {peak / 2**20:8.1f} MiB")
+        record(f'memory {name}', MiB=size / 2**20, peak_MiB=peak / 2**20)
+
+        store = sensorstore.SensorStore.from_frame(df)
+        cut_time, cut = timeit(lambda: store.cut(10.0, 60.0).to_frame(), repeat=20)
+        timebase = sensordataIO.camera_timebase(0, df['seconds_passed'].iloc[-1], camera_freq)
+        resample_time, resampled = timeit(sensordataIO.resample, df, timebase, repeat=3)
+        features_time, _ = timeit(features.extract_features, df, workers=1)
+        report(f'  resample ({name})', resample_time, n_rows)
+        report(f'  features ({name})', features_time, n_rows)
+        print(f"{'  cut':<32} {cut_time * 1000:8.3f} ms")
+        record(f'cut {name}', seconds=cut_time)
+        if compact:
+            # Nothing downstream goes back to float64
+            assert all(frame[col].dtype == np.float32 for frame in (cut, resampled) for col in features.CHANNELS)
+
+def bench_cut_sensor(df, repeat=20):
+    """
+    Times actionstart.make_cuts_sensor on the middle half of 'df'
+    """
+    duration = df['seconds_passed'].iloc[-1]
+    seconds, cut = timeit(actionstart.make_cuts_sensor, df, duration / 4, duration / 2, repeat=repeat)
+    report('make_cuts_sensor', seconds, len(cut))
+
+def bench_plot_graph(df, columns, repeat=3):
+    """
+    Times plotting.plot_graph (figure, envelope of the columns and PNG file)
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        seconds, _ = timeit(plotting.plot_graph, df, *columns, plot_path=os.path.join(tmp, 'plot.png'),
+                            repeat=repeat)
+    report('plot_graph', seconds, len(df))
+
+def legacy_plot_graph(df, *args, plot_path):
+    """
+    The original plot_graph, kept as baseline: pyplot figure never closed, every sample drawn
+    """
+    _, ax = plt.subplots()
+
+    for arg in args:
+        ax.plot(df['seconds_passed'], df[arg], label=arg)
+        ax.legend()
+
+    plt.xlabel('Seconds')
+    plt.ylabel('Value')
+
+    plt.savefig(plot_path)
+
+def bench_plot_export(df, columns, n_figures=50, workers=None):
+    """
+    Figures per minute of 'n_figures' time windows of 'df', and figures left open: the legacy pyplot
+    loop against plotexport (shared memory, process pool, PNG and SVG, overlay and tiled)
+    """
+    t = df['seconds_passed'].to_numpy()
+    window = (t[-1] - t[0]) / n_figures
+    starts = np.arange(t[0], t[-1], window)
+    with tempfile.TemporaryDirectory() as tmp:
+        def legacy():
+            for k, start in enumerate(starts):
+                i0, i1 = np.searchsorted(t, [start, start + window])
+                legacy_plot_graph(df.iloc[i0:i1], *columns, plot_path=os.path.join(tmp, f'legacy_{k}.png'))
+
+        with plt.rc_context({'figure.max_open_warning': 0}):
+            seconds, _ = timeit(legacy)
+        open_figures = len(plt.get_fignums())
+        plt.close('all')
+        print(f"{'plot export (legacy pyplot)':<32} {len(starts) / seconds * 60:8.0f} figures/min, "
+              f"{open_figures} figures left open")
+        record('plot export legacy', seconds=seconds, figures_per_min=len(starts) / seconds * 60)
+
+        for fmt in ('png', 'svg'):
+            for layout in plotting.LAYOUTS:
+                start = time.perf_counter()
+                with plotexport.PlotExporter(workers) as exporter:
+                    n = plotexport.export_windows(exporter, df, columns, tmp, f'{layout}', window, fmt, layout)
+                    exporter.wait()
+                seconds = time.perf_counter() - start
+                name = f'plot export ({fmt}, {layout})'
+                print(f"{name:<32} {n / seconds * 60:8.0f} figures/min ({exporter.workers} processes)")
+                record(name, seconds=seconds, figures_per_min=n / seconds * 60)
+
+def make_synthetic_video(fpath, seconds, fps=30, size='1280x720', gop=60):
+    """
+    Writes a deterministic H.264 test pattern video (with a sine tone) with a keyframe every 'gop' frames
+    """
+    subprocess.run([videoindex.ffmpeg_exe(), '-hide_banner', '-loglevel', 'error', '-y',
+                    '-f', 'lavfi', '-i', f'testsrc2=size={size}:rate={fps}',
+                    '-f', 'lavfi', '-i', 'sine=frequency=440',
+                    '-t', str(seconds), '-c:v', 'libx264', '-pix_fmt', 'yuv420p', '-g', str(gop),
+                    '-c:a', 'aac', fpath], check=True)
+    return fpath
+
+def bench_cut(video_path, start_time, video_length, modes=('reencode', 'smart', 'copy')):
+    """
+    Compares wall time and output size of actionstart.make_cuts_video on each mode (the index is
+    built beforehand, as the GUI does when the video is loaded)
+    """
+    videoindex.load_frame_index(video_path)
+    for mode in modes:
+        output_path = video_path.replace('.mp4', f'_{mode}.mp4')
+        seconds, _ = timeit(actionstart.make_cuts_video, video_path, start_time, video_length,
+                            output_path=output_path, mode=mode)
+        size = os.path.getsize(output_path) / 2**20
+        print(f"{'cut (' + mode + ')':<32} {seconds:8.3f} s {size:11.1f} MiB")
+        record(f'cut ({mode})', seconds=seconds, MiB=size)
+
+def bench_features(hours, rate=200, workers=None, window=2.0, step=1.0):
+    """
+    Times features.extract_features on 'hours' of synthetic data (one process and 'workers' processes)
+    and the columnar write of the result
+    """
+    n_rows = int(hours * 3600 * rate)
+    df = make_synthetic_frame(n_rows, rate)
+    print(f"\nsynthetic frame: {hours:g} h at {rate} Hz, {n_rows:,} rows x {len(features.CHANNELS)} channels")
+
+    single_time, result = timeit(features.extract_features, df, window=window, step=step, workers=1)
+    report('features (1 process)', single_time, n_rows)
+    workers = workers or os.cpu_count() or 1
+    if workers > 1:
+        multi_time, multi = timeit(features.extract_features, df, window=window, step=step, workers=workers)
+        report(f'features ({workers} processes)', multi_time, n_rows)
+        pd.testing.assert_frame_equal(result, multi)
+        print(f"speedup: {single_time / multi_time:.1f}x")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        write_time, nbytes = timeit(features.save_features, result, os.path.join(tmp, 'features'))
+        print(f"{'save_features':<32} {write_time:8.3f} s {nbytes / 2**20:11.1f} MiB "
+              f"({len(result):,} windows x {len(result.columns) - 1} features)")
+        record('save_features', seconds=write_time, MiB=nbytes / 2**20)
+
+def bench_events(hours, rate=200, n_impacts=2000):
+    """
+    Times events.find_events on 'hours' of synthetic acceleration with 'n_impacts' impacts, and the
+    time range queries of the index
+    """
+    n_rows = int(hours * 3600 * rate)
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({'seconds_passed': np.arange(n_rows) / rate,
+                       'AccX(g)': 0.02 * rng.standard_normal(n_rows),
+                       'AccY(g)': 0.02 * rng.standard_normal(n_rows),
+                       'AccZ(g)': 1 + 0.02 * rng.standard_normal(n_rows)}, copy=False)
+    positions = np.sort(rng.choice(n_rows - 20, n_impacts, replace=False))
+    for k in range(10):
+        df['AccZ(g)'].to_numpy()[positions + k] += 3 * np.exp(-k / 3)
+
+    seconds, index = timeit(events.find_events, df)
+    report(f'find_events ({hours:g} h)', seconds, n_rows)
+    starts = rng.uniform(0, hours * 3600, 10_000)
+    query_time, _ = timeit(lambda: [index.between(t, t + 5) for t in starts])
+    print(f"{'events.between':<32} {query_time / len(starts) * 1e6:8.2f} us/query ({len(index)} events)")
+    record('events.between', seconds=query_time, us_per_query=query_time / len(starts) * 1e6)
+
+def bench_overlay(video_path, seconds, layout='side'):
+    """
+    Times overlay.export_overlay over 'seconds' of the video (frames per second against the video rate)
+    """
+    index = videoindex.load_frame_index(video_path)
+    df = make_synthetic_frame(int(seconds * 200))
+    output_path = video_path.replace('.mp4', f'_overlay_{layout}.mp4')
+    elapsed, _ = timeit(overlay.export_overlay, video_path, df, features.CHANNELS[:3], output_path,
+                        0.0, seconds, layout=layout, frame_index=index)
+    n_frames = int(index.frame_from(seconds))
+    print(f"{'overlay (' + layout + ')':<32} {elapsed:8.3f} s {n_frames / elapsed:10.1f} fps "
+          f"({seconds / elapsed:.2f}x real time)")
+    record(f'overlay ({layout})', seconds=elapsed, fps=n_frames / elapsed)
+
+def bench_playback_stages(video_path, df, columns, seconds, size=(640, 360)):
+    """
+    Runs the stages of the GUI playback loop back to back, without Tk and without waiting for the
+    clock, over the first 'seconds' of the video: decode (cv2 read), convert (resize + BGR to RGB into
+    preallocated buffers, as playback.Player does), image (PIL image of the frame, what PhotoImage is
+    built from) and draw (cursor moved on the sensor plot, plotting.CursorPlot on an Agg canvas)
+    """
+    index = videoindex.load_frame_index(video_path)
+    n_frames = int(index.frame_from(seconds))
+    width, height = size
+    resized = np.empty((height, width, 3), dtype=np.uint8)
+    rgb = np.empty_like(resized)
+
+    fig = Figure(figsize=(5, 4))
+    canvas = FigureCanvasAgg(fig)
+    cursor_plot = plotting.CursorPlot(fig.add_subplot(), canvas)
+    plot_time, _ = timeit(cursor_plot.plot, df, columns)
+    record('playback plot', seconds=plot_time)
+
+    stages = {name: np.empty(n_frames) for name in ['decode', 'convert', 'image', 'draw']}
+    cap = cv2.VideoCapture(video_path)
+    start = time.perf_counter()
+    for i in range(n_frames):
+        t0 = time.perf_counter()
+        ret, frame = cap.read()
+        if not ret:
+            n_frames = i
+            break
+        t1 = time.perf_counter()
+        cv2.resize(frame, size, dst=resized, interpolation=cv2.INTER_AREA)
+        cv2.cvtColor(resized, cv2.COLOR_BGR2RGB, dst=rgb)
+        t2 = time.perf_counter()
+        Image.fromarray(rgb)
+        t3 = time.perf_counter()
+        cursor_plot.move(float(index.time_of(i)))
+        t4 = time.perf_counter()
+        for name, elapsed in zip(stages, (t1 - t0, t2 - t1, t3 - t2, t4 - t3)):
+            stages[name][i] = elapsed
+    elapsed = time.perf_counter() - start
+    cap.release()
+
+    print(f"{'playback loop (unpaced)':<32} {elapsed:8.3f} s {n_frames / elapsed:10.1f} fps "
+          f"(first plot {plot_time * 1000:.0f} ms)")
+    record('playback loop', seconds=elapsed, fps=n_frames / elapsed)
+    report_stages('playback', {name: times[:n_frames] for name, times in stages.items()})
+
+def legacy_display(frame, size):
+    """
+    Display conversion used before playback.convert_frame (full size color conversion, then resize,
+    new arrays every frame), kept as baseline
+    """
+    rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    return Image.fromarray(cv2.resize(rgb, size))
+
+def bench_display(source_size=(3840, 2160), size=(640, 360), n_frames=60):
+    """
+    Compares the per-frame time and the peak memory allocated of the legacy display conversion
+    against playback.convert_frame into preallocated buffers, on 'source_size' BGR frames
+    """
+    rng = np.random.default_rng(0)
+    width, height = source_size
+    frames = rng.integers(0, 256, (4, height, width, 3), dtype=np.uint8)
+    resized = np.empty((size[1], size[0], 3), dtype=np.uint8)
+    out = np.empty_like(resized)
+
+    def legacy():
+        for i in range(n_frames):
+            legacy_display(frames[i % len(frames)], size)
+
+    def fast():
+        for i in range(n_frames):
+            Image.fromarray(playback.convert_frame(frames[i % len(frames)], resized, out))
+
+    print(f"\ndisplay conversion: {width}x{height} -> {size[0]}x{size[1]}, {n_frames} frames")
+    for name, func in [('legacy', legacy), ('convert_frame', fast)]:
+        seconds, _ = timeit(func, repeat=3)
+        peak, _ = peak_memory(func)
+        print(f"{'display (' + name + ')':<32} {seconds / n_frames * 1000:8.2f} ms/frame "
+              f"{peak / 2**20:8.1f} MiB peak allocated")
+        record(f'display ({name})', seconds=seconds, ms_per_frame=seconds / n_frames * 1000, MiB=peak / 2**20)
+
+def bench_player(video_path, seconds, size=(640, 360)):
+    """
+    Plays the first 'seconds' of the video on playback.Player against the wall clock, consuming frames
+    like MainViewFrame.update_loop (without Tk), and reports the fps reached, the dropped frames and
+    the decode/convert times measured by the player's profiler
+    """
+    index = videoindex.load_frame_index(video_path)
+    end_frame = int(index.frame_from(seconds))
+    profiler = perfstats.Profiler(playback.STAGES, enabled=True)
+    player = playback.Player(video_path, index, size, profiler=profiler)
+    player.start(0, end_frame)
+    start = time.perf_counter()
+    while not player.done():
+        if player.next_frame() is not None:
+            player.release()
+        time.sleep(player.delay_ms() / 1000)
+    elapsed = time.perf_counter() - start
+    player.stop()
+
+    fps = player.displayed / elapsed
+    print(f"{'player (real time)':<32} {elapsed:8.3f} s {fps:10.1f} fps "
+          f"({player.dropped_frames()} of {end_frame} frames dropped)")
+    record('player', fps=fps, dropped=player.dropped_frames(), frames=end_frame)
+    report_stages('player', {stage: profiler.samples(stage) for stage in ['decode', 'convert']})
+
+def run_metadata(args):
+    return {
+        'date': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': sys.version.split()[0],
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'args': vars(args),
+    }
+
+def save_results(fpath, args):
+    """
+    Saves this run as JSON: {'meta': {...}, 'results': {benchmark: {metric: value}}}
+    """
+    with open(fpath, 'w') as f:
+        json.dump({'meta': run_metadata(args), 'results': results}, f, indent=2)
+
+def compare_results(baseline_path, tolerance=0.2):
+    """
+    Compares the time metrics of this run with a JSON saved by a previous run. A metric regresses when
+    it is more than 'tolerance' (fraction) slower than the baseline.
+
+    returns:
+
+    regressions : list -> (benchmark, metric, baseline value, current value)
+    """
+    with open(baseline_path) as f:
+        baseline = json.load(f)['results']
+    regressions = []
+    print(f"\ncomparison with {baseline_path} (tolerance {tolerance:.0%}):")
+    for name, metrics in results.items():
+        for metric, value in metrics.items():
+            before = baseline.get(name, {}).get(metric)
+            if metric not in TIME_METRICS or not before:
+                continue
+            change = value / before - 1
+            flag = 'REGRESSION' if change > tolerance else ''
+            print(f"  {name + ' ' + metric:<40} {before:10.4f} -> {value:10.4f} {change:+7.1%} {flag}")
+            if flag:
+                regressions.append((name, metric, before, value))
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks the WIT sensor data pipeline")
+    parser.add_argument('--rows', type=int, default=2_000_000, help="number of samples on the synthetic log")
+    parser.add_argument('--rate', type=int, default=200, help="sampling rate of the synthetic log (Hz)")
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--no-legacy', action='store_true', help="skips the (slow) legacy parser")
+    parser.add_argument('--feature-hours', type=float, default=24,
+                        help="length of the synthetic recording for the features benchmark (0 skips it)")
+    parser.add_argument('--workers', type=int, default=None, help="processes of the features and plot export benchmarks")
+    parser.add_argument('--video-seconds', type=int, default=60,
+                        help="length of the synthetic video for the cut benchmark (0 skips it)")
+    parser.add_argument('--video-fps', type=int, default=30, help="frame rate of the synthetic video")
+    parser.add_argument('--video-size', default='1280x720', help="size of the synthetic video")
+    parser.add_argument('--json', default=None, help="saves the results of this run to this JSON file")
+    parser.add_argument('--baseline', default=None, help="JSON of a previous run to compare with")
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help="slowdown over the baseline counted as a regression (fraction)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        fpath = make_synthetic_log(os.path.join(tmp, 'synthetic.txt'), args.rows, args.rate)
+        print(f"synthetic log: {args.rows:,} rows, {os.path.getsize(fpath) / 2**20:.1f} MiB")
+        df = bench_read(fpath, args.rows, legacy=not args.no_legacy, repeat=args.repeat)
+        bench_projection(fpath, args.rows)
+        bench_compact(fpath, args.rows)
+        bench_chunked(fpath, args.rows)
+        bench_resample(fpath)
+        bench_cut_sensor(df)
+        bench_plot_graph(df, features.CHANNELS[:3])
+        bench_plot_export(df, features.CHANNELS[:3], workers=args.workers)
+
+    bench_display()
+
+    if args.feature_hours:
+        bench_features(args.feature_hours, args.rate, workers=args.workers)
+        bench_events(args.feature_hours, args.rate)
+
+    if args.video_seconds:
+        with tempfile.TemporaryDirectory() as tmp:
+            video_path = make_synthetic_video(os.path.join(tmp, 'synthetic.mp4'), args.video_seconds,
+                                              fps=args.video_fps, size=args.video_size)
+            print(f"\nsynthetic video: {args.video_seconds} s, {args.video_size} at {args.video_fps} fps, "
+                  f"{os.path.getsize(video_path) / 2**20:.1f} MiB")
+            bench_playback_stages(video_path, df, features.CHANNELS[:3], min(args.video_seconds, 20))
+            bench_player(video_path, min(args.video_seconds, 10))
+            # Cut points off the keyframes, so 'smart' re-encodes both edges and 'copy' widens the cut
+            bench_cut(video_path, args.video_seconds * 0.1 + 0.35, args.video_seconds * 0.7)
+            for layout in overlay.LAYOUTS:
+                bench_overlay(video_path, min(args.video_seconds, 20), layout)
+
+    if args.json:
+        save_results(args.json, args)
+    if args.baseline and compare_results(args.baseline, args.tolerance):
+        sys.exit(1)
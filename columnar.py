@@ -0,0 +1,84 @@
+# This module stores DataFrames in a binary columnar layout that can be memory-mapped back
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+META_FILE = 'meta.json'
+
+def save_frame(df, path):
+    """
+    Saves 'df' to the directory 'path' (created if needed).
+
+    Numeric columns sharing a dtype are stored together as one channel-major block
+    (shape: columns x rows), so every channel is contiguous on disk. Other columns
+    (datetime, text) get one .npy file each.
+
+    params:
+
+    df : DataFrame -> data to be saved;
+    path : string -> destination directory
+
+    returns:
+
+    nbytes : int -> size of the saved arrays in bytes
+    """
+    os.makedirs(path, exist_ok=True)
+    meta = {'columns': [str(col) for col in df.columns], 'n_rows': len(df), 'blocks': [], 'arrays': {}}
+    nbytes = 0
+
+    numeric = df.select_dtypes(include='number')
+    for dtype in dict.fromkeys(numeric.dtypes):
+        cols = [col for col in numeric.columns if numeric[col].dtype == dtype]
+        fname = f'block_{len(meta["blocks"])}.npy'
+        block = np.ascontiguousarray(numeric[cols].to_numpy(dtype=dtype).T)
+        np.save(os.path.join(path, fname), block)
+        meta['blocks'].append({'file': fname, 'columns': cols})
+        nbytes += block.nbytes
+
+    for i, col in enumerate(df.columns):
+        if col in numeric.columns:
+            continue
+        values = df[col].to_numpy()
+        if values.dtype == object:
+            values = values.astype(str)
+        fname = f'array_{i}.npy'
+        np.save(os.path.join(path, fname), values)
+        meta['arrays'][col] = fname
+        nbytes += values.nbytes
+
+    if not isinstance(df.index, pd.RangeIndex) or df.index.start != 0 or df.index.step != 1:
+        np.save(os.path.join(path, 'index.npy'), df.index.to_numpy())
+        meta['index'] = 'index.npy'
+
+    # Metadata is written last: a directory without it is an incomplete save
+    with open(os.path.join(path, META_FILE), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False)
+
+    return nbytes
+
+def load_frame(path, mmap=True):
+    """
+    Loads a DataFrame saved by save_frame.
+
+    With 'mmap' the columns are copy-on-write memory maps of the files, so nothing is read
+    until it is used and the cache files are never modified.
+    """
+    with open(os.path.join(path, META_FILE), encoding='utf-8') as f:
+        meta = json.load(f)
+    mode = 'c' if mmap else None
+
+    arrays = {}
+    for block in meta['blocks']:
+        values = np.load(os.path.join(path, block['file']), mmap_mode=mode)
+        for i, col in enumerate(block['columns']):
+            arrays[col] = values[i]
+    for col, fname in meta['arrays'].items():
+        arrays[col] = np.load(os.path.join(path, fname), mmap_mode=mode)
+
+    index = np.load(os.path.join(path, meta['index'])) if 'index' in meta else pd.RangeIndex(meta['n_rows'])
+
+    # A dict of arrays with copy=False keeps one block per column, without consolidating (copying) them
+    return pd.DataFrame({col: arrays[col] for col in meta['columns']}, index=index, copy=False)
@@ -0,0 +1,254 @@
+# This module finds impacts/jumps on the acceleration and indexes them by time for navigation
+
+import argparse
+import os
+
+import cv2
+import numpy as np
+import pandas as pd
+
+import alignment
+import columnar
+import sensordataIO
+import videoindex
+
+class EventIndex:
+    """
+    Events sorted by time (they never overlap), queried by binary searches.
+
+    params:
+
+    start, peak, end : array -> times (s) of the start, the highest point and the end of each event;
+    magnitude : array -> signal at the peak (g above the baseline);
+    prominence : array -> peak height above the higher of its bases (lowest signal between it and the closest
+                          higher peak on each side)
+    """
+
+    def __init__(self, start, peak, end, magnitude, prominence):
+        self.start = np.asarray(start, dtype=np.float64)
+        self.peak = np.asarray(peak, dtype=np.float64)
+        self.end = np.asarray(end, dtype=np.float64)
+        self.magnitude = np.asarray(magnitude, dtype=np.float64)
+        self.prominence = np.asarray(prominence, dtype=np.float64)
+
+    def __len__(self):
+        return len(self.start)
+
+    def between(self, t0, t1):
+        """
+        Positions [i0, i1) of the events overlapping [t0, t1]
+        """
+        return int(np.searchsorted(self.end, t0, side='left')), int(np.searchsorted(self.start, t1, side='right'))
+
+    def next_after(self, t):
+        """
+        Position of the first event peaking after 't', or None
+        """
+        i = int(np.searchsorted(self.peak, t, side='right'))
+        return i if i < len(self) else None
+
+    def previous_before(self, t):
+        """
+        Position of the last event peaking before 't', or None
+        """
+        i = int(np.searchsorted(self.peak, t, side='left')) - 1
+        return i if i >= 0 else None
+
+    def shifted(self, offset):
+        """
+        Same events with 'offset' subtracted from the times (e.g. on the time base of a cut)
+        """
+        return EventIndex(self.start - offset, self.peak - offset, self.end - offset, self.magnitude, self.prominence)
+
+    def to_frame(self):
+        return pd.DataFrame({'start': self.start, 'peak': self.peak, 'end': self.end,
+                             'magnitude': self.magnitude, 'prominence': self.prominence}, copy=False)
+
+    def save(self, path):
+        """
+        Saves the events on the columnar format
+        """
+        return columnar.save_frame(self.to_frame(), path)
+
+def acceleration_magnitude(df, columns=alignment.ACC_COLUMNS):
+    """
+    |acceleration| of each sample (float32 to halve the memory of long recordings)
+    """
+    magnitude = np.zeros(len(df), dtype=np.float32)
+    for col in columns:
+        values = df[col].to_numpy(dtype=np.float32)
+        magnitude += values * values
+    return np.sqrt(magnitude, out=magnitude)
+
+def search_bases(peak_values, gaps):
+    """
+    Lowest signal between each peak and the closest previous peak higher than it (or the start of the
+    signal), with one stack of the peaks not yet exceeded.
+
+    params:
+
+    peak_values : array -> peaks in scan order;
+    gaps : array -> lowest signal between peaks i - 1 and i (between the start and peak 0 for i = 0)
+
+    returns:
+
+    bases : array
+    """
+    bases = np.empty(len(peak_values))
+    # [peak value, lowest signal from that peak to the one above it on the stack]
+    stack = []
+    lowest = np.inf
+    for i, (value, gap) in enumerate(zip(peak_values.tolist(), gaps.tolist())):
+        lowest = min(lowest, gap)
+        low = gap
+        while stack and stack[-1][0] <= value:
+            low = min(low, stack.pop()[1])
+        if stack:
+            low = min(low, stack[-1][1])
+            stack[-1][1] = low
+            bases[i] = low
+        else:
+            bases[i] = lowest
+        stack.append([value, np.inf])
+    return bases
+
+def peak_prominence(signal, peaks):
+    """
+    Prominence of the local maxima 'peaks' (sorted indices, which must include every local maximum
+    higher than the lowest of them): height above the higher of the two bases, the lowest signal
+    between the peak and the closest higher one on each side (or the end of the signal)
+    """
+    peak_values = signal[peaks].astype(np.float64)
+    # Lowest signal from each peak to the next one (the last one: to the end of the signal)
+    gap_min = np.minimum.reduceat(signal, peaks).astype(np.float64)
+    head = signal[:peaks[0] + 1].min()
+    left = search_bases(peak_values, np.concatenate([[head], gap_min[:-1]]))
+    right = search_bases(peak_values[::-1], gap_min[::-1])[::-1]
+    return peak_values - np.maximum(left, right)
+
+def detect_events(t, signal, high=1.0, low=0.3, min_prominence=0.5, min_gap=0.1, min_duration=0.0):
+    """
+    Finds events with hysteresis: an event is a run of samples above 'low' that reaches 'high'.
+    Runs separated by less than 'min_gap' seconds are merged first. Then every local maximum from
+    'high' up is a peak candidate, kept when its prominence reaches 'min_prominence'; a run with
+    several kept peaks is split at the lowest sample between each pair of them. Runs and candidates
+    are found on whole arrays; only the prominence walks the candidates, with a stack.
+
+    params:
+
+    t : array -> sorted sample times (s);
+    signal : array -> non negative signal (e.g. |acceleration| - gravity);
+    high, low : float -> thresholds that start and sustain an event;
+    min_prominence : float -> smallest peak prominence;
+    min_gap, min_duration : float -> seconds
+
+    returns:
+
+    events : EventIndex
+    """
+    empty = EventIndex(*[np.empty(0)] * 5)
+    above = signal > low
+    change = np.flatnonzero(np.diff(above.view(np.int8)))
+    starts = change[~above[change]] + 1
+    ends = change[above[change]] + 1
+    if len(signal) and above[0]:
+        starts = np.concatenate([[0], starts])
+    if len(signal) and above[-1]:
+        ends = np.concatenate([ends, [len(signal)]])
+    if not len(starts):
+        return empty
+
+    # Runs closer than min_gap become one
+    if min_gap > 0 and len(starts) > 1:
+        joined = t[starts[1:]] - t[ends[:-1] - 1] < min_gap
+        keep_start = np.concatenate([[True], ~joined])
+        keep_end = np.concatenate([~joined, [True]])
+        starts, ends = starts[keep_start], ends[keep_end]
+
+    # Local maxima from 'high' up (first sample of a plateau), inside a run
+    padded = np.concatenate([[-np.inf], signal, [-np.inf]])
+    peaks = np.flatnonzero((signal >= high) & (signal > padded[:-2]) & (signal >= padded[2:]))
+    run_of = np.searchsorted(starts, peaks, side='right') - 1
+    inside = (run_of >= 0) & (peaks < ends[np.maximum(run_of, 0)])
+    peaks, run_of = peaks[inside], run_of[inside]
+    if not len(peaks):
+        return empty
+
+    prominence = peak_prominence(signal, peaks)
+    keep = prominence >= min_prominence
+    peaks, run_of, prominence = peaks[keep], run_of[keep], prominence[keep]
+    if not len(peaks):
+        return empty
+
+    # Each event spans its run, split at the valleys between kept peaks of the same run
+    event_start, event_end = starts[run_of], ends[run_of]
+    for i in np.flatnonzero(run_of[1:] == run_of[:-1]):
+        valley = peaks[i] + int(np.argmin(signal[peaks[i]:peaks[i + 1]]))
+        event_end[i], event_start[i + 1] = valley, valley
+
+    keep = t[event_end - 1] - t[event_start] >= min_duration
+    peaks, event_start, event_end = peaks[keep], event_start[keep], event_end[keep]
+    return EventIndex(t[event_start], t[peaks], t[event_end - 1], signal[peaks], prominence[keep])
+
+def impact_signal(df, columns=alignment.ACC_COLUMNS, baseline_stride=16):
+    """
+    Deviation of the acceleration magnitude from its median (gravity, for a sensor mostly at rest or
+    in steady motion). The median is taken on every 'baseline_stride'-th sample.
+    """
+    magnitude = acceleration_magnitude(df, columns)
+    baseline = np.median(magnitude[::baseline_stride])
+    magnitude -= baseline
+    return np.abs(magnitude, out=magnitude)
+
+def find_events(df, columns=alignment.ACC_COLUMNS, time_col='seconds_passed', **kwargs):
+    """
+    Events of the acceleration 'columns' of 'df' (see detect_events for the thresholds, in g)
+    """
+    return detect_events(df[time_col].to_numpy(dtype=np.float64), impact_signal(df, columns), **kwargs)
+
+def save_snapshots(video_path, frames, out_dir):
+    """
+    Saves the given video frames as JPEG files on 'out_dir'
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    cap = cv2.VideoCapture(video_path)
+    paths = []
+    for number in frames:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, int(number))
+        ret, frame = cap.read()
+        if ret:
+            paths.append(os.path.join(out_dir, f'event_{int(number):07d}.jpg'))
+            cv2.imwrite(paths[-1], frame)
+    cap.release()
+    return paths
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Lists the impacts/jumps of a WIT sensor log")
+    parser.add_argument('sensor', help="sensor .txt log")
+    parser.add_argument('--high', type=float, default=1.0, help="threshold that starts an event (g)")
+    parser.add_argument('--low', type=float, default=0.3, help="threshold that sustains an event (g)")
+    parser.add_argument('--prominence', type=float, default=0.5, help="smallest peak prominence (g)")
+    parser.add_argument('--from', dest='t0', type=float, default=None, help="only events after this time (s)")
+    parser.add_argument('--to', dest='t1', type=float, default=None, help="only events before this time (s)")
+    parser.add_argument('--out', default=None, help="saves the events (columnar format)")
+    parser.add_argument('--video', default=None, help="video of the log: prints the frame of each peak")
+    parser.add_argument('--offset', type=float, default=0.0,
+                        help="sensor time = video time + offset (see alignment.estimate_offset)")
+    parser.add_argument('--snapshots', default=None, help="saves the video frame of each peak on this directory")
+    args = parser.parse_args()
+
+    dropped = [col for col in sensordataIO.METADATA_COLUMNS if col in sensordataIO.read_header(args.sensor)]
+    df = sensordataIO.read_data(args.sensor, *dropped, groupMethod='noGroup')
+    events = find_events(df, high=args.high, low=args.low, min_prominence=args.prominence)
+    i0, i1 = events.between(-np.inf if args.t0 is None else args.t0, np.inf if args.t1 is None else args.t1)
+    table = events.to_frame().iloc[i0:i1].copy()
+
+    if args.video:
+        frame_index = videoindex.load_frame_index(args.video)
+        table['frame'] = frame_index.frame_from(table['peak'].to_numpy() - args.offset)
+        if args.snapshots:
+            save_snapshots(args.video, table['frame'], args.snapshots)
+    print(table.to_string(float_format=lambda x: f"{x:.3f}"))
+    print(f"{len(table)} eventos")
+    if args.out:
+        events.save(args.out)
@@ -0,0 +1,144 @@
+# This module computes sliding window statistics of the sensor channels (time and frequency domain)
+
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+import columnar
+import sensordataIO
+
+CHANNELS = ['AccX(g)', 'AccY(g)', 'AccZ(g)', 'AsX(°/s)', 'AsY(°/s)', 'AsZ(°/s)']
+
+# Frequency bands (Hz) of the band power features, [low, high)
+BANDS = [(0, 1), (1, 3), (3, 8), (8, 20), (20, 50)]
+
+def window_features(x, rate, window, step, bands=BANDS, batch_windows=2048):
+    """
+    Features of every window of 'window' samples, taken each 'step' samples, of the channels in 'x'.
+
+    Windows are strided views of the channels (no copies); the derivatives and the spectra are computed
+    per batch of 'batch_windows' windows (one rfft per batch, on the Hann tapered windows without their mean).
+
+    params:
+
+    x : array -> channel-major samples (channels x samples);
+    rate : float -> sampling rate (Hz);
+    bands : list -> (low, high) Hz of the band power features
+
+    returns:
+
+    features : dict -> name -> array (channels x windows): rms, peak, jerk (rms of the derivative),
+                       dom_freq (Hz, peak of the spectrum without DC) and one power per band
+    """
+    views = sliding_window_view(x, window, axis=1)[:, ::step]
+    n_windows = views.shape[1]
+
+    features = {
+        'rms': np.sqrt(np.einsum('cwn,cwn->cw', views, views, dtype=np.float64) / window),
+        'peak': np.maximum(views.max(axis=2), -views.min(axis=2)),
+    }
+
+    # One-sided power spectral density, so the power of a band is its sum times the bin width
+    taper = np.hanning(window)
+    freqs = np.fft.rfftfreq(window, 1 / rate)
+    scale = 2 / (rate * np.sum(taper ** 2)) * (rate / window)
+    edges = [(np.searchsorted(freqs, low), np.searchsorted(freqs, high)) for low, high in bands]
+    features['jerk'] = np.empty((len(x), n_windows))
+    features['dom_freq'] = np.empty((len(x), n_windows))
+    for low, high in bands:
+        features[f'band_{low:g}-{high:g}Hz'] = np.empty((len(x), n_windows))
+
+    for start in range(0, n_windows, batch_windows):
+        batch = views[:, start:start + batch_windows]
+        end = start + batch.shape[1]
+        jerk = batch[:, :, 1:] - batch[:, :, :-1]
+        features['jerk'][:, start:end] = np.sqrt(np.einsum('cwn,cwn->cw', jerk, jerk, dtype=np.float64)
+                                                 / (window - 1)) * rate
+        batch = (batch - batch.mean(axis=2, keepdims=True)) * taper
+        power = np.fft.rfft(batch, axis=2)
+        power = (power.real ** 2 + power.imag ** 2) * scale
+        features['dom_freq'][:, start:end] = freqs[1:][power[:, :, 1:].argmax(axis=2)]
+        for (low, high), (i0, i1) in zip(bands, edges):
+            features[f'band_{low:g}-{high:g}Hz'][:, start:end] = power[:, :, i0:i1].sum(axis=2)
+    return features
+
+def sampling_rate(t):
+    """
+    Average sampling rate (Hz) of the sorted times 't'
+    """
+    if len(t) < 2 or t[-1] <= t[0]:
+        raise ValueError("São necessárias ao menos duas amostras com tempos distintos")
+    return (len(t) - 1) / (t[-1] - t[0])
+
+def extract_features(df, channels=None, window=2.0, step=1.0, bands=BANDS, workers=None,
+                     time_col='seconds_passed'):
+    """
+    Sliding window features of all 'channels' of 'df' (uniformly sampled, e.g. read_data with
+    groupMethod='noGroup' or resampled). Long recordings are split on chunks of windows computed on
+    a process pool.
+
+    params:
+
+    window, step : float -> window length and hop, in seconds;
+    workers : int -> number of processes (default: CPUs, 1 computes on this process)
+
+    returns:
+
+    features : DataFrame -> one row per window: its start time ('start', s) and one column per
+                            channel and feature ('<channel>_<feature>')
+    """
+    if channels is None:
+        channels = [col for col in CHANNELS if col in df.columns]
+    t = df[time_col].to_numpy()
+    rate = sampling_rate(t)
+    window_n = max(int(round(window * rate)), 2)
+    step_n = max(int(round(step * rate)), 1)
+    if len(df) < window_n:
+        raise ValueError(f"A janela de {window}s é maior que os dados")
+
+    x = np.stack([df[col].to_numpy() for col in channels])
+    n_windows = (x.shape[1] - window_n) // step_n + 1
+    workers = workers or os.cpu_count() or 1
+
+    # Each chunk gets the samples of its windows only
+    n_chunks = min(workers * 4, n_windows) if workers > 1 else 1
+    bounds = np.linspace(0, n_windows, n_chunks + 1).astype(int)
+    chunks = [x[:, w0 * step_n:(w1 - 1) * step_n + window_n] for w0, w1 in zip(bounds[:-1], bounds[1:])]
+    if n_chunks == 1:
+        parts = [window_features(chunk, rate, window_n, step_n, bands) for chunk in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(window_features, chunks, *zip(*[(rate, window_n, step_n, bands)] * len(chunks))))
+
+    data = {'start': t[np.arange(n_windows) * step_n]}
+    for name in parts[0]:
+        values = np.concatenate([part[name] for part in parts], axis=1)
+        for i, col in enumerate(channels):
+            data[f'{col}_{name}'] = values[i]
+    return pd.DataFrame(data, copy=False)
+
+def save_features(features, path):
+    """
+    Saves the features on the columnar format (columnar.load_frame reads them back memory-mapped)
+    """
+    return columnar.save_frame(features, path)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Computes sliding window features of a WIT sensor log")
+    parser.add_argument('sensor', help="sensor .txt log")
+    parser.add_argument('--out', default=None, help="output directory (default: <log>_features)")
+    parser.add_argument('--window', type=float, default=2.0, help="window length (s)")
+    parser.add_argument('--step', type=float, default=1.0, help="hop between windows (s)")
+    parser.add_argument('--workers', type=int, default=None, help="number of processes (default: CPUs)")
+    args = parser.parse_args()
+
+    dropped = [col for col in sensordataIO.METADATA_COLUMNS if col in sensordataIO.read_header(args.sensor)]
+    df = sensordataIO.read_data(args.sensor, *dropped, groupMethod='noGroup')
+    features = extract_features(df, window=args.window, step=args.step, workers=args.workers)
+    out = args.out or os.path.splitext(args.sensor)[0] + '_features'
+    save_features(features, out)
+    print(f"{len(features)} janelas x {len(features.columns) - 1} features salvas em {out}")
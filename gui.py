@@ -1,14 +1,69 @@
 import tkinter as tk
-from tkinter import filedialog, messagebox
+from tkinter import filedialog, messagebox, simpledialog
 from threading import Thread
 import cv2
+import numpy as np
 from PIL import Image, ImageTk
 import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
 import time
 
-import actionstart as action_start
+import alignment
+import events as sensor_events
+import livestream
+import lod
+import overlay
+import perfstats
+import playback
+import plotting
 import sensordataIO as sensor_data
+import sensorstore
+import session as sensor_session
+import thumbnails
+import videoindex as video_index
+
+# Tempo parado na barra de rolagem antes de decodificar o frame exato
+PREVIEW_DEBOUNCE_MS = 120
+
+# Taxa máxima de atualização do gráfico ao vivo
+LIVE_MAX_FPS = 20
+
+# Intervalo de atualização do painel de desempenho
+PERF_OVERLAY_MS = 500
+
+# Tamanho (largura, altura) da pré-visualização do corte do vídeo
+PREVIEW_SIZE = (400, 300)
+
+# Canais lidos ao carregar os dados (eventos e sincronização); os demais são lidos quando marcados
+INITIAL_COLUMNS = alignment.ACC_COLUMNS
+
+class FrameView:
+    """
+    Shows frames on a Tk label at a fixed size. Frames are resized and converted to RGB into buffers
+    allocated once, and pasted into the one PhotoImage kept by the label (no PhotoImage per frame).
+    """
+
+    def __init__(self, label, size):
+        self.label = label
+        self.size = size
+        width, height = size
+        self.resized = np.empty((height, width, 3), dtype=np.uint8)
+        self.rgb = np.empty_like(self.resized)
+        self.photo = None
+
+    def show(self, frame, bgr=False):
+        """
+        Shows 'frame' (RGB, or BGR straight from cv2 with bgr=True) of any size
+        """
+        if frame.shape[:2] != self.rgb.shape[:2] or bgr:
+            frame = playback.convert_frame(frame, self.resized, self.rgb, bgr)
+        image = Image.fromarray(frame)
+        if self.photo is None:
+            self.photo = ImageTk.PhotoImage(image=image)
+            self.label.configure(image=self.photo, width=self.size[0], height=self.size[1])
+        else:
+            self.photo.paste(image)
 
 class VideoGraphApp:
     def __init__(self, root):
@@ -18,8 +73,22 @@ class VideoGraphApp:
         self.video_path = None
         self.data_path = None
         self.cap = None
+        self.frame_index = None
+        self.thumbnails = None
+        self.frame_fetcher = None
+        self.preview_job = None
+        self.preview_polling = False
         self.data = None
+        self.sensor_store = None
+        self.session = None
+        # Canais do arquivo (nem todos lidos ainda) e se self.data é o corte dos dados
+        self.available_columns = []
+        self.cut_applied = False
+        # Impactos detectados nos dados completos e início do corte atual (tempo dos dados completos)
+        self.events = None
+        self.data_offset = 0.0
         self.selected_columns = []
+        self.live_views = []
 
         self.running = False
         self.paused = False
@@ -67,54 +136,153 @@ class VideoGraphApp:
             self.cap = cv2.VideoCapture(self.video_path)
             ret, frame = self.cap.read()
             if ret:
-                self.total_frames = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
-                self.fps = self.cap.get(cv2.CAP_PROP_FPS)
-                frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                frame = cv2.resize(frame, (400, 300))  # Redimensiona o frame para caber na tela
-                img = Image.fromarray(frame)
-                imgtk = ImageTk.PhotoImage(image=img)
-                self.frames[VideoCutFrame].video_preview.imgtk = imgtk
-                self.frames[VideoCutFrame].video_preview.configure(image=imgtk, width=400, height=300)
+                # Índice de timestamps reais (PTS), salvo ao lado do vídeo
+                self.frame_index = video_index.load_frame_index(self.video_path)
+                self.total_frames = len(self.frame_index)
+                self.fps = self.frame_index.fps
+
+                # Miniaturas geradas em segundo plano para a barra de rolagem; frames exatos em outra thread
+                self.stop_previews()
+                self.thumbnails = thumbnails.ThumbnailCache(self.video_path, self.frame_index)
+                self.thumbnails.start()
+                self.frame_fetcher = thumbnails.FrameFetcher(self.video_path, self.frame_index, PREVIEW_SIZE)
+
+                self.show_preview(frame, bgr=True)
                 self.frames[VideoCutFrame].scale.config(to=self.total_frames - 1)
                 self.frames[VideoCutFrame].scale.set(0)
                 self.update_video_time_label(0)
 
+    def show_preview(self, frame, bgr=False):
+        # Redimensiona o frame para caber na tela, reaproveitando os buffers e a imagem do Tk
+        self.frames[VideoCutFrame].preview_view.show(frame, bgr)
+
     def update_video_preview_at_frame(self, frame_index):
-        if self.cap and self.cap.isOpened():
-            self.cap.set(cv2.CAP_PROP_POS_FRAMES, frame_index)
-            ret, frame = self.cap.read()
-            if ret:
-                frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                frame = cv2.resize(frame, (400, 300))
-                img = Image.fromarray(frame)
-                imgtk = ImageTk.PhotoImage(image=img)
-                self.frames[VideoCutFrame].video_preview.imgtk = imgtk
-                self.frames[VideoCutFrame].video_preview.configure(image=imgtk, width=400, height=300)
-                self.update_video_time_label(frame_index)
+        """
+        Shows the cached thumbnail closest to 'frame_index' at once and, once the slider rests for
+        PREVIEW_DEBOUNCE_MS, asks the exact frame to the fetcher thread
+        """
+        if self.frame_fetcher is None:
+            return
+        self.update_video_time_label(frame_index)
+        nearest = self.thumbnails.nearest(frame_index)
+        if nearest is not None:
+            self.show_preview(nearest[1])
+
+        if self.preview_job is not None:
+            self.root.after_cancel(self.preview_job)
+        self.preview_job = self.root.after(PREVIEW_DEBOUNCE_MS, self.refine_preview, frame_index)
+
+    def refine_preview(self, frame_index):
+        self.preview_job = None
+        self.frame_fetcher.request(frame_index)
+        if not self.preview_polling:
+            self.preview_polling = True
+            self.poll_preview()
+
+    def poll_preview(self):
+        # Só o frame pedido por último é exibido; resultados antigos são descartados pelo fetcher
+        busy = self.frame_fetcher.busy()
+        result = self.frame_fetcher.take()
+        if result is not None and result[0] == self.frames[VideoCutFrame].scale.get():
+            self.show_preview(result[1])
+        if busy:
+            self.root.after(15, self.poll_preview)
+        else:
+            self.preview_polling = False
+
+    def stop_previews(self):
+        if self.preview_job is not None:
+            self.root.after_cancel(self.preview_job)
+            self.preview_job = None
+        if self.thumbnails is not None:
+            self.thumbnails.stop()
+        if self.frame_fetcher is not None:
+            self.frame_fetcher.close()
 
     def update_video_time_label(self, frame_index):
-        if hasattr(self, 'fps') and self.fps:
-            seconds = frame_index / self.fps
+        if self.frame_index is not None:
+            seconds = self.frame_index.time_of(frame_index)
             self.frames[VideoCutFrame].time_label.config(text=f"Tempo: {seconds:.2f} s")
 
+    def video_time(self, frame_index):
+        """
+        Time of 'frame_index' since the start of the video cut, i.e. on the time base of the cut sensor data
+        """
+        return float(self.frame_index.time_of(frame_index)) - self.video_start
+
     def load_data(self):
-        path = filedialog.askopenfilename(filetypes=[("TXT", "*.txt"),
-                                                    ("Todos os arquivos", "*.*")])
-        if path:
-            self.data_path = path
+        # Vários arquivos: sensores gravando ao mesmo tempo, alinhados numa base de tempo comum
+        paths = filedialog.askopenfilenames(filetypes=[("TXT", "*.txt"),
+                                                       ("Todos os arquivos", "*.*")])
+        if paths:
+            self.data_path = paths[0]
             try:
-                self.data = sensor_data.read_data(path, 'DeviceName', 'Version()', 'Battery level(%)')
-                available_cols = [col for col in self.data.columns if col not in ['time', 'seconds_passed']]
+                if len(paths) > 1:
+                    sync = messagebox.askyesno("Vários sensores",
+                                               "Corrigir a diferença entre os relógios dos sensores pela aceleração?")
+                    self.session = sensor_session.load_session(list(paths), sync=sync)
+                    self.sensor_store = self.session.to_store()
+                    self.data = self.sensor_store.to_frame()
+                    self.available_columns = [col for col in self.data.columns if col not in ['time', 'seconds_passed']]
+                else:
+                    self.session = None
+                    header = sensor_data.read_header(paths[0])
+                    self.available_columns = [col for col in header if col and col not in sensor_data.TEXT_COLUMNS
+                                              and col not in sensor_data.METADATA_COLUMNS]
+                    # Só os canais iniciais e os já selecionados são lidos agora
+                    columns = [col for col in self.available_columns
+                               if col in INITIAL_COLUMNS or col in self.selected_columns]
+                    self.data = sensor_data.read_data(paths[0], columns=columns or self.available_columns)
+                    # Dados completos; cada aplicação dos cortes parte deles (fatias, sem cópias)
+                    self.sensor_store = sensorstore.SensorStore.from_frame(self.data)
+                self.cut_applied = False
+                self.events = self.find_events()
                 
                 # Atualiza visualizações
                 self.frames[DataCutFrame].update_graph()
-                self.frames[MainViewFrame].update_column_selector(available_cols)
+                self.frames[MainViewFrame].update_column_selector(self.available_columns)
                 self.frames[MainViewFrame].show_graph()
 
             except Exception as e:
                 messagebox.showerror("Erro ao carregar dados", f"Erro: {str(e)}")
 
 
+    def load_columns(self, columns):
+        """
+        Reads the channels of 'columns' not loaded yet (only those fields of the file, see sensordataIO.read_columns)
+        into the full data and the current cut. Returns False if they could not be read.
+        """
+        missing = [col for col in columns if self.sensor_store is not None and col not in self.sensor_store.columns]
+        if not missing:
+            return True
+        try:
+            loaded = sensor_data.read_columns(self.data_path, missing)
+        except Exception as e:
+            messagebox.showerror("Erro ao carregar dados", f"Erro: {str(e)}")
+            return False
+        for col in missing:
+            self.sensor_store.columns[col] = loaded[col].to_numpy()
+
+        if self.cut_applied:
+            self.data = self.sensor_store.cut(self.data_start, self.data_duration).to_frame()
+        else:
+            self.data = self.sensor_store.to_frame()
+        return True
+
+    def acc_columns(self):
+        """
+        Acceleration columns of the data (of the first device, on sessions with several sensors)
+        """
+        if self.session is not None:
+            return [self.session.name(self.session.devices()[0], col) for col in alignment.ACC_COLUMNS]
+        return alignment.ACC_COLUMNS
+
+    def find_events(self):
+        columns = self.acc_columns()
+        if not all(col in self.data.columns for col in columns):
+            return None
+        return sensor_events.find_events(self.data, columns)
+
     def apply_cuts(self):
         try:
             self.video_start = float(self.entry_video_start.get() or 0)
@@ -129,10 +297,11 @@ class VideoGraphApp:
                 messagebox.showerror("Erro", "Erro ao abrir o vídeo.")
                 return False
 
-            fps = full_video.get(cv2.CAP_PROP_FPS)
-            total_frames = int(full_video.get(cv2.CAP_PROP_FRAME_COUNT))
-            start_frame = int(self.video_start * fps)
-            self.end_frame = int((self.video_start + self.video_duration) * fps) if self.video_duration else total_frames
+            self.start_frame = start_frame = int(self.frame_index.frame_from(self.video_start))
+            if self.video_duration:
+                self.end_frame = int(self.frame_index.frame_from(self.video_start + self.video_duration))
+            else:
+                self.end_frame = len(self.frame_index)
 
             self.cap = full_video
             self.cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
@@ -144,36 +313,88 @@ class VideoGraphApp:
             messagebox.showerror("Erro", "Os tempos de corte dos dados devem ser números.")
             return False
 
-        if self.data is not None:
-            self.data = action_start.make_cuts_sensor(self.data, self.data_start, self.data_duration)
+        if self.sensor_store is not None:
+            cut = self.sensor_store.cut(self.data_start, self.data_duration)
+            self.data = cut.to_frame()
+            self.data_offset = cut.offset
+            self.cut_applied = True
 
         return True
 
-    def on_close(self):
-        if self.cap:
-            self.cap.release()
-        self.root.quit()
+    def auto_sync(self):
+        """
+        Estimates the video/sensor offset on a background thread (the video is decoded) and fills the start of
+        the data cut with it, for the video cut typed on the first step
+        """
+        if self.video_path is None or self.sensor_store is None:
+            messagebox.showwarning("Aviso", "Carregue o vídeo e os dados antes de sincronizar.")
+            return
+        try:
+            video_start = float(self.entry_video_start.get() or 0)
+            video_duration = float(self.entry_video_duration.get()) if self.entry_video_duration.get() else None
+        except ValueError:
+            messagebox.showerror("Erro", "Os tempos de corte do vídeo devem ser números.")
+            return
 
-class VideoCutFrame(tk.Frame):
-    def __init__(self, parent, controller):
-        super().__init__(parent)
-        self.controller = controller
+        # Com vários sensores, a aceleração do primeiro é comparada com o vídeo
+        columns = self.acc_columns()
 
-        tk.Label(self, text="Etapa 1: Corte do Vídeo").pack(pady=10)
-        tk.Button(self, text="Carregar Vídeo", command=controller.load_video).pack(pady=5)
+        result = {}
+        def estimate():
+            try:
+                result['offset'] = alignment.estimate_offset(self.video_path, self.sensor_store.to_frame(), video_start,
+                                                             video_duration, frame_index=self.frame_index,
+                                                             columns=columns)
+            except Exception as e:
+                result['error'] = e
 
-        tk.Label(self, text="Início vídeo (s):").pack()
-        controller.entry_video_start = tk.Entry(self)
-        controller.entry_video_start.pack()
+        worker = Thread(target=estimate, daemon=True)
+        worker.start()
+        self.frames[DataCutFrame].sync_label.config(text="Sincronizando...")
+        self.root.after(100, self.check_auto_sync, worker, result, video_start)
 
-        tk.Label(self, text="Duração vídeo (s):").pack()
-        controller.entry_video_duration = tk.Entry(self)
-        controller.entry_video_duration.pack()
+    def check_auto_sync(self, worker, result, video_start):
+        # Tk só é acessado pela thread principal: o resultado é verificado periodicamente
+        if worker.is_alive():
+            self.root.after(100, self.check_auto_sync, worker, result, video_start)
+            return
+        label = self.frames[DataCutFrame].sync_label
+        if 'error' in result:
+            label.config(text="")
+            messagebox.showerror("Erro na sincronização", f"Erro: {str(result['error'])}")
+            return
 
-        self.video_preview = tk.Label(self, width=400, height=300)
-        self.video_preview.pack(pady=10)
+        lag, confidence = result['offset']
+        data_start = video_start + lag
+        if data_start < 0:
+            # Os dados começam depois do início do corte do vídeo: o vídeo passa a começar junto com os dados
+            video_start, data_start = -lag, 0.0
+            self.entry_video_start.delete(0, tk.END)
+            self.entry_video_start.insert(0, f"{video_start:.3f}")
+        self.entry_data_start.delete(0, tk.END)
+        self.entry_data_start.insert(0, f"{data_start:.3f}")
+        label.config(text=f"Deslocamento: {lag:+.3f} s (confiança {confidence:.2f})")
+
+    def open_live(self):
+        spec = simpledialog.askstring("Ao vivo", "Arquivo sendo gravado, porta serial ou host:porta:",
+                                      parent=self.root)
+        if not spec:
+            return
+        try:
+            source = livestream.open_source(spec)
+        except (OSError, ImportError, ValueError) as e:
+            messagebox.showerror("Erro", f"Erro ao abrir {spec}: {e}")
+            return
+        self.live_views.append(LiveView(self.root, livestream.LiveStream(source), spec))
 
-        tk.Button(self, text="Próximo", command=lambda: controller.show_frame(DataCutFrame)).pack(pady=10)
+    def on_close(self):
+        self.frames[MainViewFrame].stop_playback()
+        self.stop_previews()
+        for view in self.live_views:
+            view.close()
+        if self.cap:
+            self.cap.release()
+        self.root.quit()
 
 class VideoCutFrame(tk.Frame):
     def __init__(self, parent, controller):
@@ -191,8 +412,9 @@ class VideoCutFrame(tk.Frame):
         controller.entry_video_duration = tk.Entry(self)
         controller.entry_video_duration.pack()
 
-        self.video_preview = tk.Label(self, width=400, height=300)
+        self.video_preview = tk.Label(self, width=PREVIEW_SIZE[0], height=PREVIEW_SIZE[1])
         self.video_preview.pack(pady=10)
+        self.preview_view = FrameView(self.video_preview, PREVIEW_SIZE)
 
         # Barra de rolagem de tempo (slider)
         self.scale = tk.Scale(self, from_=0, to=100, orient=tk.HORIZONTAL, length=400,
@@ -221,6 +443,14 @@ class DataCutFrame(tk.Frame):
         controller.entry_data_duration = tk.Entry(self)
         controller.entry_data_duration.pack()
 
+        # Deslocamento estimado pela correlação entre o movimento do vídeo e a aceleração
+        tk.Button(self, text="Sincronizar automaticamente", command=controller.auto_sync).pack(pady=5)
+        self.sync_label = tk.Label(self, text="")
+        self.sync_label.pack()
+
+        # Gráfico dos dados enquanto o sensor grava
+        tk.Button(self, text="Ao vivo...", command=controller.open_live).pack(pady=5)
+
         # Frame para listbox + gráfico
         self.bottom_frame = tk.Frame(self)
         self.bottom_frame.pack(fill=tk.BOTH, expand=True, pady=10)
@@ -237,6 +467,7 @@ class DataCutFrame(tk.Frame):
         # Cria a figura matplotlib
         self.fig, self.ax = plt.subplots(figsize=(5, 3))
         self.canvas = FigureCanvasTkAgg(self.fig, master=self.graph_frame)
+        NavigationToolbar2Tk(self.canvas, self.graph_frame)
         self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
 
         tk.Button(self, text="Próximo", command=lambda: controller.show_frame(MainViewFrame)).pack(pady=10)
@@ -248,23 +479,24 @@ class DataCutFrame(tk.Frame):
     def update_column_selector(self):
         if self.controller.data is not None:
             self.listbox.delete(0, tk.END)
-            available_cols = [col for col in self.controller.data.columns if col not in ['time', 'seconds_passed']]
-            for col in available_cols:
+            for col in self.controller.available_columns:
                 self.listbox.insert(tk.END, col)
 
     def preview_data_plot_from_selection(self):
-        data = self.controller.data
-        if data is None:
+        if self.controller.data is None:
             return
         selected_cols = self.get_selected_columns()
         if not selected_cols:
             self.ax.clear()
             self.canvas.draw()
             return
+        # Canais marcados pela primeira vez são lidos agora
+        if not self.controller.load_columns(selected_cols):
+            return
+        data = self.controller.data
 
         self.ax.clear()
-        for col in selected_cols:
-            self.ax.plot(data['seconds_passed'], data[col], label=col)
+        lod.plot_columns(self.ax, data, selected_cols)
         self.ax.set_title("Pré-visualização dos Dados")
         self.ax.set_xlabel("Tempo (s)")
         self.ax.set_ylabel("Valor")
@@ -278,9 +510,20 @@ class DataCutFrame(tk.Frame):
 
 
 class MainViewFrame(tk.Frame):
+    # Maior tamanho (largura, altura) do vídeo exibido; os frames são reduzidos na thread de decodificação
+    VIDEO_DISPLAY_SIZE = (640, 480)
+
     def __init__(self, parent, controller):
         super().__init__(parent)
         self.controller = controller
+        self.player = None
+        self.frame_view = None
+        self.slider_percent = None
+        self.current_time = 0.0
+        # Tempos das etapas da reprodução, medidos só com o painel de desempenho ligado
+        self.profiler = perfstats.Profiler(playback.STAGES)
+        self.next_due = None
+        self.last_perf_update = 0.0
 
         self.btn_frame = tk.Frame(self)
         self.btn_frame.pack(fill=tk.X, pady=5)
@@ -291,12 +534,27 @@ class MainViewFrame(tk.Frame):
         self.btn_save_graph = tk.Button(self.btn_frame, text="Salvar Gráfico", command=self.save_graph)
         self.btn_save_graph.pack(side=tk.LEFT, padx=5)
 
+        self.btn_export = tk.Button(self.btn_frame, text="Exportar Vídeo Sincronizado", command=self.export_video)
+        self.btn_export.pack(side=tk.LEFT, padx=5)
+
+        self.fps_label = tk.Label(self.btn_frame, text="")
+        self.fps_label.pack(side=tk.LEFT, padx=5)
+
+        self.show_perf = tk.BooleanVar(value=False)
+        tk.Checkbutton(self.btn_frame, text="Desempenho", variable=self.show_perf,
+                       command=self.toggle_perf).pack(side=tk.LEFT, padx=5)
+        tk.Button(self.btn_frame, text="Salvar Trace", command=self.save_trace).pack(side=tk.LEFT, padx=5)
+
         self.main_frame = tk.Frame(self)
         self.main_frame.pack(fill=tk.BOTH, expand=True)
 
         self.video_label = tk.Label(self.main_frame)
         self.video_label.pack(side=tk.LEFT, padx=10)
 
+        # Painel de desempenho sobre o vídeo
+        self.perf_label = tk.Label(self.main_frame, justify=tk.LEFT, anchor='nw', font=('Courier', 9),
+                                   bg='black', fg='lime')
+
         self.right_panel = tk.Frame(self.main_frame)
         self.right_panel.pack(side=tk.LEFT, padx=10, fill=tk.BOTH, expand=True)
 
@@ -309,6 +567,14 @@ class MainViewFrame(tk.Frame):
                                label="Progresso do vídeo (%)", command=self.seek_video)
         self.slider.pack(pady=10)
 
+        # Navegação pelos impactos detectados na aceleração
+        self.event_frame = tk.Frame(self.right_panel)
+        self.event_frame.pack(pady=5)
+        tk.Button(self.event_frame, text="◀ Evento anterior", command=lambda: self.jump_event(-1)).pack(side=tk.LEFT, padx=5)
+        tk.Button(self.event_frame, text="Próximo evento ▶", command=lambda: self.jump_event(1)).pack(side=tk.LEFT, padx=5)
+        self.event_label = tk.Label(self.right_panel, text="")
+        self.event_label.pack()
+
     def update_column_selector(self, columns):
         self.listbox.delete(0, tk.END)
         for col in columns:
@@ -319,23 +585,18 @@ class MainViewFrame(tk.Frame):
             return
         self.fig, self.ax = plt.subplots(figsize=(5, 4))
         self.graph_canvas = FigureCanvasTkAgg(self.fig, master=self.right_panel)
+        NavigationToolbar2Tk(self.graph_canvas, self.right_panel)
         self.graph_canvas.get_tk_widget().pack()
+        # Linhas desenhadas uma vez; só o cursor de tempo é redesenhado (blitting)
+        self.sync_plot = plotting.CursorPlot(self.ax, self.graph_canvas)
 
     def preview_data_plot_from_selection(self):
-        data = self.controller.data
-        if data is None:
+        if self.controller.data is None:
             return
         selected_cols = self.get_selected_columns()
-        if not selected_cols:
+        if not selected_cols or not self.controller.load_columns(selected_cols):
             return
-        self.ax.clear()
-        for col in selected_cols:
-            self.ax.plot(data['seconds_passed'], data[col], label=col)
-        self.ax.set_title("Pré-visualização das Métricas Selecionadas")
-        self.ax.set_xlabel("Tempo (s)")
-        self.ax.set_ylabel("Valor")
-        self.ax.legend()
-        self.graph_canvas.draw()
+        self.sync_plot.plot(self.controller.data, selected_cols, title="Pré-visualização das Métricas Selecionadas")
 
     def get_selected_columns(self):
         selected = self.listbox.curselection()
@@ -350,93 +611,199 @@ class MainViewFrame(tk.Frame):
             if not self.controller.selected_columns:
                 messagebox.showwarning("Aviso", "Selecione ao menos uma coluna para exibir no gráfico.")
                 return
+            if self.controller.frame_index is None:
+                messagebox.showwarning("Aviso", "Carregue um vídeo antes de iniciar.")
+                return
 
             self.controller.running = True
             self.controller.paused = False
-
-            self.controller.fps = self.controller.cap.get(cv2.CAP_PROP_FPS)
-            if not self.controller.fps or self.controller.fps <= 0 or self.controller.fps > 1000:
-                self.controller.fps = 30
-            self.controller.frame_duration_ms = int(1000 / self.controller.fps)
-
-            self.controller.last_update_time = time.time()
             self.controller.frame_count = 0
 
+            self.stop_playback()
+            self.player = playback.Player(self.controller.video_path, self.controller.frame_index,
+                                          self.display_view().size, profiler=self.profiler)
+            self.player.start(self.controller.start_frame, self.controller.end_frame)
+
             self.update_loop()
             self.btn_control.config(text="Pausar")
         else:
             self.controller.paused = not self.controller.paused
+            if self.controller.paused:
+                self.player.pause()
+            else:
+                self.player.resume()
             self.btn_control.config(text="Retomar" if self.controller.paused else "Pausar")
 
+    def display_size(self):
+        """
+        Size of the displayed video: the source size reduced to fit VIDEO_DISPLAY_SIZE, keeping the aspect ratio
+        """
+        width = self.controller.cap.get(cv2.CAP_PROP_FRAME_WIDTH)
+        height = self.controller.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)
+        max_width, max_height = self.VIDEO_DISPLAY_SIZE
+        scale = min(max_width / width, max_height / height, 1)
+        return max(int(width * scale), 1), max(int(height * scale), 1)
+
+    def display_view(self):
+        """
+        FrameView of the video label at the display size of the current video
+        """
+        size = self.display_size()
+        if self.frame_view is None or self.frame_view.size != size:
+            self.frame_view = FrameView(self.video_label, size)
+        return self.frame_view
+
+    def stop_playback(self):
+        if self.player is not None:
+            self.player.stop()
+            self.player = None
+
     def update_loop(self):
-        if not self.controller.running or not self.controller.cap or not self.controller.cap.isOpened():
+        player = self.player
+        if not self.controller.running or player is None:
             return
+        profiler = self.profiler
+        if profiler.enabled and self.next_due is not None:
+            profiler.add('jitter', max(time.perf_counter() - self.next_due, 0.0))
 
         if not self.controller.paused:
-            current_frame = int(self.controller.cap.get(cv2.CAP_PROP_POS_FRAMES))
-            if hasattr(self.controller, "end_frame") and current_frame >= self.controller.end_frame:
-                self.controller.running = False
-                self.btn_control.config(text="Iniciar")
-                return
+            # Frames já decodificados e redimensionados pela thread do player; atrasados são descartados
+            shown = player.next_frame()
+            if shown is not None:
+                slot, frame_number = shown
+                start = profiler.start()
+                self.frame_view.show(player.ring.frames[slot])
+                player.release()
+                profiler.stop('photo', start)
+
+                tempo_atual = self.controller.video_time(frame_number)
+                self.controller.frame_count += 1
+                start = profiler.start()
+                self.update_plot(tempo_atual)
+                profiler.stop('plot', start)
+                if profiler.enabled:
+                    # Atraso do frame (e do cursor do gráfico) em relação ao relógio da reprodução
+                    profiler.add('latency', max(player.media_time() - player.frame_index.time_of(frame_number), 0.0))
 
-            ret, frame = self.controller.cap.read()
-            if not ret:
+                total_frames = len(self.controller.frame_index)
+                if total_frames > 0:
+                    self.slider_percent = int((frame_number / total_frames) * 100)
+                    self.slider.set(self.slider_percent)
+
+            elif player.done():
                 self.controller.running = False
+                self.btn_control.config(text="Iniciar")
                 return
 
-            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            img = Image.fromarray(frame)
-            imgtk = ImageTk.PhotoImage(image=img)
-            self.video_label.imgtk = imgtk
-            self.video_label.configure(image=imgtk)
-
-            tempo_atual = self.controller.cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
-            self.controller.frame_count += 1
-            if self.controller.frame_count % 20 == 0:
-                self.update_plot(tempo_atual)
-
-            total_frames = int(self.controller.cap.get(cv2.CAP_PROP_FRAME_COUNT))
-            current_frame = int(self.controller.cap.get(cv2.CAP_PROP_POS_FRAMES))
-            if total_frames > 0:
-                percent = int((current_frame / total_frames) * 100)
-                self.slider.set(percent)
+            self.fps_label.config(text=f"FPS: {player.real_fps():.1f} / {player.target_fps():.1f}"
+                                       f"  Descartados: {player.dropped_frames()}")
+            if profiler.enabled and time.perf_counter() - self.last_perf_update > PERF_OVERLAY_MS / 1000:
+                self.update_perf_overlay()
 
-        now = time.time()
-        delay = max(1, int(self.controller.frame_duration_ms - (now - self.controller.last_update_time) * 1000))
-        self.controller.last_update_time = now
+        delay = player.delay_ms()
+        self.next_due = time.perf_counter() + delay / 1000
         self.after(delay, self.update_loop)
 
+    def toggle_perf(self):
+        self.profiler.enabled = self.show_perf.get()
+        if self.profiler.enabled:
+            self.profiler.reset()
+            self.next_due = None
+            self.perf_label.config(text="Medindo...")
+            self.perf_label.place(in_=self.video_label, x=4, y=4)
+        else:
+            self.perf_label.place_forget()
+
+    def update_perf_overlay(self):
+        player = self.player
+        latency50, latency99 = self.profiler.percentiles('latency')
+        lines = [f"FPS {player.real_fps():5.1f} / {player.target_fps():.1f}",
+                 f"Descartados {player.dropped_frames()}",
+                 f"Latência p50 {latency50:.1f} ms  p99 {latency99:.1f} ms"]
+        lines += [line for line in self.profiler.summary() if not line.startswith('latency')]
+        self.perf_label.config(text="\n".join(lines))
+        self.last_perf_update = time.perf_counter()
+
+    def save_trace(self):
+        if not self.profiler.counts.any():
+            messagebox.showwarning("Aviso", "Ligue o painel de desempenho e reproduza o vídeo antes de salvar o trace.")
+            return
+        file_path = filedialog.asksaveasfilename(defaultextension=".json",
+                                                 filetypes=[("Chrome trace", "*.json"), ("Todos os arquivos", "*.*")])
+        if file_path:
+            n_events = self.profiler.dump_trace(file_path)
+            messagebox.showinfo("Sucesso", f"{n_events} eventos salvos em:\n{file_path}")
+
     def update_plot(self, tempo_atual):
-        self.ax.clear()
+        data = self.controller.data
         selected_columns = self.get_selected_columns()
-        for col in selected_columns:
-            self.ax.plot(self.controller.data['seconds_passed'], self.controller.data[col], label=col)
-        self.ax.axvline(tempo_atual, color='r', linestyle='--', label='Tempo Atual')
-        self.ax.set_xlabel("Tempo (s)")
-        self.ax.set_ylabel("Valor")
-        self.ax.set_title("Métricas ao longo do tempo")
-        self.ax.legend()
-        self.graph_canvas.draw()
+        if not self.sync_plot.is_plotted(data, selected_columns):
+            self.sync_plot.plot(data, selected_columns, title="Métricas ao longo do tempo")
+        self.sync_plot.move(tempo_atual)
+        self.current_time = tempo_atual
 
     def seek_video(self, value):
+        # Valor definido pelo próprio update_loop, não pelo usuário
+        if int(value) == self.slider_percent:
+            return
         cap = self.controller.cap
         if cap and cap.isOpened():
-            total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-            new_frame = int((int(value) / 100) * total_frames)
-            cap.set(cv2.CAP_PROP_POS_FRAMES, new_frame)
+            total_frames = len(self.controller.frame_index)
+            self.seek_to_frame(int((int(value) / 100) * total_frames))
+
+    def seek_to_frame(self, new_frame):
+        if self.controller.running and self.player is not None:
+            self.player.start(new_frame, self.controller.end_frame)
+            if self.controller.paused:
+                self.player.pause()
+            self.update_plot(self.controller.video_time(new_frame))
+            # Pausado, o player só entrega quadros ao retomar: o quadro buscado é lido e mostrado aqui
+            if not self.controller.paused:
+                return
 
-            ret, frame = cap.read()
-            if ret:
-                frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                img = Image.fromarray(frame)
-                imgtk = ImageTk.PhotoImage(image=img)
-                self.video_label.imgtk = imgtk
-                self.video_label.configure(image=imgtk)
+        cap = self.controller.cap
+        cap.set(cv2.CAP_PROP_POS_FRAMES, new_frame)
+
+        ret, frame = cap.read()
+        if ret:
+            self.display_view().show(frame, bgr=True)
+
+    def jump_event(self, direction):
+        """
+        Seeks video and plot to the peak of the next (direction 1) or previous (-1) event
+        """
+        controller = self.controller
+        if not controller.events:
+            messagebox.showwarning("Aviso", "Nenhum evento detectado nos dados carregados.")
+            return
+        if controller.frame_index is None:
+            messagebox.showwarning("Aviso", "Carregue um vídeo antes de navegar pelos eventos.")
+            return
+        if not controller.running and not controller.apply_cuts():
+            return
+
+        # Eventos na base de tempo do corte atual, a mesma do cursor do gráfico
+        events = controller.events.shifted(controller.data_offset)
+        margin = 1e-3
+        if direction > 0:
+            i = events.next_after(self.current_time + margin)
+        else:
+            i = events.previous_before(self.current_time - margin)
+        if i is None:
+            self.event_label.config(text="Nenhum evento " + ("depois" if direction > 0 else "antes") + " deste ponto")
+            return
 
-                if self.controller.running:
-                    fps = cap.get(cv2.CAP_PROP_FPS) if cap.get(cv2.CAP_PROP_FPS) else 30
-                    tempo_atual = new_frame / fps
-                    self.update_plot(tempo_atual)
+        peak = events.peak[i]
+        frame = int(controller.frame_index.frame_from(peak + controller.video_start))
+        frame = min(max(frame, 0), len(controller.frame_index) - 1)
+        self.slider_percent = int((frame / len(controller.frame_index)) * 100)
+        self.slider.set(self.slider_percent)
+        self.seek_to_frame(frame)
+        if not controller.running and self.get_selected_columns():
+            self.update_plot(controller.video_time(frame))
+        self.current_time = peak
+        self.event_label.config(text=f"Evento {i + 1}/{len(events)}: {peak:.2f} s "
+                                     f"({events.magnitude[i]:.2f} g, proeminência {events.prominence[i]:.2f} g)")
 
     def save_graph(self):
         if not self.controller.selected_columns:
@@ -448,6 +815,93 @@ class MainViewFrame(tk.Frame):
             self.fig.savefig(file_path)
             messagebox.showinfo("Sucesso", f"Gráfico salvo em:\n{file_path}")
 
+    def export_video(self):
+        """
+        Exports the video cut with the plot of the selected columns beside it, on a background thread
+        """
+        columns = self.get_selected_columns()
+        if not columns:
+            messagebox.showwarning("Aviso", "Selecione ao menos uma coluna para exibir no gráfico.")
+            return
+        if self.controller.frame_index is None or self.controller.sensor_store is None:
+            messagebox.showwarning("Aviso", "Carregue o vídeo e os dados antes de exportar.")
+            return
+        if not self.controller.apply_cuts():
+            return
+        file_path = filedialog.asksaveasfilename(defaultextension=".mp4",
+                                                 filetypes=[("Vídeo MP4", "*.mp4"), ("Todos os arquivos", "*.*")])
+        if not file_path:
+            return
+
+        controller = self.controller
+        result = {}
+        def export():
+            try:
+                overlay.export_overlay(controller.video_path, controller.data, columns, file_path,
+                                       controller.video_start, controller.video_duration,
+                                       frame_index=controller.frame_index)
+            except Exception as e:
+                result['error'] = e
+
+        worker = Thread(target=export, daemon=True)
+        worker.start()
+        self.btn_export.config(state=tk.DISABLED, text="Exportando...")
+        self.after(200, self.check_export, worker, result, file_path)
+
+    def check_export(self, worker, result, file_path):
+        if worker.is_alive():
+            self.after(200, self.check_export, worker, result, file_path)
+            return
+        self.btn_export.config(state=tk.NORMAL, text="Exportar Vídeo Sincronizado")
+        if 'error' in result:
+            messagebox.showerror("Erro ao exportar", f"Erro: {str(result['error'])}")
+        else:
+            messagebox.showinfo("Sucesso", f"Vídeo salvo em:\n{file_path}")
+
+class LiveView(tk.Toplevel):
+    """
+    Janela com os últimos segundos de um fluxo do sensor (arquivo sendo gravado, serial ou socket)
+    """
+
+    def __init__(self, parent, stream, title, window=10.0):
+        super().__init__(parent)
+        self.title(f"Ao vivo: {title}")
+        self.stream = stream
+        self.closed = False
+
+        self.status = tk.Label(self, text="Aguardando dados...")
+        self.status.pack()
+        fig = Figure(figsize=(7, 3.5))
+        ax = fig.add_subplot()
+        self.canvas = FigureCanvasTkAgg(fig, master=self)
+        self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+
+        self.plot = livestream.RollingPlot(self, ax, self.canvas, stream, alignment.ACC_COLUMNS, window,
+                                           max_fps=LIVE_MAX_FPS)
+        self.protocol("WM_DELETE_WINDOW", self.close)
+        stream.start()
+        self.plot.start()
+        self.after(1000, self.update_status, 0)
+
+    def update_status(self, last_total):
+        if self.closed:
+            return
+        if self.stream.error is not None:
+            self.status.config(text=f"Erro na leitura: {self.stream.error}")
+            return
+        total = self.stream.ring.total if self.stream.ring is not None else 0
+        self.status.config(text=f"{total} amostras ({total - last_total}/s), "
+                                f"{self.stream.parser.dropped} linhas descartadas")
+        self.after(1000, self.update_status, total)
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self.plot.stop()
+        self.stream.stop()
+        self.destroy()
+
 if __name__ == "__main__":
     root = tk.Tk()
     app = VideoGraphApp(root)
@@ -0,0 +1,472 @@
+# This module ingests WIT sensor lines while they are recorded (tailed file, serial port, socket or pty)
+
+import argparse
+import os
+import re
+import select
+import socket
+import threading
+import time
+import warnings
+
+import numpy as np
+
+from sensordataIO import TEXT_COLUMNS
+
+TAB, NEWLINE, RETURN, SPACE = ord('\t'), ord('\n'), ord('\r'), ord(' ')
+
+# A field np.fromstring converts completely (decimal or exponent notation, nan, inf)
+NUMBER = re.compile(rb'[+-]?(?:(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?|inf|nan)', re.IGNORECASE)
+
+class FileTail:
+    """
+    Bytes appended to a file that is still being written (like tail -f)
+    """
+
+    def __init__(self, path, from_start=True, chunk_bytes=1 << 16, poll=0.05):
+        self.file = open(path, 'rb')
+        if not from_start:
+            self.file.seek(0, os.SEEK_END)
+        self.chunk_bytes = chunk_bytes
+        self.poll = poll
+
+    def read(self):
+        data = self.file.read(self.chunk_bytes)
+        if not data:
+            time.sleep(self.poll)
+        return data
+
+    def close(self):
+        self.file.close()
+
+class FdSource:
+    """
+    Bytes of a file descriptor that can be waited on (pty, pipe); EOFError once it is closed
+    """
+
+    def __init__(self, fd, chunk_bytes=1 << 16, poll=0.05):
+        self.fd = fd
+        self.chunk_bytes = chunk_bytes
+        self.poll = poll
+
+    def read(self):
+        if not select.select([self.fd], [], [], self.poll)[0]:
+            return b''
+        try:
+            data = os.read(self.fd, self.chunk_bytes)
+        except OSError:
+            data = b''
+        if not data:
+            raise EOFError
+        return data
+
+    def close(self):
+        os.close(self.fd)
+
+class SocketSource:
+    """
+    Bytes received from a TCP socket (e.g. a Bluetooth/serial bridge); EOFError once it is closed
+    """
+
+    def __init__(self, host, port, chunk_bytes=1 << 16, poll=0.05):
+        self.sock = socket.create_connection((host, port))
+        self.sock.settimeout(poll)
+        self.chunk_bytes = chunk_bytes
+
+    def read(self):
+        try:
+            data = self.sock.recv(self.chunk_bytes)
+        except socket.timeout:
+            return b''
+        if not data:
+            raise EOFError
+        return data
+
+    def close(self):
+        self.sock.close()
+
+class SerialSource:
+    """
+    Bytes of a serial port (Bluetooth SPP ports included). Needs pyserial.
+    """
+
+    def __init__(self, port, baudrate=115200, poll=0.05):
+        try:
+            import serial
+        except ImportError:
+            raise ImportError("Leitura da porta serial requer o pacote pyserial (pip install pyserial)")
+        self.port = serial.Serial(port, baudrate, timeout=poll)
+
+    def read(self):
+        return self.port.read(max(self.port.in_waiting, 1))
+
+    def close(self):
+        self.port.close()
+
+class WitParser:
+    """
+    Incremental parser of the WIT text format (tab separated, 'time' first, optional header line).
+
+    Each chunk is parsed as a block: complete lines are split with NumPy, every numeric field of the
+    block is converted by one np.fromstring call and the timestamps are decoded from the byte matrix,
+    so no Python object is created per sample. An incomplete last line is kept for the next chunk.
+
+    params:
+
+    columns : list -> column names, when the stream has no header line
+    """
+
+    def __init__(self, columns=None):
+        self.pending = b''
+        self.t0 = None
+        self.dropped = 0
+        self.columns = None
+        if columns is not None:
+            self.set_columns(columns)
+
+    def set_columns(self, columns):
+        self.columns = list(columns)
+        # Fields without a name (a header ending with a tab) keep their place but are skipped like text
+        self.text_fields = np.array([col in TEXT_COLUMNS or not col for col in self.columns])
+        self.channels = [col for col, is_text in zip(self.columns, self.text_fields) if not is_text]
+
+    def feed(self, data):
+        """
+        Parses the complete lines of 'data' (plus what was left from the previous chunk).
+
+        returns:
+
+        t : array -> seconds since the first sample of the stream;
+        values : array -> samples x channels (self.channels), or None if no line was complete
+        """
+        data = self.pending + data
+        end = data.rfind(b'\n') + 1
+        self.pending = data[end:]
+        if not end:
+            return None, None
+        block = np.frombuffer(data, dtype=np.uint8, count=end)
+
+        if self.columns is None:
+            header_end = int(np.argmax(block == NEWLINE)) + 1
+            header = bytes(block[:header_end]).decode('utf-8-sig').rstrip('\r\n').split('\t')
+            if header[0] != 'time':
+                raise ValueError("Fluxo sem cabeçalho: informe as colunas")
+            self.set_columns(header)
+            block = block[header_end:]
+            if not len(block):
+                return None, None
+        return self.parse_block(block)
+
+    def parse_block(self, block):
+        ends = np.flatnonzero(block == NEWLINE)
+        starts = np.concatenate([[0], ends[:-1] + 1])
+        is_tab = block == TAB
+        tabs = np.concatenate([[0], np.cumsum(is_tab)])
+        tabs_per_line = tabs[ends] - tabs[starts]
+
+        # Lines with another number of fields, repeated headers and truncated lines are dropped
+        first_tab = np.append(np.flatnonzero(is_tab), len(block))[tabs[starts]]
+        first = block[starts]
+        valid = ((tabs_per_line == len(self.columns) - 1) & (first >= ord('0')) & (first <= ord('9'))
+                 & (first_tab - starts >= 19))
+        if not valid.all():
+            return self.parse_valid(block, starts, ends, valid)
+
+        # Field number of every byte (tabs before it on its line); text fields are blanked so
+        # that only the numeric ones are left, separated by spaces
+        line_of_byte = np.repeat(np.arange(len(starts)), ends - starts + 1)
+        field = tabs[:-1] - tabs[starts][line_of_byte]
+        text = block.copy()
+        text[self.text_fields[field] | is_tab | (block == NEWLINE) | (block == RETURN)] = SPACE
+        # A leading number keeps np.fromstring from reading a malformed first field (' abc') as -1
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', DeprecationWarning)
+            values = np.fromstring(b'0' + text.tobytes(), dtype=np.float64, sep=' ')[1:]
+        n_lines = len(starts)
+        time_ends = np.flatnonzero(is_tab & (field == 0))
+        if len(values) != n_lines * len(self.channels):
+            # Rare (corrupted bytes): every line is parsed on its own and the ones with a non numeric
+            # channel are dropped (np.fromstring would read ' abc' as -1 and '1_0' as 1)
+            rows = [parse_numbers(text[i0:i1 + 1].tobytes(), len(self.channels)) for i0, i1 in zip(starts, ends)]
+            valid = np.array([row is not None for row in rows])
+            self.dropped += int((~valid).sum())
+            if not valid.any():
+                return None, None
+            starts, time_ends = starts[valid], time_ends[valid]
+            n_lines = len(starts)
+            values = np.array([row for row in rows if row is not None], dtype=np.float64)
+
+        t = self.parse_times(block, starts, time_ends)
+        if self.t0 is None:
+            self.t0 = t[0]
+        return (t - self.t0) / 1e6, values.reshape(n_lines, len(self.channels))
+
+    def parse_valid(self, block, starts, ends, valid):
+        self.dropped += int((~valid).sum())
+        block = block[np.repeat(valid, ends - starts + 1)]
+        if not len(block):
+            return None, None
+        return self.parse_block(block)
+
+    def parse_times(self, block, starts, time_ends):
+        """
+        Microseconds since the epoch of the 'YYYY-MM-DD HH:MM:SS:mmm' fields (milliseconds without zero padding)
+        """
+        width = int((time_ends - starts).max())
+        positions = starts[:, None] + np.arange(width)
+        chars = np.where(positions < time_ends[:, None], block[np.minimum(positions, len(block) - 1)], 0)
+        digits = chars.astype(np.int64) - ord('0')
+
+        def number(i0, i1):
+            value = np.zeros(len(starts), dtype=np.int64)
+            for j in range(i0, i1):
+                value = value * 10 + digits[:, j]
+            return value
+
+        years, months, days = number(0, 4), number(5, 7), number(8, 10)
+        day_count = ((years - 1970).astype('datetime64[Y]').astype('datetime64[M]')
+                     + (months - 1).astype('timedelta64[M]')).astype('datetime64[D]').astype(np.int64) + days - 1
+        seconds = day_count * 86400 + number(11, 13) * 3600 + number(14, 16) * 60 + number(17, 19)
+
+        # Same meaning as zfill(3) on the millisecond field (see sensordataIO.parse_time)
+        fraction = chars[:, 20:]
+        is_digit = fraction != 0
+        n_digits = is_digit.sum(axis=1)
+        value = np.zeros(len(starts), dtype=np.int64)
+        for j in range(fraction.shape[1]):
+            value = np.where(is_digit[:, j], value * 10 + digits[:, 20 + j], value)
+        micro = np.where(n_digits <= 6, value * 10 ** np.maximum(6 - np.maximum(n_digits, 3), 0),
+                         value // 10 ** np.maximum(n_digits - 6, 0))
+        return seconds * 1_000_000 + micro
+
+def parse_numbers(line, n):
+    """
+    The 'n' numbers of 'line' (bytes separated by spaces), or None if it has another number of fields
+    or one of them is not a plain decimal number
+    """
+    fields = line.split()
+    if len(fields) != n or not all(NUMBER.fullmatch(field) for field in fields):
+        return None
+    return [float(field) for field in fields]
+
+class SampleRing:
+    """
+    Last 'capacity' samples of a stream: times and channel-major values on preallocated arrays.
+    Blocks are written with at most two slice copies; readers copy out under the lock.
+    """
+
+    def __init__(self, capacity, n_channels):
+        self.capacity = capacity
+        self.t = np.zeros(capacity, dtype=np.float64)
+        self.values = np.zeros((n_channels, capacity), dtype=np.float64)
+        self.total = 0
+        self.lock = threading.Lock()
+
+    def extend(self, t, values):
+        """
+        Appends samples ('values' is samples x channels)
+        """
+        n = len(t)
+        if n > self.capacity:
+            t, values = t[-self.capacity:], values[-self.capacity:]
+            skipped, n = n - self.capacity, self.capacity
+        else:
+            skipped = 0
+        with self.lock:
+            start = (self.total + skipped) % self.capacity
+            first = min(n, self.capacity - start)
+            self.t[start:start + first] = t[:first]
+            self.values[:, start:start + first] = values[:first].T
+            if first < n:
+                self.t[:n - first] = t[first:]
+                self.values[:, :n - first] = values[first:].T
+            self.total += skipped + n
+
+    def __len__(self):
+        return min(self.total, self.capacity)
+
+    def latest(self, out_t, out_values):
+        """
+        Copies the newest samples (up to len(out_t)) into the given arrays, oldest first, and returns how many
+        """
+        with self.lock:
+            n = min(len(out_t), len(self))
+            end = self.total % self.capacity
+            first = n - end if n > end else 0
+            if first:
+                out_t[:first] = self.t[self.capacity - first:]
+                out_values[:, :first] = self.values[:, self.capacity - first:]
+            out_t[first:n] = self.t[end - (n - first):end]
+            out_values[:, first:n] = self.values[:, end - (n - first):end]
+        return n
+
+class LiveStream:
+    """
+    Reads a source on a background thread, parsing its lines into a SampleRing created once the
+    channels are known (header line or 'columns')
+    """
+
+    def __init__(self, source, capacity=200 * 60, columns=None):
+        self.source = source
+        self.capacity = capacity
+        self.parser = WitParser(columns)
+        self.ring = SampleRing(capacity, len(self.parser.channels)) if columns is not None else None
+        self.error = None
+        self.stopped = False
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped = True
+        if self.thread is not None:
+            self.thread.join()
+        self.source.close()
+
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def run(self):
+        try:
+            while not self.stopped:
+                try:
+                    data = self.source.read()
+                except EOFError:
+                    break
+                if not data:
+                    continue
+                t, values = self.parser.feed(data)
+                if t is None:
+                    continue
+                if self.ring is None:
+                    self.ring = SampleRing(self.capacity, len(self.parser.channels))
+                self.ring.extend(t, values)
+        except Exception as e:
+            self.error = e
+
+class RollingPlot:
+    """
+    Last 'window' seconds of a LiveStream on 'ax', redrawn at most 'max_fps' times per second from Tk.
+
+    The x axis is the time before the newest sample ([-window, 0]), so the axes only change when the
+    values leave the y limits; otherwise only the lines are redrawn (blitting). Samples are copied
+    from the ring into buffers allocated once. 'columns' missing from the stream are replaced by its
+    first channels.
+    """
+
+    def __init__(self, widget, ax, canvas, stream, columns, window=10.0, max_fps=20, rate=200):
+        self.widget = widget
+        self.ax = ax
+        self.canvas = canvas
+        self.stream = stream
+        self.columns = columns
+        self.window = window
+        self.period_ms = int(1000 / max_fps)
+        self.buffer_t = np.empty(int(window * rate * 1.5))
+        self.buffer_values = None
+        self.lines = []
+        self.background = None
+        self.job = None
+        canvas.mpl_connect('draw_event', self.on_draw)
+
+    def start(self):
+        self.job = self.widget.after(self.period_ms, self.refresh)
+
+    def stop(self):
+        if self.job is not None:
+            self.widget.after_cancel(self.job)
+            self.job = None
+
+    def setup(self, channels):
+        self.columns = [col for col in self.columns if col in channels] or channels[:3]
+        self.rows = [channels.index(col) for col in self.columns]
+        self.buffer_values = np.empty((len(channels), len(self.buffer_t)))
+        self.ax.clear()
+        self.lines = [self.ax.plot([], [], label=col, animated=True)[0] for col in self.columns]
+        self.ax.set_xlim(-self.window, 0)
+        self.ax.set_ylim(-1, 1)
+        self.ax.set_xlabel("Tempo relativo (s)")
+        self.ax.set_ylabel("Valor")
+        self.ax.legend(loc='upper left', fontsize='small')
+        self.canvas.draw()
+
+    def on_draw(self, event):
+        self.background = self.canvas.copy_from_bbox(self.ax.figure.bbox)
+        for line in self.lines:
+            self.ax.draw_artist(line)
+
+    def refresh(self):
+        self.job = self.widget.after(self.period_ms, self.refresh)
+        ring = self.stream.ring
+        if ring is None or not len(ring):
+            return
+        if self.buffer_values is None:
+            self.setup(self.stream.parser.channels)
+
+        n = ring.latest(self.buffer_t, self.buffer_values)
+        t = self.buffer_t[:n]
+        t -= t[-1]
+        shown = t >= -self.window
+        low, high = self.ax.get_ylim()
+        for line, row in zip(self.lines, self.rows):
+            values = self.buffer_values[row, :n][shown]
+            line.set_data(t[shown], values)
+            if len(values):
+                low, high = min(low, values.min()), max(high, values.max())
+
+        if (low, high) != self.ax.get_ylim():
+            margin = 0.05 * (high - low)
+            self.ax.set_ylim(low - margin, high + margin)
+            self.canvas.draw()
+        elif self.background is not None:
+            self.canvas.restore_region(self.background)
+            for line in self.lines:
+                self.ax.draw_artist(line)
+            self.canvas.blit(self.ax.bbox)
+
+def open_source(spec, baudrate=115200):
+    """
+    Source for 'spec': an existing file is tailed, 'host:port' is a socket, anything else a serial port
+    """
+    if os.path.isfile(spec):
+        return FileTail(spec)
+    host, _, port = spec.rpartition(':')
+    if host and port.isdigit():
+        return SocketSource(host, int(port))
+    return SerialSource(spec, baudrate)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reads WIT sensor lines while they are recorded")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument('--tail', help="file being written")
+    group.add_argument('--socket', help="host:port")
+    group.add_argument('--serial', help="serial port (e.g. /dev/rfcomm0, COM5)")
+    parser.add_argument('--baud', type=int, default=115200)
+    parser.add_argument('--new-only', action='store_true', help="skips what is already on the tailed file")
+    args = parser.parse_args()
+
+    if args.tail:
+        source = FileTail(args.tail, from_start=not args.new_only)
+    elif args.socket:
+        host, port = args.socket.rsplit(':', 1)
+        source = SocketSource(host, int(port))
+    else:
+        source = SerialSource(args.serial, args.baud)
+    stream = LiveStream(source)
+    stream.start()
+    last_total, last_time = 0, time.perf_counter()
+    try:
+        while stream.running():
+            time.sleep(1)
+            total = stream.ring.total if stream.ring is not None else 0
+            now = time.perf_counter()
+            print(f"{total:,} amostras ({(total - last_total) / (now - last_time):,.0f}/s), "
+                  f"{stream.parser.dropped} linhas descartadas")
+            last_total, last_time = total, now
+    except KeyboardInterrupt:
+        pass
+    stream.stop()
+    if stream.error:
+        raise stream.error
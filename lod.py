@@ -0,0 +1,143 @@
+# This module reduces long sensor series to what can actually be seen on a plot (level of detail)
+
+import weakref
+
+import numpy as np
+
+class MinMaxPyramid:
+    """
+    Multi-resolution min/max envelope of one channel.
+
+    Each level splits the samples in blocks 'factor' times larger than the previous one and
+    keeps, for each block, the index of its minimum and of its maximum. A view then draws two points per block at the coarsest
+    level that still has about one block per pixel, so peaks are never lost.
+
+    params:
+
+    t : array -> sorted sample times;
+    y : array -> sample values;
+    factor : int -> block size growth between levels;
+    min_blocks : int -> levels stop once they have fewer blocks than this
+    """
+
+    def __init__(self, t, y, factor=4, min_blocks=256):
+        self.t = np.asarray(t)
+        self.y = np.asarray(y)
+        self.factor = factor
+        index_dtype = np.int32 if len(self.y) < 2**31 else np.int64
+
+        # levels[k] = (argmin, argmax) of the blocks of factor**(k + 1) samples
+        self.levels = []
+        if len(self.y) <= min_blocks:
+            return
+        imin, imax = self.first_level(index_dtype)
+        self.levels.append((imin, imax))
+        while len(imin) > min_blocks:
+            imin, imax = self.reduce(imin, imax)
+            self.levels.append((imin, imax))
+
+    def first_level(self, index_dtype):
+        # Straight from the samples, without gathering through an index array
+        f = self.factor
+        full = len(self.y) // f * f
+        blocks = self.y[:full].reshape(-1, f)
+        start = np.arange(0, full, f, dtype=index_dtype)
+        imin, imax = start + blocks.argmin(axis=1), start + blocks.argmax(axis=1)
+        if full < len(self.y):
+            tail = self.y[full:]
+            imin = np.append(imin, full + tail.argmin()).astype(index_dtype)
+            imax = np.append(imax, full + tail.argmax()).astype(index_dtype)
+        return imin, imax
+
+    def reduce(self, imin, imax):
+        f = self.factor
+        pad = (-len(imin)) % f
+        if pad:
+            imin = np.concatenate([imin, np.repeat(imin[-1:], pad)])
+            imax = np.concatenate([imax, np.repeat(imax[-1:], pad)])
+        imin, imax = imin.reshape(-1, f), imax.reshape(-1, f)
+        rows = np.arange(len(imin))
+        return imin[rows, self.y[imin].argmin(axis=1)], imax[rows, self.y[imax].argmax(axis=1)]
+
+    def query(self, t0, t1, n_points):
+        """
+        Returns (t, y) to draw the window [t0, t1] with about 'n_points' points (one sample
+        beyond each edge is kept so the line reaches the borders)
+        """
+        n = len(self.t)
+        i0 = max(int(np.searchsorted(self.t, t0, side='left')) - 1, 0)
+        i1 = min(int(np.searchsorted(self.t, t1, side='right')) + 1, n)
+        if i1 - i0 <= n_points:
+            return self.t[i0:i1], self.y[i0:i1]
+
+        # Coarsest level with at least n_points / 2 blocks on the window (two points per block)
+        level, block = -1, 1
+        while level + 1 < len(self.levels) and (i1 - i0) / (block * self.factor) >= n_points / 2:
+            level, block = level + 1, block * self.factor
+        if level < 0:
+            return self.t[i0:i1], self.y[i0:i1]
+
+        imin, imax = self.levels[level]
+        b0, b1 = i0 // block, -(-i1 // block)
+        imin, imax = imin[b0:b1], imax[b0:b1]
+        idx = np.stack([np.minimum(imin, imax), np.maximum(imin, imax)], axis=1).ravel()
+        return self.t[idx], self.y[idx]
+
+class PyramidCache:
+    """
+    Pyramids of the channels of the last DataFrame plotted (rebuilt when another DataFrame comes).
+    The DataFrame is only weakly referenced: the pyramids are dropped once it is garbage collected.
+    """
+
+    def __init__(self):
+        self.ref = None
+        self.pyramids = {}
+
+    def get(self, df, col, time_col='seconds_passed'):
+        if self.ref is None or self.ref() is not df:
+            self.ref = weakref.ref(df, self.forget)
+            self.pyramids = {}
+        if col not in self.pyramids:
+            self.pyramids[col] = MinMaxPyramid(df[time_col].to_numpy(), df[col].to_numpy())
+        return self.pyramids[col]
+
+    def forget(self, ref):
+        # Called when a DataFrame dies; only the current one clears the pyramids
+        if ref is self.ref:
+            self.ref = None
+            self.pyramids = {}
+
+_cache = PyramidCache()
+
+def visible_points(ax):
+    """
+    About two points per horizontal pixel of 'ax'
+    """
+    return max(int(2 * ax.bbox.width), 2)
+
+def plot_lod(ax, pyramid, **kwargs):
+    """
+    Plots a MinMaxPyramid on 'ax' with only the points visible at the current x limits.
+    The line is refined whenever the limits change (zoom/pan).
+
+    returns:
+
+    line : Line2D -> the plotted line
+    """
+    if not len(pyramid.t):
+        # Nothing to refine (e.g. a cut outside the data): an empty line, still on the legend
+        line, = ax.plot([], [], **kwargs)
+        return line
+    line, = ax.plot(*pyramid.query(pyramid.t[0], pyramid.t[-1], visible_points(ax)), **kwargs)
+
+    def refine(ax):
+        line.set_data(*pyramid.query(*ax.get_xlim(), visible_points(ax)))
+
+    ax.callbacks.connect('xlim_changed', refine)
+    return line
+
+def plot_columns(ax, df, columns, time_col='seconds_passed'):
+    """
+    Plots 'columns' of 'df' against 'time_col' through level-of-detail pyramids (cached per DataFrame)
+    """
+    return [plot_lod(ax, _cache.get(df, col, time_col), label=col) for col in columns]
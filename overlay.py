@@ -0,0 +1,266 @@
+# This module exports a video with the sensor plot and its time cursor composited beside (or over) each frame
+
+import collections
+import fractions
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+import lod
+import videoindex
+
+LAYOUTS = ['side', 'overlay']
+
+class PlotPanel:
+    """
+    Sensor plot rasterized once to an RGB image of 'size' (width, height), plus the mapping from
+    time to the pixel column of the cursor, so each frame only needs the cursor drawn.
+    """
+
+    def __init__(self, df, columns, size, title=None, time_col='seconds_passed', dpi=100):
+        width, height = size
+        fig = Figure(figsize=(width / dpi, height / dpi), dpi=dpi)
+        canvas = FigureCanvasAgg(fig)
+        ax = fig.add_subplot()
+        lod.plot_columns(ax, df, columns, time_col)
+        ax.set_xlim(df[time_col].iloc[0], df[time_col].iloc[-1])
+        ax.set_xlabel("Tempo (s)")
+        ax.set_ylabel("Valor")
+        if title:
+            ax.set_title(title)
+        ax.legend(loc='upper right', fontsize='small')
+        fig.tight_layout()
+        canvas.draw()
+
+        image = np.asarray(canvas.buffer_rgba())[:, :, :3]
+        if image.shape[:2] != (height, width):
+            image = cv2.resize(image, (width, height), interpolation=cv2.INTER_AREA)
+        self.image = np.ascontiguousarray(image)
+
+        # Display coordinates have the origin at the bottom left; the image rows go top-down
+        (x0, y0), (x1, y1) = ax.transData.transform([(0, ax.get_ylim()[0]), (1, ax.get_ylim()[1])])
+        scale_x = width / canvas.get_width_height()[0]
+        scale_y = height / canvas.get_width_height()[1]
+        self.px_per_second = (x1 - x0) * scale_x
+        self.x_origin = x0 * scale_x
+        self.rows = slice(int(height - y1 * scale_y), int(height - y0 * scale_y))
+        left, right = ax.get_xlim()
+        self.columns = (int(self.x_origin + left * self.px_per_second), int(self.x_origin + right * self.px_per_second))
+
+    def cursor_column(self, seconds):
+        """
+        Pixel column of the cursor at 'seconds', clipped to the plot area
+        """
+        return int(np.clip(self.x_origin + seconds * self.px_per_second, *self.columns))
+
+class Compositor:
+    """
+    Builds output frames on a pool of preallocated buffers.
+
+    'side': video on the left and the plot on the right. Each buffer keeps the plot from its
+    previous frame, so only the columns of the old cursor are restored before drawing the new one.
+    'overlay': the plot is blended over the bottom of the video.
+    """
+
+    def __init__(self, panel, video_size, layout='side', n_buffers=8, alpha=0.75, cursor_width=2):
+        if layout not in LAYOUTS:
+            raise ValueError(f"Layout inválido: {layout} (use um de {LAYOUTS})")
+        self.panel = panel
+        self.layout = layout
+        self.alpha = alpha
+        self.cursor_width = cursor_width
+        self.video_width, self.video_height = video_size
+        plot_height, plot_width = panel.image.shape[:2]
+
+        if layout == 'side':
+            self.size = (self.video_width + plot_width, max(self.video_height, plot_height))
+            self.plot_origin = (self.video_width, 0)
+        else:
+            self.size = video_size
+            self.plot_origin = (0, self.video_height - plot_height)
+
+        width, height = self.size
+        self.buffers = np.zeros((n_buffers, height, width, 3), dtype=np.uint8)
+        self.last_cursor = [None] * n_buffers
+        if layout == 'side':
+            x, y = self.plot_origin
+            self.buffers[:, y:y + plot_height, x:x + plot_width] = panel.image
+
+    def compose(self, slot, frame, seconds):
+        """
+        Writes the frame with the cursor at 'seconds' on buffer 'slot' and returns it
+        """
+        out = self.buffers[slot]
+        x, y = self.plot_origin
+        plot_height, plot_width = self.panel.image.shape[:2]
+        rows = slice(y + self.panel.rows.start, y + self.panel.rows.stop)
+        column = self.panel.cursor_column(seconds)
+
+        if self.layout == 'side':
+            out[:self.video_height, :self.video_width] = frame
+            previous = self.last_cursor[slot]
+            if previous is not None:
+                out[rows, x + previous:x + previous + self.cursor_width] = \
+                    self.panel.image[self.panel.rows, previous:previous + self.cursor_width]
+            self.last_cursor[slot] = column
+        else:
+            out[:] = frame
+            region = out[y:y + plot_height, x:x + plot_width]
+            cv2.addWeighted(self.panel.image, self.alpha, region, 1 - self.alpha, 0, dst=region)
+
+        out[rows, x + column:x + column + self.cursor_width] = (255, 0, 0)
+        return out
+
+def even(n):
+    return max(int(n) // 2 * 2, 2)
+
+def read_exact(stream, buffer):
+    """
+    Fills 'buffer' from 'stream' (pipes may return less than asked); False on end of stream
+    """
+    view = memoryview(buffer).cast('B')
+    filled = 0
+    while filled < len(view):
+        n = stream.readinto(view[filled:])
+        if not n:
+            return False
+        filled += n
+    return True
+
+def export_overlay(video_path, df, columns, output_path, video_start=0.0, video_duration=None, layout='side',
+                   height=None, plot_width=None, workers=None, title=None, frame_index=None,
+                   preset='veryfast', crf=20):
+    """
+    Exports [video_start, video_start + video_duration] of the video with the plot of 'columns' of 'df'
+    (sensor data already cut: its seconds_passed 0 is the video_start) and a cursor on the frame time.
+
+    Decoding, compositing and encoding run at the same time: an ffmpeg process decodes and scales
+    the frames, a thread pool composites them and another ffmpeg process encodes the result (with the
+    audio of the cut copied).
+
+    params:
+
+    layout : string -> 'side' (plot beside the video) or 'overlay' (plot over the bottom of the video);
+    height : int -> output video height (default: the source height);
+    plot_width : int -> width of the plot on 'side' (default: 1.2 x height);
+    workers : int -> compositing threads
+
+    returns:
+
+    output_path : string -> path of the exported video
+    """
+    if frame_index is None:
+        frame_index = videoindex.load_frame_index(video_path)
+    first = int(frame_index.frame_from(video_start))
+    end = len(frame_index) if video_duration is None else int(frame_index.frame_from(video_start + video_duration))
+    if first >= end:
+        raise ValueError("O corte do vídeo não contém nenhum frame")
+
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise ValueError(f"Erro ao abrir o vídeo {video_path}")
+    source_width, source_height = cap.get(cv2.CAP_PROP_FRAME_WIDTH), cap.get(cv2.CAP_PROP_FRAME_HEIGHT)
+    cap.release()
+    video_height = even(height or source_height)
+    video_width = even(source_width * video_height / source_height)
+    if layout == 'side':
+        panel_size = (even(plot_width or video_height * 1.2), video_height)
+    else:
+        panel_size = (video_width, even(video_height * 0.35))
+
+    panel = PlotPanel(df, columns, panel_size, title)
+    workers = workers or 4
+    depth = workers * 2
+    compositor = Compositor(panel, (video_width, video_height), layout, n_buffers=depth + 1)
+    out_width, out_height = compositor.size
+
+    start_time = float(frame_index.time_of(first))
+    end_time = frame_index.duration if end >= len(frame_index) else float(frame_index.time_of(end))
+    # Constant rate output: each tick shows the source frame on screen at its time (frame_at on the
+    # timestamps), so variable frame rate footage keeps its timing
+    # (the average rate, as a fraction: a rounded decimal rate makes the encoder drop frames)
+    fps = fractions.Fraction((end - first) / (end_time - start_time)).limit_denominator(1001)
+    ticks = start_time + np.arange(max(round((end_time - start_time) * fps), 1)) * fps.denominator / fps.numerator
+    # (with a microsecond of slack: a tick on a frame timestamp, off by the float rounding, shows that frame)
+    sources = np.clip(frame_index.frame_at(ticks + 1e-6), first, end - 1)
+    needed = np.zeros(end - first, dtype=bool)
+    needed[sources - first] = True
+
+    # Accurate seek: decoding starts on the first frame of the cut
+    seek = (frame_index.time_of(first - 1) + start_time) / 2 if first > 0 else 0.0
+    ffmpeg = videoindex.ffmpeg_exe()
+    with tempfile.TemporaryFile() as decoder_log, tempfile.TemporaryFile() as encoder_log:
+        decoder = subprocess.Popen([ffmpeg, '-hide_banner', '-loglevel', 'error', '-ss', f'{seek:.6f}',
+                                    '-i', video_path, '-map', '0:v:0', '-frames:v', str(end - first),
+                                    '-fps_mode', 'passthrough', '-vf', f'scale={video_width}:{video_height}',
+                                    '-pix_fmt', 'rgb24', '-f', 'rawvideo', '-'],
+                                   stdout=subprocess.PIPE, stderr=decoder_log)
+        encoder = subprocess.Popen([ffmpeg, '-hide_banner', '-loglevel', 'error', '-y',
+                                    '-f', 'rawvideo', '-pix_fmt', 'rgb24', '-s', f'{out_width}x{out_height}',
+                                    '-r', f'{fps.numerator}/{fps.denominator}', '-i', '-',
+                                    '-ss', f'{start_time:.6f}', '-t', f'{end_time - start_time:.6f}', '-i', video_path,
+                                    '-map', '0:v', '-map', '1:a?', '-fps_mode:v', 'passthrough',
+                                    '-c:v', 'libx264', '-preset', preset,
+                                    '-crf', str(crf), '-pix_fmt', 'yuv420p', '-c:a', 'copy',
+                                    '-movflags', '+faststart', output_path], stdin=subprocess.PIPE, stderr=encoder_log)
+
+        # Frames shown go round the buffers (at most 'depth' are pending); the others are decoded into 'skipped'
+        frames = np.empty((depth + 1, video_height, video_width, 3), dtype=np.uint8)
+        skipped = np.empty((video_height, video_width, 3), dtype=np.uint8)
+        pending = collections.deque()
+        broken = False
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                decoded, slot, ended = first - 1, depth, False
+                for i, (tick, source) in enumerate(zip(ticks, sources)):
+                    # Buffers are reused once their frame is written
+                    while len(pending) >= depth:
+                        encoder.stdin.write(pending.popleft().result())
+                    # The decoder may give fewer frames than the index (an edit list trimming the last
+                    # ones): the last frame decoded then stays on screen
+                    while decoded < source and not ended:
+                        target = (slot + 1) % (depth + 1) if needed[decoded + 1 - first] else None
+                        ended = not read_exact(decoder.stdout, skipped if target is None else frames[target])
+                        if not ended:
+                            decoded += 1
+                            slot = slot if target is None else target
+                    if decoded < first:
+                        break
+                    pending.append(pool.submit(compositor.compose, i % (depth + 1), frames[slot],
+                                               float(tick) - video_start))
+                while pending:
+                    encoder.stdin.write(pending.popleft().result())
+            # Frames after the last tick are drained so the decoder exits cleanly
+            while decoder.stdout.read(skipped.nbytes):
+                pass
+        except BrokenPipeError:
+            # The encoder exited: its messages are raised below
+            broken = True
+        finally:
+            try:
+                encoder.stdin.close()
+            except BrokenPipeError:
+                broken = True
+            decoder.stdout.close()
+            decoder.wait()
+            encoder.wait()
+
+        # A failing encoder also stops the decoder (closed pipe), so it is the one reported then
+        checks = [(encoder, encoder_log, 'gravar'), (decoder, decoder_log, 'ler')]
+        for process, log, action in (checks if broken else checks[::-1]):
+            check_exit(process, log, f"{action} {output_path if process is encoder else video_path}")
+    return output_path
+
+def check_exit(process, log, what):
+    """
+    Raises RuntimeError with the messages ffmpeg wrote on 'log' if 'process' failed
+    """
+    if process.returncode:
+        log.seek(0)
+        message = log.read().decode('utf-8', 'replace').strip()
+        raise RuntimeError(f"ffmpeg falhou ao {what} (código {process.returncode}): {message}")
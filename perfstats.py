@@ -0,0 +1,105 @@
+# This module times the stages of the playback hot path on fixed-size rings (percentiles and trace dumps)
+
+import json
+import threading
+import time
+
+import numpy as np
+
+class Profiler:
+    """
+    Last 'capacity' durations of each stage, on preallocated arrays.
+
+    Call sites do 'start = profiler.start()' and 'profiler.stop(stage, start)'; while disabled, start
+    returns 0.0 and stop returns at once, so the cost is one attribute check per call. Each stage must
+    be written by a single thread (the playback producer or the Tk loop), so no lock is taken.
+
+    params:
+
+    stages : list -> stage names;
+    capacity : int -> durations kept per stage
+    """
+
+    def __init__(self, stages, capacity=2048, enabled=False):
+        self.stages = list(stages)
+        self.index = {stage: i for i, stage in enumerate(self.stages)}
+        self.capacity = capacity
+        self.enabled = enabled
+        self.origin = time.perf_counter()
+        self.starts = np.zeros((len(self.stages), capacity))
+        self.durations = np.zeros((len(self.stages), capacity))
+        self.threads = np.zeros(len(self.stages), dtype=np.int64)
+        self.counts = np.zeros(len(self.stages), dtype=np.int64)
+
+    def start(self):
+        return time.perf_counter() if self.enabled else 0.0
+
+    def stop(self, stage, start):
+        """
+        Records the time since 'start' (from self.start) as one duration of 'stage'
+        """
+        if not self.enabled:
+            return
+        self.add(stage, time.perf_counter() - start, start)
+
+    def add(self, stage, seconds, start=None):
+        """
+        Records a value measured elsewhere (e.g. a latency) as one duration of 'stage'
+        """
+        if not self.enabled:
+            return
+        i = self.index[stage]
+        slot = self.counts[i] % self.capacity
+        self.starts[i, slot] = (time.perf_counter() - seconds if start is None else start) - self.origin
+        self.durations[i, slot] = seconds
+        self.threads[i] = threading.get_ident()
+        self.counts[i] += 1
+
+    def reset(self):
+        self.counts[:] = 0
+        self.origin = time.perf_counter()
+
+    def samples(self, stage):
+        """
+        Durations (s) of 'stage' still on its ring, in no particular order
+        """
+        i = self.index[stage]
+        return self.durations[i, :min(self.counts[i], self.capacity)]
+
+    def percentiles(self, stage, q=(50, 99)):
+        """
+        Percentiles (ms) of the durations of 'stage' on its ring (NaN while empty)
+        """
+        samples = self.samples(stage)
+        if not len(samples):
+            return [float('nan')] * len(q)
+        return list(np.percentile(samples, q) * 1000)
+
+    def summary(self):
+        """
+        Lines 'stage p50 p99' (ms) of the stages with samples
+        """
+        lines = []
+        for stage in self.stages:
+            if self.counts[self.index[stage]]:
+                p50, p99 = self.percentiles(stage)
+                lines.append(f"{stage:<8} p50 {p50:6.1f} ms  p99 {p99:6.1f} ms")
+        return lines
+
+    def dump_trace(self, fpath):
+        """
+        Saves the samples on the rings as a Chrome trace (chrome://tracing, Perfetto): one complete event
+        per duration, on the thread that recorded it
+        """
+        events = []
+        for stage in self.stages:
+            i = self.index[stage]
+            n = min(self.counts[i], self.capacity)
+            order = np.argsort(self.starts[i, :n])
+            tid = int(self.threads[i])
+            for start, duration in zip(self.starts[i, :n][order], self.durations[i, :n][order]):
+                events.append({'name': stage, 'ph': 'X', 'pid': 0, 'tid': tid,
+                               'ts': round(start * 1e6, 1), 'dur': round(duration * 1e6, 1)})
+        with open(fpath, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+        return len(events)
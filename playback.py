@@ -0,0 +1,264 @@
+# This module decodes video frames on a background thread for the GUI playback
+
+import collections
+import threading
+import time
+
+import cv2
+import numpy as np
+
+import perfstats
+
+# Timed stages: decode and convert on the producer thread, the others on the Tk loop
+# (jitter: lateness of the 'after' callback; latency: frame shown after its time, plot included)
+STAGES = ['decode', 'convert', 'photo', 'plot', 'jitter', 'latency']
+
+# Late frames grabbed in a row before one is converted anyway, so the display keeps updating
+# even when grabbing alone is slower than real time
+MAX_SKIPPED_FRAMES = 8
+
+def convert_frame(frame, resized, out, bgr=True):
+    """
+    Writes 'frame' at the size of 'out' as RGB into 'out'. The full size frame is read once, by the
+    resize into 'resized' (same size as 'out'); the color conversion only touches display sized pixels.
+
+    Downscales of 2x or more (e.g. 4K on the widget) are bilinear, like the display path always was:
+    area averaging would read every source pixel and cost more than the decode. Smaller ones use area
+    averaging, which is cheap there and sharper.
+
+    params:
+
+    frame : array -> BGR (or RGB, bgr=False) frame of any size;
+    resized, out : array -> preallocated display sized buffers
+
+    returns:
+
+    out : array
+    """
+    height, width = out.shape[:2]
+    if frame.shape[:2] != (height, width):
+        large = frame.shape[1] >= 2 * width and frame.shape[0] >= 2 * height
+        cv2.resize(frame, (width, height), dst=resized,
+                   interpolation=cv2.INTER_LINEAR if large else cv2.INTER_AREA)
+        frame = resized
+    if bgr:
+        cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=out)
+    else:
+        np.copyto(out, frame)
+    return out
+
+class FrameRing:
+    """
+    Bounded ring of preallocated frames shared by one producer and one consumer.
+
+    The producer writes straight into a free slot and commits it; the consumer reads the
+    oldest slots in order and releases them. Nothing is allocated per frame.
+    """
+
+    def __init__(self, capacity, height, width):
+        self.capacity = capacity
+        self.frames = np.empty((capacity, height, width, 3), dtype=np.uint8)
+        self.numbers = np.zeros(capacity, dtype=np.int64)
+        self.read_pos = 0
+        self.write_pos = 0
+        self.closed = False
+        self.cond = threading.Condition()
+
+    def acquire_write(self):
+        """
+        Waits for a free slot and returns its index (None once the ring is closed)
+        """
+        with self.cond:
+            while self.write_pos - self.read_pos >= self.capacity and not self.closed:
+                self.cond.wait()
+            return None if self.closed else self.write_pos % self.capacity
+
+    def commit_write(self, number):
+        with self.cond:
+            self.numbers[self.write_pos % self.capacity] = number
+            self.write_pos += 1
+            self.cond.notify_all()
+
+    def ready(self):
+        return self.write_pos - self.read_pos
+
+    def number_at(self, i):
+        """
+        Frame number of the i-th readable slot (0 is the oldest)
+        """
+        return self.numbers[(self.read_pos + i) % self.capacity]
+
+    def read_slot(self):
+        return self.read_pos % self.capacity
+
+    def release_read(self):
+        with self.cond:
+            self.read_pos += 1
+            self.cond.notify_all()
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+class Player:
+    """
+    Plays frames [start_frame, end_frame) of a video against the wall clock.
+
+    A producer thread decodes the frames, resizes them to the widget size and converts them
+    to RGB into a FrameRing. The consumer (Tk loop) calls next_frame, which returns the latest
+    frame due at the current time; late frames are dropped instead of slowing playback down.
+    Decode and convert times go to 'profiler' (a perfstats.Profiler of STAGES) when it is enabled.
+    """
+
+    def __init__(self, video_path, frame_index, size, capacity=8, profiler=None):
+        self.video_path = video_path
+        self.frame_index = frame_index
+        self.width, self.height = size
+        self.capacity = capacity
+        self.profiler = profiler or perfstats.Profiler(STAGES)
+        self.ring = None
+        self.thread = None
+        self.finished = False
+
+    def start(self, start_frame, end_frame=None):
+        """
+        (Re)starts playback at 'start_frame'
+        """
+        self.stop()
+        self.end_frame = len(self.frame_index) if end_frame is None else min(end_frame, len(self.frame_index))
+        self.ring = FrameRing(self.capacity, self.height, self.width)
+        self.finished = False
+
+        self.start_media = float(self.frame_index.time_of(start_frame))
+        self.start_wall = time.perf_counter()
+        self.paused_at = None
+
+        self.displayed = 0
+        self.dropped = 0
+        self.skipped = 0
+        self.display_times = collections.deque(maxlen=30)
+
+        self.thread = threading.Thread(target=self.produce, args=(self.ring, start_frame), daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        if self.ring is not None:
+            self.ring.close()
+        if self.thread is not None:
+            self.thread.join()
+        self.thread = None
+
+    def pause(self):
+        if self.paused_at is None:
+            self.paused_at = self.media_time()
+
+    def resume(self):
+        if self.paused_at is not None:
+            self.start_media = self.paused_at
+            self.start_wall = time.perf_counter()
+            self.paused_at = None
+
+    def media_time(self):
+        """
+        Video time (s) that should be on screen now
+        """
+        if self.paused_at is not None:
+            return self.paused_at
+        return self.start_media + time.perf_counter() - self.start_wall
+
+    def produce(self, ring, start_frame):
+        cap = cv2.VideoCapture(self.video_path)
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+        resized = np.empty((self.height, self.width, 3), dtype=np.uint8)
+        # Decoded frames reuse one full size buffer (cv2 writes into it once its size is known)
+        frame = None
+        frame_period = 1 / self.frame_index.fps if self.frame_index.fps else 0
+        profiler = self.profiler
+        skipped = 0
+
+        for number in range(start_frame, self.end_frame):
+            # Stopped (seek, new playback): return without waiting for a free slot
+            if ring.closed:
+                break
+            # Frames already late are only grabbed (decoded for the next ones, never converted)
+            if (skipped < MAX_SKIPPED_FRAMES and number < self.end_frame - 1
+                    and self.frame_index.time_of(number) < self.media_time() - frame_period):
+                if not cap.grab():
+                    break
+                self.skipped += 1
+                skipped += 1
+                continue
+            skipped = 0
+
+            slot = ring.acquire_write()
+            if slot is None:
+                break
+            start = profiler.start()
+            ret, frame = cap.read(frame)
+            if not ret:
+                break
+            profiler.stop('decode', start)
+            start = profiler.start()
+            convert_frame(frame, resized, ring.frames[slot])
+            profiler.stop('convert', start)
+            ring.commit_write(number)
+
+        cap.release()
+        self.finished = True
+
+    def next_frame(self):
+        """
+        Returns (slot, frame number) of the latest frame due now, or None if no new frame is due.
+        The slot must be given back with release once displayed.
+        """
+        ring = self.ring
+        now = self.media_time()
+        due = 0
+        while due < ring.ready() and self.frame_index.time_of(ring.number_at(due)) <= now:
+            due += 1
+        if not due:
+            return None
+
+        for _ in range(due - 1):
+            ring.release_read()
+            self.dropped += 1
+        self.displayed += 1
+        self.display_times.append(time.perf_counter())
+        return ring.read_slot(), int(ring.number_at(0))
+
+    def release(self):
+        self.ring.release_read()
+
+    def done(self):
+        """
+        True once every frame was produced and consumed
+        """
+        return self.finished and not self.ring.ready()
+
+    def delay_ms(self):
+        """
+        Milliseconds until the next frame is due (for scheduling the consumer)
+        """
+        if self.paused_at is None and self.ring.ready():
+            wait = self.frame_index.time_of(self.ring.number_at(0)) - self.media_time()
+        else:
+            wait = 1 / self.target_fps() if self.target_fps() else 0.03
+        return int(min(max(wait * 1000, 1), 50))
+
+    def dropped_frames(self):
+        """
+        Frames never shown: skipped by the producer because they were late, or superseded on the ring
+        """
+        return self.dropped + self.skipped
+
+    def target_fps(self):
+        return self.frame_index.fps
+
+    def real_fps(self):
+        """
+        Frames actually displayed per second, over the last 30 frames
+        """
+        if len(self.display_times) < 2:
+            return 0.0
+        return (len(self.display_times) - 1) / (self.display_times[-1] - self.display_times[0])
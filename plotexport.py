@@ -0,0 +1,179 @@
+# This module renders many sensor plots (sessions x column sets x time windows) on a process pool
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+import plotting
+import sensordataIO
+
+# Shared blocks attached by this (worker) process: name -> (SharedMemory, time, values)
+_attached = {}
+
+class SharedFrame:
+    """
+    Sample times and channels of a sensor DataFrame copied once into a shared memory block, so pool
+    workers map the same pages instead of receiving pickled DataFrames. The block holds the times
+    (float64) followed by a channels x samples matrix of the channel dtype (float32 stays float32).
+
+    Only 'spec' (block name, sizes and column names) goes to the workers.
+    """
+
+    def __init__(self, df, columns=None, time_col='seconds_passed'):
+        if columns is None:
+            columns = [col for col, dtype in df.dtypes.items()
+                       if col != time_col and np.issubdtype(dtype, np.number)]
+        self.columns = list(columns)
+        dtype = np.result_type(*[df[col].dtype for col in self.columns]) if self.columns else np.float64
+        n = len(df)
+        self.shm = shared_memory.SharedMemory(create=True, size=max(8 * n + dtype.itemsize * n * len(self.columns), 1))
+        self.spec = {'name': self.shm.name, 'n': n, 'dtype': dtype.str, 'columns': self.columns}
+        t, values = attach_arrays(self.shm, self.spec)
+        t[:] = df[time_col].to_numpy()
+        for i, col in enumerate(self.columns):
+            values[i] = df[col].to_numpy()
+
+    def close(self):
+        """
+        Releases the block (workers still attached keep their mapping until they exit)
+        """
+        self.shm.close()
+        self.shm.unlink()
+
+def attach_arrays(shm, spec):
+    """
+    (time, values) views of a SharedFrame block
+    """
+    n = spec['n']
+    t = np.ndarray(n, dtype=np.float64, buffer=shm.buf)
+    values = np.ndarray((len(spec['columns']), n), dtype=np.dtype(spec['dtype']), buffer=shm.buf, offset=8 * n)
+    return t, values
+
+def attached(spec):
+    """
+    (time, values) of a block, attached once per worker process
+    """
+    entry = _attached.get(spec['name'])
+    if entry is None:
+        shm = shared_memory.SharedMemory(name=spec['name'])
+        entry = _attached[spec['name']] = (shm, *attach_arrays(shm, spec))
+    return entry[1], entry[2]
+
+def render_job(job):
+    """
+    Renders one figure (runs on the workers): columns 'columns' of block 'data' between 'start' and
+    'end' seconds on 'path'. Returns (path, seconds taken).
+    """
+    begin = time.perf_counter()
+    spec = job['data']
+    t, values = attached(spec)
+    i0 = 0 if job.get('start') is None else int(np.searchsorted(t, job['start'], side='left'))
+    i1 = len(t) if job.get('end') is None else int(np.searchsorted(t, job['end'], side='left'))
+    rows = [spec['columns'].index(col) for col in job['columns']]
+    plotting.render_figure(t[i0:i1], {col: values[row, i0:i1] for col, row in zip(job['columns'], rows)},
+                           job['path'], layout=job.get('layout', 'overlay'), title=job.get('title'),
+                           size=job.get('size', (6.4, 4.8)), dpi=job.get('dpi', 100))
+    return job['path'], time.perf_counter() - begin
+
+class PlotExporter:
+    """
+    Plot export engine: DataFrames are shared once (SharedFrame) and each figure is a small job
+    rendered on a pool of 'workers' processes with the Agg backend.
+
+    Usage:
+
+    with PlotExporter(workers=4) as exporter:
+        data = exporter.share(df)
+        exporter.submit(data, ['AccX(g)', 'AccY(g)'], 'out/acc.svg', layout='tiled')
+        paths = exporter.wait()
+    """
+
+    def __init__(self, workers=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.pool = ProcessPoolExecutor(max_workers=self.workers)
+        self.frames = []
+        self.futures = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def share(self, df, columns=None):
+        """
+        Copies the channels of 'df' to shared memory; returns the spec jobs refer to
+        """
+        frame = SharedFrame(df, columns)
+        self.frames.append(frame)
+        return frame.spec
+
+    def submit(self, data, columns, path, start=None, end=None, layout='overlay', title=None,
+               size=(6.4, 4.8), dpi=100):
+        """
+        Queues one figure of 'columns' of the shared 'data' (times between 'start' and 'end', in seconds)
+        """
+        missing = [col for col in columns if col not in data['columns']]
+        if missing:
+            raise ValueError(f"Colunas inexistentes: {missing}")
+        if layout not in plotting.LAYOUTS:
+            raise ValueError(f"Layout inválido: {layout} (use um de {plotting.LAYOUTS})")
+        job = {'data': data, 'columns': list(columns), 'path': path, 'start': start, 'end': end,
+               'layout': layout, 'title': title, 'size': size, 'dpi': dpi}
+        self.futures.append(self.pool.submit(render_job, job))
+
+    def wait(self):
+        """
+        Waits for the queued figures; returns [(path, render seconds)] in submission order
+        """
+        futures, self.futures = self.futures, []
+        return [future.result() for future in futures]
+
+    def close(self):
+        self.pool.shutdown(cancel_futures=True)
+        for frame in self.frames:
+            frame.close()
+        self.frames = []
+
+def export_windows(exporter, df, columns, out_dir, name, window=None, fmt='png', layout='overlay', time_col='seconds_passed'):
+    """
+    Queues the figures of one session: the whole recording, or one per 'window' seconds
+    """
+    data = exporter.share(df, columns)
+    t = df[time_col].to_numpy()
+    if not len(t):
+        return 0
+    starts = [None] if not window else np.arange(t[0], t[-1], window)
+    for k, start in enumerate(starts):
+        end = None if start is None else start + window
+        suffix = '' if start is None else f'_{k:04d}'
+        title = name if start is None else f"{name} {start:.0f}-{end:.0f} s"
+        exporter.submit(data, columns, os.path.join(out_dir, f'{name}{suffix}.{fmt}'), start, end, layout, title)
+    return len(starts)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exports plots of WIT sensor logs on a process pool")
+    parser.add_argument('sensors', nargs='+', help="sensor .txt logs")
+    parser.add_argument('--columns', nargs='+', default=['AccX(g)', 'AccY(g)', 'AccZ(g)'])
+    parser.add_argument('--out', default='./data/plots', help="output directory")
+    parser.add_argument('--window', type=float, default=None, help="one figure per window of this many seconds")
+    parser.add_argument('--format', choices=['png', 'svg'], default='png')
+    parser.add_argument('--layout', choices=plotting.LAYOUTS, default='overlay')
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    os.makedirs(args.out, exist_ok=True)
+    start = time.perf_counter()
+    with PlotExporter(args.workers) as exporter:
+        for path in args.sensors:
+            dropped = [col for col in sensordataIO.METADATA_COLUMNS if col in sensordataIO.read_header(path)]
+            df = sensordataIO.read_data(path, *dropped)
+            name = os.path.splitext(os.path.basename(path))[0]
+            export_windows(exporter, df, args.columns, args.out, name, args.window, args.format, args.layout)
+        rendered = exporter.wait()
+    elapsed = time.perf_counter() - start
+    print(f"{len(rendered)} figuras em {elapsed:.1f} s ({len(rendered) / elapsed * 60:.0f} por minuto)")
@@ -1,19 +1,129 @@
-import matplotlib.pyplot as plt
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+import lod
+
+# Plot layouts: every channel on one axes, or one axes per channel stacked on a shared time axis
+LAYOUTS = ['overlay', 'tiled']
 
 def plot_graph(df, *args, **kwargs):
     """
     Plots a graph according to data in 'df' and the columns informed on '*args'.
+
+    The figure is rendered with the object-oriented Agg API (no pyplot state) and released once
+    saved, so calling it in a loop does not keep figures alive.
+    """
+    t = df['seconds_passed'].to_numpy()
+    render_figure(t, {col: df[col].to_numpy() for col in args},
+                  kwargs.get('plot_path') if kwargs.get('plot_path') else './data/plot.png',
+                  layout=kwargs.get('layout', 'overlay'))
+
+def render_figure(t, channels, path, layout='overlay', title=None, size=(6.4, 4.8), dpi=100):
     """
-    _, ax = plt.subplots()
+    Saves the plot of 'channels' against 't' on 'path' (format from the extension: .png, .svg, .pdf...).
 
-    for arg in args:
-        ax.plot(df['seconds_passed'], df[arg], label=arg)
-        ax.legend()
+    Each line only gets the points visible at the figure width (min/max envelope, see lod), so the
+    cost does not grow with the length of the recording. The figure is closed explicitly.
 
-    plt.xlabel('Seconds')
-    plt.ylabel('Value')
-    
-    plt.savefig(kwargs.get('plot_path') if kwargs.get('plot_path') else './data/plot.png')
+    params:
+
+    t : array -> sorted sample times (s);
+    channels : dict -> label -> values, one per sample;
+    layout : string -> 'overlay' or 'tiled' (see LAYOUTS);
+    size : tuple -> figure (width, height) in inches
+
+    returns:
+
+    path : string
+    """
+    if layout not in LAYOUTS:
+        raise ValueError(f"Layout inválido: {layout} (use um de {LAYOUTS})")
+    fig = Figure(figsize=size, dpi=dpi)
+    FigureCanvasAgg(fig)
+    n_points = max(int(2 * size[0] * dpi), 2)
+    try:
+        if layout == 'overlay' or len(channels) < 2:
+            axes = [fig.add_subplot()] * max(len(channels), 1)
+        else:
+            axes = fig.subplots(len(channels), 1, sharex=True, squeeze=False)[:, 0]
+        for ax, (label, y) in zip(axes, channels.items()):
+            points = lod.MinMaxPyramid(t, y).query(t[0], t[-1], n_points) if len(t) else ([], [])
+            ax.plot(*points, label=label, linewidth=0.8)
+            if layout == 'tiled':
+                ax.set_ylabel(label, fontsize='small')
+        if layout == 'overlay':
+            axes[0].legend(loc='upper right')
+            axes[0].set_ylabel('Value')
+        axes[-1].set_xlabel('Seconds')
+        if title:
+            fig.suptitle(title)
+        # Fixed margins: a layout engine would measure every tick label on each save
+        fig.subplots_adjust(left=0.15 if layout == 'tiled' else 0.12, right=0.96, bottom=0.1, top=0.9 if title else 0.95,
+                            hspace=0.1)
+        fig.savefig(path)
+    finally:
+        fig.clear()
+    return path
 
 def save_video(video, video_path='./data/video.mp4'):
-    video.write_videofile(video_path)
\ No newline at end of file
+    video.write_videofile(video_path)
+
+class CursorPlot:
+    """
+    Sensor lines drawn once on 'ax', plus a time cursor moved with blitting.
+
+    The figure without the cursor is kept as a background (refreshed on every full draw, e.g.
+    on resize), so moving the cursor only restores it and redraws the cursor artist.
+    """
+
+    def __init__(self, ax, canvas):
+        self.ax = ax
+        self.canvas = canvas
+        self.cursor = None
+        self.background = None
+        self.df = None
+        self.columns = []
+        canvas.mpl_connect('draw_event', self.on_draw)
+
+    def plot(self, df, columns, title=None):
+        """
+        Draws 'columns' of 'df' against seconds_passed (full redraw)
+        """
+        self.ax.clear()
+        lod.plot_columns(self.ax, df, columns)
+        self.cursor = self.ax.axvline(0, color='r', linestyle='--', label='Tempo Atual', animated=True)
+        self.ax.set_xlabel("Tempo (s)")
+        self.ax.set_ylabel("Valor")
+        if title:
+            self.ax.set_title(title)
+        self.ax.legend(loc='upper right')
+        self.df = df
+        self.columns = list(columns)
+        self.background = None
+        self.canvas.draw()
+
+    def is_plotted(self, df, columns):
+        """
+        True if 'columns' of this same 'df' are the ones on the axes
+        """
+        return self.cursor is not None and self.df is df and self.columns == list(columns)
+
+    def on_draw(self, event):
+        if self.cursor is None:
+            return
+        self.background = self.canvas.copy_from_bbox(self.ax.figure.bbox)
+        self.ax.draw_artist(self.cursor)
+
+    def move(self, seconds):
+        """
+        Moves the cursor to 'seconds' redrawing only the cursor
+        """
+        if self.cursor is None:
+            return
+        self.cursor.set_xdata([seconds, seconds])
+        if self.background is None:
+            self.canvas.draw()
+            return
+        self.canvas.restore_region(self.background)
+        self.ax.draw_artist(self.cursor)
+        self.canvas.blit(self.ax.bbox)
@@ -0,0 +1,175 @@
+# This module keeps parsed sensor logs in an on-disk cache, so each session is parsed only once
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+import warnings
+
+import columnar
+
+# Bump when the output of sensordataIO.read_data changes, so old entries are not reused
+CACHE_VERSION = 2
+
+DEFAULT_CACHE_DIR = os.environ.get('VIDEOSYNC_CACHE_DIR',
+                                   os.path.join(os.path.expanduser('~'), '.cache', 'videosync'))
+DEFAULT_MAX_BYTES = 2 * 2**30
+
+# read_data options that do not change the parsed data
+IGNORED_OPTIONS = ['cache', 'engine', 'chunksize']
+
+ENTRY_FILE = 'entry.json'
+
+class SensorCache:
+    """
+    Size-bounded LRU cache of parsed sensor DataFrames.
+
+    Each entry is a columnar.save_frame directory named after a key built from the file
+    path, size and modification time (or a hash of its content) plus the read options.
+    Entries are loaded back as memory maps and evicted least recently used first once the
+    cache grows beyond 'max_bytes'.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES, content_hash=False):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.content_hash = content_hash
+
+    def key(self, fpath, *args, **kwargs):
+        """
+        Builds the cache key of reading 'fpath' with columns 'args' dropped and options 'kwargs'
+        """
+        stat = os.stat(fpath)
+        if self.content_hash:
+            source = file_hash(fpath)
+        else:
+            source = [os.path.abspath(fpath), stat.st_size, stat.st_mtime_ns]
+        options = {k: repr(v) for k, v in sorted(kwargs.items()) if k not in IGNORED_OPTIONS}
+        payload = json.dumps([CACHE_VERSION, source, list(args), options], ensure_ascii=False)
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+    def entry_path(self, key):
+        return os.path.join(self.cache_dir, key)
+
+    def get(self, key):
+        """
+        Returns the cached DataFrame for 'key' (memory-mapped) or None on a miss
+        """
+        path = self.entry_path(key)
+        try:
+            df = columnar.load_frame(path)
+        except (OSError, ValueError):
+            return None
+        # Entry file mtime marks the last use, for LRU eviction
+        os.utime(os.path.join(path, ENTRY_FILE))
+        return df
+
+    def put(self, key, df, fpath):
+        """
+        Stores 'df' (read from 'fpath') under 'key' and evicts old entries if needed
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self.entry_path(key)
+        tmp_path = os.path.join(self.cache_dir, f'.tmp-{uuid.uuid4().hex}')
+        try:
+            nbytes = columnar.save_frame(df, tmp_path)
+            with open(os.path.join(tmp_path, ENTRY_FILE), 'w', encoding='utf-8') as f:
+                json.dump({'source': os.path.abspath(fpath), 'nbytes': nbytes, 'created': time.time()}, f)
+            shutil.rmtree(path, ignore_errors=True)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            warnings.warn(f"Não foi possível salvar o cache de {fpath}: {e}")
+            return
+        self.evict()
+
+    def entries(self):
+        """
+        Lists the cache entries as dicts (key, source, nbytes, last_used), most recently used first
+        """
+        if not os.path.isdir(self.cache_dir):
+            return []
+        entries = []
+        for key in os.listdir(self.cache_dir):
+            entry_file = os.path.join(self.cache_dir, key, ENTRY_FILE)
+            try:
+                with open(entry_file, encoding='utf-8') as f:
+                    entry = json.load(f)
+                entry.update(key=key, last_used=os.path.getmtime(entry_file))
+            except (OSError, ValueError):
+                continue
+            entries.append(entry)
+        return sorted(entries, key=lambda e: e['last_used'], reverse=True)
+
+    def evict(self):
+        """
+        Removes least recently used entries until the cache fits in 'max_bytes'
+        """
+        total = 0
+        for entry in self.entries():
+            total += entry['nbytes']
+            if total > self.max_bytes:
+                self.remove(entry['key'])
+
+    def remove(self, key):
+        shutil.rmtree(self.entry_path(key), ignore_errors=True)
+
+    def invalidate(self, fpath=None):
+        """
+        Removes every entry read from 'fpath', or the whole cache if no path is informed.
+
+        returns:
+
+        removed : int -> number of removed entries
+        """
+        source = os.path.abspath(fpath) if fpath else None
+        removed = 0
+        for entry in self.entries():
+            if source is None or entry['source'] == source:
+                self.remove(entry['key'])
+                removed += 1
+        return removed
+
+def file_hash(fpath, block_size=2**20):
+    """
+    SHA-1 of the content of 'fpath'
+    """
+    digest = hashlib.sha1()
+    with open(fpath, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+_default_cache = None
+
+def default_cache():
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = SensorCache()
+    return _default_cache
+
+def resolve(cache):
+    """
+    Maps the 'cache' option of read_data to a SensorCache: True means the default cache,
+    False/None disables caching
+    """
+    if cache is True:
+        return default_cache()
+    return cache or None
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manages the cache of parsed sensor logs")
+    parser.add_argument('--dir', default=DEFAULT_CACHE_DIR, help="cache directory")
+    parser.add_argument('--invalidate', metavar='TXT', help="removes the entries of this sensor log")
+    parser.add_argument('--clear', action='store_true', help="removes every entry")
+    args = parser.parse_args()
+
+    cache = SensorCache(args.dir)
+    if args.clear or args.invalidate:
+        print(f"{cache.invalidate(args.invalidate)} entradas removidas")
+    else:
+        for entry in cache.entries():
+            print(f"{entry['key']}  {entry['nbytes'] / 2**20:8.1f} MiB  {entry['source']}")
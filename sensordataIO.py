@@ -3,13 +3,123 @@
 import pandas as pd
 import numpy as np
 
-def read_txt(fpath):
+import sensorcache
+import txtindex
+
+# Columns of the WIT export that are not numeric channels
+TEXT_COLUMNS = ['time', 'DeviceName', 'Version()']
+
+# Device metadata columns, usually dropped when reading (see read_data *args)
+METADATA_COLUMNS = ['DeviceName', 'Version()', 'Battery level(%)']
+
+# Channel dtype and 'time' resolution of the compact mode (read_data compact=True); 'seconds_passed'
+# stays float64: float32 seconds lose the millisecond after about 2 hours
+COMPACT_DTYPE = 'float32'
+COMPACT_TIME = 'datetime64[us]'
+
+def read_header(fpath):
     """
-    Reads the WIT sensor .txt file
+    Reads the column names on the first line of the WIT sensor .txt file
+    """
+    with open(fpath, encoding='utf-8-sig') as f:
+        return f.readline().rstrip('\r\n').split('\t')
+
+def read_txt(fpath, engine='c', usecols=None, float_dtype='float64'):
+    """
+    Reads the WIT sensor .txt file ('usecols' only, when given: the other fields are skipped by the parser)
+
+    Channels are declared as 'float_dtype' up front so the C (or pyarrow) parser never has to
+    infer types. In case some channel is not numeric, falls back to inferred dtypes.
     """
-    df = pd.read_csv(fpath, sep='	', engine='python')
+    dtypes = txt_dtypes(fpath, float_dtype)
+    try:
+        df = pd.read_csv(fpath, sep='\t', engine=engine, dtype=dtypes, usecols=usecols)
+    except ValueError:
+        df = pd.read_csv(fpath, sep='\t', engine=engine, dtype={col: str for col in dtypes if col in TEXT_COLUMNS},
+                         usecols=usecols)
     return df
 
+def read_txt_chunks(fpath, chunksize, engine='c', usecols=None, float_dtype='float64'):
+    """
+    Reads the WIT sensor .txt file 'chunksize' rows at a time (iterator of DataFrames).
+
+    Uses the same explicit dtypes as read_txt, without the fallback to inferred ones.
+    """
+    return pd.read_csv(fpath, sep='\t', engine=engine, dtype=txt_dtypes(fpath, float_dtype), chunksize=chunksize,
+                       usecols=usecols)
+
+def projection(fpath, *args, **kwargs):
+    """
+    Columns read_txt must parse for the 'columns' option of read_data (None: all of them) and the
+    columns of 'args' still to be dropped
+    """
+    columns = kwargs.get('columns')
+    if columns is None:
+        return None, list(args)
+    header = read_header(fpath)
+    missing = [col for col in columns if col not in header]
+    if missing:
+        raise ValueError(f"Colunas inexistentes em {fpath}: {missing}")
+    return ['time', *[col for col in columns if col != 'time']], []
+
+def txt_dtypes(fpath, float_dtype='float64'):
+    """
+    Column dtypes of the WIT sensor .txt file: text columns as str, channels as 'float_dtype'
+    """
+    return {col: (str if col in TEXT_COLUMNS else float_dtype) for col in read_header(fpath) if col}
+
+def channel_dtype(**kwargs):
+    """
+    Dtype of the channels for the read_data options (float32 with compact=True)
+    """
+    return COMPACT_DTYPE if kwargs.get('compact') else 'float64'
+
+def compact_frame(df, time_col='time'):
+    """
+    Compact mode of a sensor DataFrame: float64 channels as float32 and 'time' at microsecond
+    resolution (int64 microseconds). 'seconds_passed' and columns already compact are kept as they are.
+    """
+    for col, dtype in df.dtypes.items():
+        if dtype == np.float64 and col != 'seconds_passed':
+            df[col] = df[col].astype(COMPACT_DTYPE)
+        elif col == time_col and pd.api.types.is_datetime64_dtype(dtype) and dtype != COMPACT_TIME:
+            df[col] = df[col].astype(COMPACT_TIME)
+    return df
+
+def parse_time(time_col):
+    """
+    Converts the WIT 'time' column to datetime64.
+
+    The sensor writes milliseconds without zero padding ('2024-05-20 10:15:30:5' means 5 ms),
+    so the field is split off and added as an integer offset instead of being fixed row by row.
+    """
+    raw = time_col.to_numpy(dtype='S')
+    width = raw.dtype.itemsize
+    chars = raw.view(np.uint8).reshape(len(raw), width)
+    last_colon = width - 1 - np.argmax(chars[:, ::-1] == ord(':'), axis=1)
+
+    if len(raw) and np.all(last_colon == last_colon[0]):
+        # Usual case: every timestamp has the same layout, so the byte matrix is sliced directly
+        split = last_colon[0]
+        base = raw.astype(f'S{split}').astype('U')
+        field = chars[:, split + 1:]
+        is_digit = field != 0
+        digits = is_digit.sum(axis=1)
+        value = np.zeros(len(raw), dtype=np.int64)
+        for j in range(field.shape[1]):
+            value = np.where(is_digit[:, j], value * 10 + field[:, j].astype(np.int64) - ord('0'), value)
+    else:
+        parts = time_col.str.rpartition(':')
+        base = parts[0]
+        digits = parts[2].str.len().to_numpy()
+        value = parts[2].astype('int64').to_numpy()
+
+    # Same meaning as zfill(3) followed by '%f': at least 3 digits, right padded to nanoseconds
+    nanoseconds = value * 10 ** (9 - np.maximum(digits, 3))
+    time = pd.to_datetime(base, format='%Y-%m-%d %H:%M:%S') + pd.to_timedelta(nanoseconds, unit='ns')
+
+    return pd.Series(time, index=time_col.index, name=time_col.name)
+
 def clean_data(df, *args):
     """
     Drops columns on dataframe according to args
@@ -24,28 +134,53 @@ def read_data(fpath, *args, **kwargs):
 
     fpath : string -> wit sensor .txt file path;
     *args : string -> columns to be dropped;
-    **kwargs -> configuration for preprocess (e.g. groupMethod, camera_freq)
+    **kwargs -> configuration for preprocess (e.g. groupMethod, camera_freq, resampleMethod), CSV engine ('c' or 'pyarrow'),
+                chunksize (parses the file in chunks, see iter_data),
+                columns (channels to parse besides 'time'; the others are skipped, see read_columns to read them later),
+                compact (True parses the channels as float32 and keeps 'time' in microseconds, see compact_frame)
+                and cache (True for the default sensorcache, a SensorCache instance, or False to always parse)
 
     returns:
 
     df : DataFrame -> pandas dataframe with sensor data adjusted to camera time base
     """
 
+    cache = sensorcache.resolve(kwargs.get('cache', True))
+    if not cache:
+        return parse_data(fpath, *args, **kwargs)
+
+    key = cache.key(fpath, *args, **kwargs)
+    df = cache.get(key)
+    if df is None:
+        df = parse_data(fpath, *args, **kwargs)
+        cache.put(key, df, fpath)
+    return df
+
+def parse_data(fpath, *args, **kwargs):
+    """
+    Same as read_data, always parsing the .txt file (no cache).
+
+    With a 'chunksize' option the file is parsed in chunks (see iter_data), which bounds the
+    memory used by the intermediate copies.
+    """
+    if kwargs.get('chunksize'):
+        return pd.concat(iter_data(fpath, *args, **kwargs), ignore_index=True)
+
     # Reading data
-    df = read_txt(fpath)
+    usecols, args = projection(fpath, *args, **kwargs)
+    df = read_txt(fpath, engine=kwargs.get('engine', 'c'), usecols=usecols, float_dtype=channel_dtype(**kwargs))
     if args:
         df = clean_data(df, *args)
 
-    # Data preprocess
-    def fix_milliseconds(time_str):
-        parts = time_str.rsplit(':', 1)
-        if len(parts) == 2:
-            milliseconds = parts[1].zfill(3)
-            return f"{parts[0]}:{milliseconds}"
-        return time_str
+    return preprocess(df, **kwargs)
 
-    df['time'] = df['time'].apply(fix_milliseconds)
-    df['time'] = pd.to_datetime(df['time'], format='%Y-%m-%d %H:%M:%S:%f')
+def preprocess(df, **kwargs):
+    """
+    Parses the 'time' column of the raw data, adds 'seconds_passed' and groups or resamples it (see read_data)
+    """
+    df['time'] = parse_time(df['time'])
+    if kwargs.get('compact'):
+        df = compact_frame(df)
 
     # Tempo inicial e segundos passados
     initial_date = df['time'].iloc[0]
@@ -56,29 +191,29 @@ def read_data(fpath, *args, **kwargs):
     if camera_freq:
         start_time = df['seconds_passed'].iloc[0]
         end_time = df['seconds_passed'].iloc[-1]
-        num_frames = int((end_time - start_time) * camera_freq) + 1
+        timebase = camera_timebase(start_time, end_time, camera_freq)
+        df = resample(df, timebase, method=kwargs.get('resampleMethod', 'linear'))
 
-        # Nova base de tempo com frequência da câmera
-        new_timebase = pd.DataFrame({
-            'seconds_passed': pd.Series(np.linspace(start_time, end_time, num=num_frames))
-        })
+    else:
+        df = group_data(df, **kwargs)
 
-        # Interpola todas as colunas numéricas para a nova base
-        numeric_cols = df.select_dtypes(include='number').columns.drop('seconds_passed')
-        df_interp = pd.merge(new_timebase, df[['seconds_passed'] + list(numeric_cols)], on='seconds_passed', how='left')
-        df_interp[numeric_cols] = df_interp[numeric_cols].interpolate(method='linear')
+    return df
 
-        df = df_interp.reset_index(drop=True)
+def group_data(df, **kwargs):
+    """
+    Groups preprocessed sensor data according to groupMethod ('NbyN' (default), 'seconds_passed' or 'noGroup')
+    """
+    group_method = kwargs.get('groupMethod') or 'NbyN'
 
     # === Agrupamento, se necessário ===
-    elif not kwargs.get('groupMethod') or kwargs.get('groupMethod') == 'NbyN':
+    if group_method == 'NbyN':
         N = kwargs.get('groupN') if kwargs.get('groupN') else 4
-        df = df.groupby(df.index // N).mean().reset_index(drop=True)
+        df = df.groupby(np.arange(len(df)) // N).mean().reset_index(drop=True)
 
-    elif kwargs.get('groupMethod') == "seconds_passed":
+    elif group_method == "seconds_passed":
         df = df.groupby('seconds_passed').mean().reset_index()
 
-    elif kwargs.get('groupMethod') == "noGroup":
+    elif group_method == "noGroup":
         pass
 
     else:
@@ -86,4 +221,237 @@ def read_data(fpath, *args, **kwargs):
 
     return df
 
+def iter_data(fpath, *args, chunksize=100_000, **kwargs):
+    """
+    Reads data like read_data, parsing 'chunksize' rows at a time and yielding the preprocessed
+    DataFrame of each chunk, so peak memory depends on the chunk size instead of the file size.
+
+    Rows that may belong to a group continuing on the next chunk (last incomplete NbyN group,
+    last seconds_passed value, last sample before the next camera frame) are carried over, so
+    concatenating the chunks gives the same data as read_data. Assumes time never goes back in the log.
+
+    params:
+
+    fpath : string -> wit sensor .txt file path;
+    *args : string -> columns to be dropped;
+    chunksize : int -> rows parsed at a time;
+    **kwargs -> same preprocess configuration as read_data
+
+    yields:
+
+    df : DataFrame -> preprocessed chunk, indexed by its position on the whole output
+    """
+    camera_freq = kwargs.get('camera_freq')
+    method = kwargs.get('resampleMethod', 'linear')
+    group_method = kwargs.get('groupMethod') or 'NbyN'
+    if group_method not in ('NbyN', 'seconds_passed', 'noGroup'):
+        raise Exception("groupMethod informado é inválido!")
+    N = kwargs.get('groupN') if kwargs.get('groupN') else 4
+
+    initial_date = None
+    carry = None
+    n_out = 0
+    next_frame = 0
+
+    def emit(df, timebase=None):
+        nonlocal n_out
+        df = group_data(df, **kwargs) if timebase is None else resample(df, timebase, method=method)
+        df.index = pd.RangeIndex(n_out, n_out + len(df))
+        n_out += len(df)
+        return df
+
+    usecols, args = projection(fpath, *args, **kwargs)
+    for df in read_txt_chunks(fpath, chunksize, engine=kwargs.get('engine', 'c'), usecols=usecols,
+                              float_dtype=channel_dtype(**kwargs)):
+        if args:
+            df = clean_data(df, *args)
+        df['time'] = parse_time(df['time'])
+        if kwargs.get('compact'):
+            df = compact_frame(df)
+
+        if initial_date is None:
+            initial_date = df['time'].iloc[0]
+        df['seconds_passed'] = (df['time'] - initial_date).dt.total_seconds()
+
+        if carry is not None:
+            df = pd.concat([carry, df], ignore_index=True)
+
+        if camera_freq:
+            # Frames before the last sample already have both neighbours on this chunk
+            last = df['seconds_passed'].iloc[-1]
+            frames = np.arange(next_frame, int(last * camera_freq) + 2)
+            frames = frames[frames / camera_freq < last]
+            carry = df.iloc[-1:].reset_index(drop=True)
+            if len(frames):
+                next_frame = frames[-1] + 1
+                yield emit(df, frames / camera_freq)
+            continue
+
+        # Keeps the rows whose group may continue on the next chunk
+        if group_method == 'NbyN':
+            n_complete = len(df) - len(df) % N
+        elif group_method == 'seconds_passed':
+            n_complete = int(np.searchsorted(df['seconds_passed'].to_numpy(), df['seconds_passed'].iloc[-1]))
+        else:
+            n_complete = len(df)
+        carry = df.iloc[n_complete:].reset_index(drop=True)
+
+        if n_complete:
+            yield emit(df.iloc[:n_complete].reset_index(drop=True))
+
+    if camera_freq and carry is not None:
+        frames = np.arange(next_frame, int(carry['seconds_passed'].iloc[-1] * camera_freq) + 1)
+        if len(frames):
+            yield emit(carry, frames / camera_freq)
+    elif carry is not None and len(carry):
+        yield emit(carry)
+
+def read_columns(fpath, names, **kwargs):
+    """
+    Reads only the channels 'names' of the .txt file, preprocessed with the same options as read_data, so
+    they line up row by row with a DataFrame read_data returned for those options (e.g. a 'columns'
+    projection read before, when other channels are asked for later). A 'columns' option is ignored.
+
+    The fields are cut from the file through its txtindex.TxtIndex (built on the first call for the file):
+    nothing else is tokenized or converted. The 'time' column is only parsed again when the options
+    need the sample times (seconds_passed grouping or camera_freq resampling).
+
+    params:
+
+    fpath : string -> wit sensor .txt file path;
+    names : list -> numeric channels;
+    **kwargs -> same preprocess and cache options as read_data
+
+    returns:
+
+    df : DataFrame -> one column per channel of 'names'
+    """
+    # The projection read_data got does not change the rows, only which channels it parsed
+    kwargs.pop('columns', None)
+    cache = sensorcache.resolve(kwargs.get('cache', True))
+    if cache:
+        key = cache.key(fpath, *names, read_columns=True, **kwargs)
+        df = cache.get(key)
+        if df is not None:
+            return df
+
+    index = txtindex.load_index(fpath)
+    missing = [col for col in names if col not in index.fields]
+    if missing:
+        raise ValueError(f"Colunas inexistentes em {fpath}: {missing}")
+    data = {col: index.read_column(col, dtype=channel_dtype(**kwargs)) for col in names}
+
+    if kwargs.get('camera_freq') or kwargs.get('groupMethod') == 'seconds_passed':
+        df = preprocess(pd.DataFrame({'time': pd.Series(index.read_times().astype('U')), **data}, copy=False), **kwargs)
+    else:
+        df = group_data(pd.DataFrame(data, copy=False), **kwargs)
+    df = df[list(names)]
+
+    if cache:
+        cache.put(key, df, fpath)
+    return df
+
+def camera_timebase(start_time, end_time, camera_freq):
+    """
+    Times of the camera frames (k / camera_freq seconds after 'start_time') up to 'end_time'
+    """
+    num_frames = int((end_time - start_time) * camera_freq) + 1
+    return start_time + np.arange(num_frames) / camera_freq
+
+def resample(df, timebase, method='linear', time_col='seconds_passed'):
+    """
+    Resamples every numeric column of 'df' onto 'timebase' (e.g. camera_timebase or the
+    presentation timestamps of the video frames), by time instead of by row.
+
+    A single binary search per target time finds the neighbouring samples, which are then
+    shared by every channel, so the cost is O(m log n) plus O(m) per channel instead of
+    copying the whole data. Targets outside the data take the first/last sample.
+
+    params:
+
+    df : DataFrame -> sensor data sorted by 'time_col';
+    timebase : array -> sorted target times, in the same unit as 'time_col';
+    method : string -> 'linear', 'nearest' or 'zoh' (zero-order hold: last sample at or before the target);
+    time_col : string -> column holding the sample times
+
+    returns:
+
+    df : DataFrame -> 'time_col' with the timebase followed by the resampled numeric columns
+    """
+    timebase = np.asarray(timebase, dtype=np.float64)
+    positions = resample_positions(df[time_col].to_numpy(dtype=np.float64), timebase, method)
+    numeric_cols = [col for col, dtype in df.dtypes.items()
+                    if col != time_col and pd.api.types.is_numeric_dtype(dtype)]
+
+    resampled = {time_col: timebase}
+    for col in numeric_cols:
+        values = df[col].to_numpy()
+        # Keeps float32 channels as float32, integer ones become float64 (linear) or keep their dtype
+        dtype = np.result_type(values.dtype, np.float16) if method == 'linear' else values.dtype
+        resampled[col] = resample_into(values, positions, np.empty(len(timebase), dtype=dtype))
+
+    return pd.DataFrame(resampled, copy=False)
+
+def resample_positions(times, timebase, method='linear'):
+    """
+    Neighbouring samples of each target time of 'timebase' (one binary search), shared by every
+    channel resampled with resample_into
+
+    params:
+
+    times : array -> sorted sample times;
+    timebase : array -> sorted target times;
+    method : string -> 'linear', 'nearest' or 'zoh'
+
+    returns:
+
+    positions : dict
+    """
+    n = len(times)
+    # Last sample at or before each target and the one after it
+    idx = np.searchsorted(times, timebase, side='right') - 1
+    before, after = idx < 0, idx >= n - 1
+    idx = np.clip(idx, 0, max(n - 2, 0))
+    nxt = np.minimum(idx + 1, n - 1)
+
+    if method == 'linear':
+        with np.errstate(invalid='ignore', divide='ignore'):
+            weight = (timebase - times[idx]) / (times[nxt] - times[idx])
+        return {'method': method, 'idx': idx, 'nxt': nxt, 'before': before, 'after': after,
+                'weights': {np.dtype(np.float64): weight}}
+    if method == 'nearest':
+        source = np.where((times[nxt] - timebase < timebase - times[idx]) & ~before | after, nxt, idx)
+    elif method == 'zoh':
+        source = np.where(after, nxt, idx)
+    else:
+        raise Exception("Método de reamostragem informado é inválido!")
+    return {'method': method, 'source': source}
+
+def resample_into(values, positions, out):
+    """
+    Writes the channel 'values' resampled at 'positions' (see resample_positions) into 'out', e.g. a
+    row of a preallocated matrix. 'nearest'/'zoh' only gather; 'linear' needs one temporary array.
+
+    returns:
+
+    out : array
+    """
+    if positions['method'] != 'linear':
+        np.take(values, positions['source'], out=out, mode='clip')
+        return out
 
+    idx, nxt = positions['idx'], positions['nxt']
+    values = values.astype(out.dtype, copy=False)
+    # The weight is cast once per channel dtype (float32 channels stay float32)
+    weights = positions['weights']
+    if out.dtype not in weights:
+        weights[out.dtype] = weights[np.dtype(np.float64)].astype(out.dtype)
+    start = values[idx]
+    np.take(values, nxt, out=out, mode='clip')
+    with np.errstate(invalid='ignore'):
+        np.subtract(out, start, out=out)
+        np.multiply(out, weights[out.dtype], out=out)
+        np.add(out, start, out=out)
+    out[positions['before']] = values[0]
+    out[positions['after']] = values[-1]
+    return out
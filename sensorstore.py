@@ -0,0 +1,104 @@
+# This module keeps sensor recordings as contiguous arrays that are cut by time without copying
+
+import numpy as np
+import pandas as pd
+
+import columnar
+
+class SensorStore:
+    """
+    Sensor recording as one array per column plus the sorted time array.
+
+    Time ranges are found with binary searches and a cut only slices the arrays, so the cut shares memory
+    with the recording (memory maps stay on disk). Cuts keep the original times and store an offset
+    instead: the times seen by users, time - offset, are computed only when asked for.
+
+    params:
+
+    time : array -> sorted sample times (s);
+    columns : dict -> column name -> array with one value per sample;
+    offset : float -> subtracted from 'time' on the times returned;
+    time_col : string -> name of the time column on DataFrames
+    """
+
+    def __init__(self, time, columns, offset=0.0, time_col='seconds_passed'):
+        self.time = np.asarray(time)
+        self.columns = columns
+        self.offset = offset
+        self.time_col = time_col
+
+    @classmethod
+    def from_frame(cls, df, time_col='seconds_passed'):
+        """
+        Store over the columns of 'df' (views of its arrays, no copies for numeric/datetime columns)
+        """
+        return cls(df[time_col].to_numpy(), {col: df[col].to_numpy() for col in df.columns}, time_col=time_col)
+
+    @classmethod
+    def open(cls, path, time_col='seconds_passed'):
+        """
+        Store over a DataFrame saved with columnar.save_frame, memory-mapped
+        """
+        return cls.from_frame(columnar.load_frame(path, mmap=True), time_col)
+
+    def __len__(self):
+        return len(self.time)
+
+    def __getitem__(self, col):
+        if col == self.time_col:
+            return self.times()
+        return self.columns[col]
+
+    def times(self):
+        """
+        Sample times minus the offset (the only array a cut allocates)
+        """
+        return self.time - self.offset if self.offset else self.time
+
+    def index_range(self, start=None, end=None):
+        """
+        Positions [i0, i1) of the samples with start < time - offset < end (None leaves that side open)
+        """
+        i0 = 0 if start is None else int(np.searchsorted(self.time, start + self.offset, side='right'))
+        i1 = len(self.time) if end is None else int(np.searchsorted(self.time, end + self.offset, side='left'))
+        return i0, max(i0, i1)
+
+    def slice(self, i0, i1, offset=None):
+        """
+        Store with the samples [i0, i1), sharing memory with this one
+        """
+        return SensorStore(self.time[i0:i1], {col: values[i0:i1] for col, values in self.columns.items()},
+                           self.offset if offset is None else offset, self.time_col)
+
+    def window(self, start=None, end=None):
+        """
+        Samples with start < time < end, keeping the time base
+        """
+        return self.slice(*self.index_range(start, end))
+
+    def cut(self, start_time=None, video_length=None):
+        """
+        Same cut as actionstart.make_cuts_sensor: samples after 'start_time' and before
+        'start_time + video_length' (or 'video_length' without a start), with the times starting at 0
+        on the first sample kept
+        """
+        end = None if video_length is None else (start_time or 0) + video_length
+        i0, i1 = self.index_range(start_time, end)
+        return self.slice(i0, i1, offset=self.time[i0] if i1 > i0 else self.offset)
+
+    def to_frame(self):
+        """
+        DataFrame over the arrays of the store (copy=False); only the time column is computed. The
+        shared columns are read-only views: writing into them raises instead of changing the recording
+        (assigning a whole new column still works).
+        """
+        data = {col: (self.times() if col == self.time_col else values) for col, values in self.columns.items()}
+        return pd.DataFrame({col: read_only(values) for col, values in data.items()}, copy=False)
+
+def read_only(values):
+    """
+    Read-only view of 'values'
+    """
+    view = values.view()
+    view.flags.writeable = False
+    return view
@@ -0,0 +1,299 @@
+# This module serves the sync/cut/plot pipeline as queued jobs over a local HTTP API
+
+import argparse
+import asyncio
+import collections
+import json
+import os
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+import actionstart
+import alignment
+import batch
+import plotting
+import sensorcache
+import sensordataIO
+
+STATUS_TEXT = {200: 'OK', 202: 'Accepted', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+               413: 'Payload Too Large', 500: 'Internal Server Error', 503: 'Service Unavailable'}
+
+MAX_BODY_BYTES = 1 << 20
+
+# Stages run on the process pool (top level functions, so they can be pickled)
+
+def read_sensor(path):
+    dropped = [col for col in sensordataIO.METADATA_COLUMNS if col in sensordataIO.read_header(path)]
+    return sensordataIO.read_data(path, *dropped)
+
+def plot_sensor(df, columns, plot_path):
+    plotting.plot_graph(df, *columns, plot_path=plot_path)
+    return plot_path
+
+def cut_sensor(df, data_start, data_duration, csv_path):
+    df = actionstart.make_cuts_sensor(df, data_start, data_duration)
+    df.to_csv(csv_path, index=False)
+    return df
+
+class FrameCache:
+    """
+    Parsed sensor DataFrames kept in memory, least recently used evicted once they add up to more
+    than 'max_bytes'. Keys are sensorcache keys (path, size, modification time and read options).
+    """
+
+    def __init__(self, max_bytes=1 << 30):
+        self.max_bytes = max_bytes
+        self.frames = collections.OrderedDict()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        df = self.frames.get(key)
+        if df is None:
+            self.misses += 1
+            return None
+        self.frames.move_to_end(key)
+        self.hits += 1
+        return df
+
+    def put(self, key, df):
+        if key in self.frames:
+            return
+        self.frames[key] = df
+        self.nbytes += int(df.memory_usage(index=False).sum())
+        while self.nbytes > self.max_bytes and len(self.frames) > 1:
+            _, old = self.frames.popitem(last=False)
+            self.nbytes -= int(old.memory_usage(index=False).sum())
+
+    def stats(self):
+        return {'entries': len(self.frames), 'MiB': self.nbytes / 2**20, 'hits': self.hits, 'misses': self.misses}
+
+class JobServer:
+    """
+    Runs jobs (batch manifest entries) with at most 'workers' at a time. CPU bound stages (parsing,
+    alignment, video cut, plot) go to a process pool of the same size; the sensor cut is a binary
+    search on the cached data and runs on a thread.
+
+    Submitted jobs wait on a queue of 'max_queue' entries: once it is full, submissions are refused
+    (HTTP 503) until jobs finish, instead of piling up. Parsed logs stay on a FrameCache, and jobs on
+    a log already being parsed wait for that parse.
+    """
+
+    def __init__(self, out_dir, workers=2, max_queue=16, cache_bytes=1 << 30, max_jobs=1000):
+        self.out_dir = out_dir
+        self.workers = workers
+        self.queue = asyncio.Queue(max_queue)
+        self.pool = ProcessPoolExecutor(max_workers=workers)
+        self.cache = FrameCache(cache_bytes)
+        self.parsing = {}
+        self.jobs = collections.OrderedDict()
+        self.max_jobs = max_jobs
+        self.tasks = []
+
+    def start(self):
+        self.tasks = [asyncio.create_task(self.worker()) for _ in range(self.workers)]
+
+    async def close(self):
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.pool.shutdown(cancel_futures=True)
+
+    def submit(self, spec):
+        """
+        Queues a job; returns its record, or None if the queue is full
+        """
+        job_id = uuid.uuid4().hex[:12]
+        job = batch.parse_job({'name': job_id, **spec})
+        record = {'id': job_id, 'status': 'queued', 'job': job, 'submitted': time.time(),
+                  'timings': {}, 'outputs': {}}
+        try:
+            self.queue.put_nowait(record)
+        except asyncio.QueueFull:
+            return None
+        self.jobs[job_id] = record
+        # Only the last 'max_jobs' records are kept (the oldest finished ones are dropped)
+        while len(self.jobs) > self.max_jobs:
+            oldest = next(iter(self.jobs.values()))
+            if oldest['status'] in ('queued', 'running'):
+                break
+            self.jobs.popitem(last=False)
+        return record
+
+    async def worker(self):
+        while True:
+            record = await self.queue.get()
+            record['status'] = 'running'
+            record['started'] = time.time()
+            try:
+                await self.run(record)
+                record['status'] = 'done'
+            except Exception as e:
+                record['status'] = 'failed'
+                record['error'] = f"{type(e).__name__}: {e}"
+            record['finished'] = time.time()
+            self.queue.task_done()
+
+    async def stage(self, record, name, func, *args, pool=True):
+        loop = asyncio.get_running_loop()
+        record['stage'] = name
+        start = time.perf_counter()
+        result = await loop.run_in_executor(self.pool if pool else None, func, *args)
+        record['timings'][name] = time.perf_counter() - start
+        return result
+
+    async def sensor_data(self, record, path):
+        key = sensorcache.SensorCache().key(path, 'read_sensor')
+        df = self.cache.get(key)
+        if df is not None:
+            record['timings']['read'] = 0.0
+            record['cached'] = True
+            return df
+        record['cached'] = False
+        # A parse of the same log already running is awaited instead of started again
+        parse = self.parsing.get(key)
+        if parse is None:
+            parse = self.parsing[key] = asyncio.ensure_future(self.stage(record, 'read', read_sensor, path))
+            try:
+                df = await parse
+            finally:
+                del self.parsing[key]
+            self.cache.put(key, df)
+            return df
+        start = time.perf_counter()
+        df = await asyncio.shield(parse)
+        record['timings']['read'] = time.perf_counter() - start
+        return df
+
+    async def run(self, record):
+        job = record['job']
+        path = os.path.join(self.out_dir, record['id'])
+        os.makedirs(path, exist_ok=True)
+        df = await self.sensor_data(record, job['sensor'])
+        record['sensor_rows'] = len(df)
+
+        video_start, data_start = job['video_start'], job['data_start']
+        if data_start == 'auto':
+            if not job['video']:
+                raise ValueError("data_start 'auto' precisa do vídeo")
+            lag, confidence = await self.stage(record, 'align', alignment.estimate_offset, job['video'], df,
+                                               video_start, job['video_duration'])
+            record['offset'] = {'lag': lag, 'confidence': confidence}
+            data_start = video_start + lag
+            if data_start < 0:
+                video_start, data_start = -lag, 0.0
+
+        record['outputs']['sensor'] = os.path.join(path, 'sensor.csv')
+        cut = await self.stage(record, 'cut_sensor', cut_sensor, df, data_start, job['data_duration'],
+                               record['outputs']['sensor'], pool=False)
+
+        if job['video']:
+            duration = job['video_duration'] or job['data_duration']
+            if duration is None:
+                raise ValueError("Informe video_duration (ou data_duration) para cortar o vídeo")
+            record['outputs']['video'] = await self.stage(record, 'cut_video', actionstart.make_cuts_video,
+                                                          job['video'], video_start, duration,
+                                                          os.path.join(path, 'video.mp4'))
+        if job['columns']:
+            record['outputs']['plot'] = await self.stage(record, 'plot', plot_sensor, cut, job['columns'],
+                                                         os.path.join(path, 'plot.png'))
+        record.pop('stage', None)
+
+    def status(self):
+        return {'workers': self.workers, 'queued': self.queue.qsize(), 'queue_size': self.queue.maxsize,
+                'running': sum(record['status'] == 'running' for record in self.jobs.values()),
+                'cache': self.cache.stats()}
+
+    async def handle(self, reader, writer):
+        try:
+            status, body = await self.respond(reader)
+        except Exception as e:
+            status, body = 500, {'error': f"{type(e).__name__}: {e}"}
+        payload = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        headers = [f"HTTP/1.1 {status} {STATUS_TEXT[status]}", 'Content-Type: application/json; charset=utf-8',
+                   f"Content-Length: {len(payload)}", 'Connection: close']
+        if status == 503:
+            headers.append('Retry-After: 1')
+        writer.write(('\r\n'.join(headers) + '\r\n\r\n').encode('ascii') + payload)
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def respond(self, reader):
+        """
+        Reads one request and returns (HTTP status, JSON body)
+        """
+        request_line = (await reader.readline()).decode('latin-1').split()
+        if len(request_line) < 2:
+            return 400, {'error': "Requisição inválida"}
+        method, target = request_line[0], request_line[1].split('?')[0].rstrip('/')
+        length = 0
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            if name.strip().lower() == 'content-length':
+                length = int(value)
+        if length > MAX_BODY_BYTES:
+            return 413, {'error': "Corpo da requisição grande demais"}
+        body = await reader.readexactly(length) if length else b''
+
+        if target == '/health' and method == 'GET':
+            return 200, self.status()
+        if target == '/jobs' and method == 'GET':
+            return 200, {'jobs': [summary(record) for record in self.jobs.values()]}
+        if target == '/jobs' and method == 'POST':
+            try:
+                spec = json.loads(body or b'{}')
+                record = self.submit(spec)
+            except (ValueError, KeyError, TypeError) as e:
+                return 400, {'error': f"Job inválido: {e}"}
+            if record is None:
+                return 503, {'error': "Fila cheia, tente novamente", **self.status()}
+            return 202, summary(record)
+        if target.startswith('/jobs/'):
+            if method != 'GET':
+                return 405, {'error': "Método não permitido"}
+            record = self.jobs.get(target[len('/jobs/'):])
+            if record is None:
+                return 404, {'error': "Job não encontrado"}
+            return 200, summary(record)
+        return 404, {'error': "Rota não encontrada"}
+
+def summary(record):
+    """
+    JSON view of a job record
+    """
+    keys = ['id', 'status', 'stage', 'job', 'submitted', 'started', 'finished', 'cached', 'sensor_rows',
+            'offset', 'timings', 'outputs', 'error']
+    return {key: record[key] for key in keys if key in record}
+
+async def serve(host, port, out_dir, workers, max_queue, cache_bytes):
+    server = JobServer(out_dir, workers, max_queue, cache_bytes)
+    server.start()
+    http = await asyncio.start_server(server.handle, host, port)
+    print(f"Servidor em http://{host}:{port} ({workers} processos, fila de {max_queue} jobs)")
+    try:
+        async with http:
+            await http.serve_forever()
+    finally:
+        await server.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serves sync/cut/plot jobs over a local HTTP API")
+    parser.add_argument('--host', default='127.0.0.1', help="address to listen on (default: localhost only)")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--out', default='./data/server', help="output directory (one folder per job)")
+    parser.add_argument('--workers', type=int, default=2, help="jobs (and processes) at the same time")
+    parser.add_argument('--queue', type=int, default=16, help="jobs waiting before submissions are refused")
+    parser.add_argument('--cache-mb', type=int, default=1024, help="memory for parsed sensor logs (MiB)")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve(args.host, args.port, args.out, args.workers, args.queue, args.cache_mb * 2**20))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,207 @@
+# This module merges the logs of several sensors worn at the same time onto one time-aligned channel matrix
+
+import argparse
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import alignment
+import columnar
+import features
+import sensordataIO
+import sensorstore
+
+# Separates the device from the column on the channel names ('<device>/<column>')
+SEPARATOR = '/'
+
+class SensorSession:
+    """
+    Sensor logs on a common timebase: one contiguous array with a row per channel of every device.
+
+    params:
+
+    time : array -> common sample times (s, 0 at 'start');
+    values : array -> channels x samples (float64, or float32 for compact sessions; C-contiguous);
+    channels : list -> (device, column) of each row of 'values';
+    start : Timestamp -> clock time of time 0 (on the clock of the first device);
+    offsets : dict -> device -> seconds added to its clock to match the first device
+    """
+
+    def __init__(self, time, values, channels, start=None, offsets=None):
+        self.time = time
+        self.values = values
+        self.channels = list(channels)
+        self.start = start
+        self.offsets = offsets or {}
+        self.rows = {self.name(device, column): i for i, (device, column) in enumerate(self.channels)}
+
+    @staticmethod
+    def name(device, column):
+        return f"{device}{SEPARATOR}{column}"
+
+    def names(self):
+        return list(self.rows)
+
+    def devices(self):
+        return list(dict.fromkeys(device for device, _ in self.channels))
+
+    def __len__(self):
+        return len(self.time)
+
+    def __getitem__(self, name):
+        """
+        Row of channel '<device>/<column>' (a view of the matrix)
+        """
+        return self.values[self.rows[name]]
+
+    def to_store(self, time_col='seconds_passed'):
+        """
+        SensorStore over the rows of the matrix (views), so cuts and plots work on every device at once
+        """
+        columns = {time_col: self.time}
+        columns.update((name, self.values[i]) for name, i in self.rows.items())
+        return sensorstore.SensorStore(self.time, columns, time_col=time_col)
+
+    def to_frame(self):
+        """
+        DataFrame with 'seconds_passed' and one column per channel, over the matrix rows (no copies)
+        """
+        return self.to_store().to_frame()
+
+    def save(self, path):
+        """
+        Saves the channels on the columnar format (columnar.load_frame reads them back memory-mapped)
+        """
+        return columnar.save_frame(self.to_frame(), path)
+
+def device_labels(paths):
+    """
+    Device label of each log: its file name without extension (numbered when repeated)
+    """
+    stems = [os.path.splitext(os.path.basename(path))[0] for path in paths]
+    return [stem if stems.count(stem) == 1 else f"{stem}{i + 1}" for i, stem in enumerate(stems)]
+
+def read_logs(paths, workers=None, compact=False):
+    """
+    Reads the logs without grouping (all samples, absolute 'time' kept) on a thread pool: the
+    parsing and the time conversion run on C code that releases the GIL
+    """
+    def read(path):
+        dropped = [col for col in sensordataIO.METADATA_COLUMNS if col in sensordataIO.read_header(path)]
+        return sensordataIO.read_data(path, *dropped, groupMethod='noGroup', compact=compact)
+
+    workers = workers or min(len(paths), os.cpu_count() or 1)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(read, paths))
+
+def clock_times(df, epoch):
+    """
+    Sample times of 'df' in seconds since 'epoch', on the clock of its device
+    """
+    return (df['time'] - epoch).dt.total_seconds().to_numpy()
+
+def estimate_clock_offsets(frames, epoch, max_lag=5.0, rate=50, columns=alignment.ACC_COLUMNS):
+    """
+    Offsets of the device clocks against the first one, by cross-correlating their acceleration
+    activity (sensors on the same body move together).
+
+    returns:
+
+    offsets : list -> seconds to add to the clock of each device (0 for the first one);
+    confidences : list -> correlation of each device with the first one at its offset
+    """
+    reference_t, reference = alignment.acceleration_activity(frames[0], columns)
+    reference_t = reference_t - reference_t[0] + clock_times(frames[0].iloc[:1], epoch)[0]
+    offsets, confidences = [0.0], [1.0]
+    for df in frames[1:]:
+        t, activity = alignment.acceleration_activity(df, columns)
+        t = t - t[0] + clock_times(df.iloc[:1], epoch)[0]
+        lag, confidence = alignment.best_lag(reference_t, reference, t, activity, rate, max_lag)
+        if lag is None:
+            raise ValueError("Os registros dos sensores não se sobrepõem o suficiente para estimar os relógios")
+        offsets.append(-lag)
+        confidences.append(confidence)
+    return offsets, confidences
+
+def load_session(paths, labels=None, offsets=None, sync=False, rate=None, span='overlap', method='linear',
+                 workers=None, compact=False):
+    """
+    Loads N sensor logs and resamples them on one uniform timebase.
+
+    Each log is read on its own thread; the clock of each device is corrected by its offset, then every
+    channel is resampled (one binary search per device, sensordataIO.resample_positions) straight into
+    its row of the matrix by sensordataIO.resample_into, without a resampled DataFrame per device.
+
+    params:
+
+    labels : list -> device names (default: the file names);
+    offsets : list -> seconds added to each device clock (default: 0);
+    sync : bool -> estimates the offsets from the acceleration (overrides 'offsets');
+    rate : float -> rate of the common timebase (default: the highest rate of the logs);
+    span : string -> 'overlap' (time covered by every log) or 'union' (channels are NaN where their log has no data);
+    method : string -> resampling method ('linear', 'nearest' or 'zoh');
+    compact : bool -> float32 channels (see sensordataIO.compact_frame), half the memory of the matrix
+
+    returns:
+
+    session : SensorSession
+    """
+    if not paths:
+        raise ValueError("Informe ao menos um registro de sensor")
+    labels = list(labels) if labels else device_labels(paths)
+    frames = read_logs(paths, workers, compact)
+    epoch = frames[0]['time'].iloc[0]
+
+    if sync:
+        offsets, _ = estimate_clock_offsets(frames, epoch)
+    offsets = list(offsets) if offsets is not None else [0.0] * len(frames)
+    times = [clock_times(df, epoch) + offset for df, offset in zip(frames, offsets)]
+
+    if span == 'overlap':
+        t0, t1 = max(t[0] for t in times), min(t[-1] for t in times)
+        if t1 <= t0:
+            raise ValueError("Os registros dos sensores não se sobrepõem no tempo")
+    elif span == 'union':
+        t0, t1 = min(t[0] for t in times), max(t[-1] for t in times)
+    else:
+        raise ValueError(f"span inválido: {span} (use 'overlap' ou 'union')")
+    rate = rate or max(features.sampling_rate(t) for t in times)
+    timebase = sensordataIO.camera_timebase(t0, t1, rate)
+
+    channels = [(label, col) for label, df in zip(labels, frames)
+                for col in df.columns if col not in ('time', 'seconds_passed')]
+    values = np.empty((len(channels), len(timebase)), dtype=sensordataIO.channel_dtype(compact=compact))
+    row = 0
+    for df, t in zip(frames, times):
+        # One binary search per device; each channel is written straight into its row
+        positions = sensordataIO.resample_positions(t, timebase, method)
+        outside = (timebase < t[0]) | (timebase > t[-1])
+        for col in df.columns:
+            if col in ('time', 'seconds_passed'):
+                continue
+            sensordataIO.resample_into(df[col].to_numpy(), positions, values[row])
+            values[row, outside] = np.nan
+            row += 1
+
+    return SensorSession(timebase - t0, values, channels, start=epoch + pd.to_timedelta(t0, unit='s'),
+                         offsets=dict(zip(labels, offsets)))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Merges WIT sensor logs recorded at the same time")
+    parser.add_argument('sensors', nargs='+', help="sensor .txt logs")
+    parser.add_argument('--out', required=True, help="output directory (columnar format)")
+    parser.add_argument('--offsets', type=float, nargs='*', default=None, help="seconds added to each device clock")
+    parser.add_argument('--sync', action='store_true', help="estimates the clock offsets from the acceleration")
+    parser.add_argument('--rate', type=float, default=None, help="rate of the common timebase (Hz)")
+    parser.add_argument('--span', choices=['overlap', 'union'], default='overlap')
+    parser.add_argument('--compact', action='store_true', help="stores the channels as float32")
+    args = parser.parse_args()
+
+    session = load_session(args.sensors, offsets=args.offsets, sync=args.sync, rate=args.rate, span=args.span,
+                           compact=args.compact)
+    session.save(args.out)
+    for device, offset in session.offsets.items():
+        print(f"{device}: {offset:+.3f} s")
+    print(f"{len(session):,} amostras x {len(session.channels)} canais salvos em {args.out}")
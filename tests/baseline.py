@@ -0,0 +1,56 @@
+# Baseline implementations (before the performance work) that the tests compare the outputs against
+
+import numpy as np
+import pandas as pd
+
+def read_data(fpath, *args, **kwargs):
+    """
+    sensordataIO.read_data of the baseline: python engine, row by row millisecond fix, merge + interpolate
+    """
+    df = pd.read_csv(fpath, sep='\t', engine='python')
+    if args:
+        df = df.drop(columns=[*args])
+
+    def fix_milliseconds(time_str):
+        parts = time_str.rsplit(':', 1)
+        if len(parts) == 2:
+            milliseconds = parts[1].zfill(3)
+            return f"{parts[0]}:{milliseconds}"
+        return time_str
+
+    df['time'] = df['time'].apply(fix_milliseconds)
+    df['time'] = pd.to_datetime(df['time'], format='%Y-%m-%d %H:%M:%S:%f')
+
+    initial_date = df['time'].iloc[0]
+    df['seconds_passed'] = (df['time'] - initial_date).dt.total_seconds()
+
+    camera_freq = kwargs.get("camera_freq", None)
+    if camera_freq:
+        start_time = df['seconds_passed'].iloc[0]
+        end_time = df['seconds_passed'].iloc[-1]
+        num_frames = int((end_time - start_time) * camera_freq) + 1
+
+        new_timebase = pd.DataFrame({
+            'seconds_passed': pd.Series(np.linspace(start_time, end_time, num=num_frames))
+        })
+
+        numeric_cols = df.select_dtypes(include='number').columns.drop('seconds_passed')
+        df_interp = pd.merge(new_timebase, df[['seconds_passed'] + list(numeric_cols)], on='seconds_passed', how='left')
+        df_interp[numeric_cols] = df_interp[numeric_cols].interpolate(method='linear')
+
+        df = df_interp.reset_index(drop=True)
+
+    elif not kwargs.get('groupMethod') or kwargs.get('groupMethod') == 'NbyN':
+        N = kwargs.get('groupN') if kwargs.get('groupN') else 4
+        df = df.groupby(df.index // N).mean().reset_index(drop=True)
+
+    elif kwargs.get('groupMethod') == "seconds_passed":
+        df = df.groupby('seconds_passed').mean().reset_index()
+
+    elif kwargs.get('groupMethod') == "noGroup":
+        pass
+
+    else:
+        raise Exception("groupMethod informado é inválido!")
+
+    return df
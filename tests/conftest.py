@@ -0,0 +1,48 @@
+# The modules live at the repository root (no package), so the tests import them from there
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+import benchmark
+import sensordataIO
+
+@pytest.fixture(scope='session')
+def sensor_log(tmp_path_factory):
+    """
+    Synthetic WIT log: 5000 samples at 200 Hz, milliseconds without zero padding
+    """
+    return benchmark.make_synthetic_log(str(tmp_path_factory.mktemp('logs') / 'log.txt'), 5000, rate=200)
+
+@pytest.fixture(scope='session')
+def metadata(sensor_log):
+    """
+    Metadata columns of the synthetic log, dropped when reading it
+    """
+    return [col for col in sensordataIO.METADATA_COLUMNS if col in sensordataIO.read_header(sensor_log)]
+
+@pytest.fixture(autouse=True)
+def isolated_cache(tmp_path_factory, monkeypatch):
+    """
+    read_data's default cache goes to a temporary directory instead of the user's one
+    """
+    import sensorcache
+    monkeypatch.setattr(sensorcache, '_default_cache', sensorcache.SensorCache(str(tmp_path_factory.mktemp('cache'))))
+
+@pytest.fixture(scope='session')
+def vfr_video(tmp_path_factory):
+    """
+    Variable frame rate video: 20 fps for 2 s, then frames twice as far apart (the mp4 edit list
+    drops the last one)
+    """
+    import subprocess
+    import videoindex
+    path = str(tmp_path_factory.mktemp('video') / 'vfr.mp4')
+    subprocess.run([videoindex.ffmpeg_exe(), '-hide_banner', '-loglevel', 'error', '-y',
+                    '-f', 'lavfi', '-i', 'testsrc2=size=160x120:rate=20', '-t', '4',
+                    '-vf', "setpts='if(lt(T,2),PTS,2*PTS-2/TB)'", '-fps_mode', 'vfr',
+                    '-c:v', 'libx264', '-g', '10', '-pix_fmt', 'yuv420p', path], check=True)
+    return path
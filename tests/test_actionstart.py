@@ -0,0 +1,97 @@
+# Tests of the video cuts: frame counts and content of each mode against the source frames
+
+import shutil
+import subprocess
+
+import cv2
+import numpy as np
+import pytest
+
+import actionstart
+import benchmark
+import videoindex
+
+FPS = 30
+
+@pytest.fixture(scope='module')
+def source(tmp_path_factory):
+    # Keyframes every second
+    path = benchmark.make_synthetic_video(str(tmp_path_factory.mktemp('video') / 'source.mp4'), 4, fps=FPS,
+                                          size='160x120', gop=FPS)
+    return path, read_frames(path)
+
+@pytest.fixture
+def video(source, tmp_path):
+    path = str(tmp_path / 'video.mp4')
+    shutil.copy(source[0], path)
+    return path
+
+def read_frames(path):
+    cap = cv2.VideoCapture(path)
+    frames = []
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame.astype(np.int16))
+    cap.release()
+    return frames
+
+def assert_source_frames(path, source_frames, first, end, exact=False):
+    """
+    The frames of 'path' are the source frames [first, end), in order
+    """
+    frames = read_frames(path)
+    assert len(frames) == end - first
+    for k, frame in enumerate(frames):
+        errors = [np.abs(frame - candidate).mean() for candidate in source_frames]
+        assert int(np.argmin(errors)) == first + k
+        if exact:
+            assert errors[first + k] == 0
+
+def test_smart_cut_is_frame_accurate(video, source):
+    # 0.5 s to 2.5 s: partial GOPs on both edges, a whole one in between
+    path = actionstart.make_cuts_video(video, 0.5, 2.0, mode='smart')
+    assert path == video.replace('.mp4', '_cut_0.5s_2.0s.mp4')
+    assert_source_frames(path, source[1], 15, 75)
+    index = videoindex.build_frame_index(path)
+    assert np.allclose(np.diff(index.pts), 1 / FPS, atol=1e-3)
+
+def test_smart_cut_inside_one_gop(video, source, tmp_path):
+    path = actionstart.make_cuts_video(video, 1.2, 0.5, output_path=str(tmp_path / 'cut.mp4'), mode='smart')
+    assert_source_frames(path, source[1], 36, 51)
+
+def test_copy_cut_widens_to_keyframes(video, source, tmp_path):
+    path = actionstart.make_cuts_video(video, 1.5, 1.0, output_path=str(tmp_path / 'cut.mp4'), mode='copy')
+    assert_source_frames(path, source[1], 30, 90, exact=True)
+
+def test_auto_copies_aligned_cuts(video, source, tmp_path):
+    path = actionstart.make_cuts_video(video, 1.0, 2.0, output_path=str(tmp_path / 'cut.mp4'))
+    assert_source_frames(path, source[1], 30, 90, exact=True)
+    # Up to the end of the video
+    path = actionstart.make_cuts_video(video, 3.0, 5.0, output_path=str(tmp_path / 'end.mp4'))
+    assert_source_frames(path, source[1], 90, 120, exact=True)
+
+def test_auto_cuts_unaligned_frame_accurately(video, source, tmp_path):
+    path = actionstart.make_cuts_video(video, 0.9, 1.2, output_path=str(tmp_path / 'cut.mp4'))
+    assert_source_frames(path, source[1], 27, 63)
+
+def test_cut_keeps_audio(video, tmp_path):
+    path = actionstart.make_cuts_video(video, 0.5, 2.0, output_path=str(tmp_path / 'cut.mp4'))
+    streams = subprocess.run([videoindex.ffmpeg_exe(), '-hide_banner', '-i', path],
+                             capture_output=True, text=True).stderr
+    assert 'Audio:' in streams
+
+def test_reencode_like_the_baseline(video, source, tmp_path):
+    # The baseline cut: MoviePy subclip re-encoded with libx264
+    path = actionstart.make_cuts_video(video, 1.0, 1.0, output_path=str(tmp_path / 'cut.mp4'), mode='reencode')
+    frames = read_frames(path)
+    assert abs(len(frames) - FPS) <= 1
+    errors = [np.abs(frames[0] - candidate).mean() for candidate in source[1]]
+    assert abs(int(np.argmin(errors)) - 30) <= 1
+
+def test_invalid_cuts(video):
+    with pytest.raises(ValueError):
+        actionstart.make_cuts_video(video, 0.0, 1.0, mode='fast')
+    with pytest.raises(ValueError):
+        actionstart.make_cuts_video(video, 10.0, 1.0)
@@ -0,0 +1,96 @@
+# Tests of the video/sensor offset estimation
+
+import subprocess
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import alignment
+import videoindex
+
+BURSTS = [2.0, 5.5, 6.5, 9.0, 14.0, 16.5]
+
+def test_normalized_xcorr_matches_pearson():
+    rng = np.random.default_rng(0)
+    a, b = rng.normal(size=40), rng.normal(size=55)
+    lags, r = alignment.normalized_xcorr(a, b, min_overlap=5)
+    assert lags[0] == -(40 - 5) and lags[-1] == 55 - 5
+    for lag, value in zip(lags, r):
+        i = np.arange(max(0, -lag), min(40, 55 - lag))
+        assert value == pytest.approx(np.corrcoef(a[i], b[i + lag])[0, 1], abs=1e-9)
+
+def test_normalized_xcorr_of_constant_overlap():
+    lags, r = alignment.normalized_xcorr(np.ones(10), np.arange(10.0))
+    assert np.all(r == 0)
+
+def test_moving_average():
+    y = np.arange(10.0) ** 2
+    averaged = alignment.moving_average(y, 3)
+    assert averaged[0] == pytest.approx((0 + 1) / 2)
+    assert averaged[5] == pytest.approx((16 + 25 + 36) / 3)
+    assert np.array_equal(alignment.moving_average(y, 1), y)
+
+def bursts(t, times, width=0.3):
+    return sum(np.exp(-0.5 * ((t - center) / width) ** 2) for center in times)
+
+@pytest.mark.parametrize('lag', [3.37, -1.52, 0.0])
+def test_best_lag_recovers_shift(lag):
+    a_t = np.arange(0, 20, 1 / 30)
+    b_t = np.arange(-5, 30, 1 / 100) + 0.004
+    lag_found, confidence = alignment.best_lag(a_t, bursts(a_t, BURSTS), b_t, bursts(b_t, np.add(BURSTS, lag)))
+    assert lag_found == pytest.approx(lag, abs=0.02)
+    assert confidence > 0.95
+
+def test_best_lag_limits():
+    a_t = np.arange(0, 20, 1 / 30)
+    b_t = np.arange(0, 30, 1 / 100)
+    a, b = bursts(a_t, BURSTS), bursts(b_t, np.add(BURSTS, 6.0))
+    lag, _ = alignment.best_lag(a_t, a, b_t, b, max_lag=3)
+    assert abs(lag) <= 3
+    assert alignment.best_lag(a_t, a, b_t + 100, b, max_lag=3) == (None, 0.0)
+
+def test_acceleration_activity_removes_gravity():
+    t = np.arange(0, 10, 0.01)
+    df = pd.DataFrame({'seconds_passed': t, 'AccX(g)': np.zeros_like(t), 'AccY(g)': np.zeros_like(t),
+                       'AccZ(g)': np.ones_like(t)})
+    df.loc[500:510, 'AccX(g)'] = 2.0
+    _, activity = alignment.acceleration_activity(df)
+    assert np.all(activity[:300] < 1e-9) and np.all(activity[700:] < 1e-9)
+    assert activity[500:511].min() > 0.5
+
+@pytest.fixture(scope='module')
+def motion_video(tmp_path_factory):
+    """
+    20 s at 20 fps of a still image, with random frames around BURSTS
+    """
+    path = str(tmp_path_factory.mktemp('video') / 'motion.mp4')
+    rng = np.random.default_rng(1)
+    still = rng.integers(0, 256, (48, 64), dtype=np.uint8)
+    frames = []
+    for t in np.arange(400) / 20:
+        moving = min(abs(t - center) for center in BURSTS) < 0.3
+        frames.append(rng.integers(0, 256, (48, 64), dtype=np.uint8) if moving else still)
+    subprocess.run([videoindex.ffmpeg_exe(), '-hide_banner', '-loglevel', 'error', '-y', '-f', 'rawvideo',
+                    '-pix_fmt', 'gray', '-s', '64x48', '-r', '20', '-i', '-', '-c:v', 'libx264', '-g', '20',
+                    '-pix_fmt', 'yuv420p', path], input=np.stack(frames).tobytes(), check=True)
+    return path
+
+def test_motion_energy(motion_video):
+    t, energy = alignment.motion_energy(motion_video, size=(32, 24), chunk_frames=7)
+    assert len(t) == 400 and t[1] == pytest.approx(0.05)
+    moving = np.array([min(abs(time - center) for center in BURSTS) < 0.3 for time in np.arange(400) / 20])
+    # energy[k] compares frames k - 1 and k
+    assert energy[1:][moving[:-1] & moving[1:]].min() > 5 * energy[1:][~moving[:-1] & ~moving[1:]].max()
+
+    part_t, part = alignment.motion_energy(motion_video, start=5.0, duration=2.0, size=(32, 24))
+    assert part_t[0] == pytest.approx(5.0) and len(part_t) == 40
+    assert np.allclose(part[1:], energy[101:140], atol=1e-3)
+
+def test_estimate_offset(motion_video):
+    t = np.arange(0, 30, 0.01)
+    df = pd.DataFrame({'seconds_passed': t, 'AccX(g)': np.zeros_like(t), 'AccY(g)': np.zeros_like(t),
+                       'AccZ(g)': 1 + bursts(t, np.add(BURSTS, 4.2), width=0.15)})
+    lag, confidence = alignment.estimate_offset(motion_video, df)
+    assert lag == pytest.approx(4.2, abs=0.1)
+    assert confidence > 0.5
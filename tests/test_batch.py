@@ -0,0 +1,73 @@
+# Tests of the batch manifests, job names and resumed runs
+
+import json
+import os
+
+import pandas as pd
+import pytest
+
+import batch
+import benchmark
+import sensordataIO
+
+def write_csv(path, rows):
+    pd.DataFrame(rows).to_csv(path, index=False)
+    return str(path)
+
+def test_read_csv_and_json(tmp_path):
+    rows = [{'video': 'a.mp4', 'sensor': 'a.txt', 'video_start': 1, 'video_duration': 5,
+             'data_start': 'auto', 'data_duration': '', 'columns': 'AccX(g); AccY(g)', 'name': 'first'},
+            {'video': '', 'sensor': 'logs/b.txt', 'video_start': '', 'video_duration': '',
+             'data_start': 2.5, 'data_duration': 10, 'columns': '', 'name': ''}]
+    from_csv = batch.read_manifest(write_csv(tmp_path / 'jobs.csv', rows))
+    (tmp_path / 'jobs.json').write_text(json.dumps({'jobs': [{k: v for k, v in row.items() if v != ''}
+                                                             for row in rows]}))
+    from_json = batch.read_manifest(str(tmp_path / 'jobs.json'))
+    assert from_csv == from_json
+
+    first, second = from_csv
+    assert first == {'name': 'first', 'video': str(tmp_path / 'a.mp4'), 'sensor': str(tmp_path / 'a.txt'),
+                     'video_start': 1.0, 'video_duration': 5.0, 'data_start': 'auto', 'data_duration': None,
+                     'columns': ['AccX(g)', 'AccY(g)']}
+    assert second['video'] is None and second['sensor'] == str(tmp_path / 'logs' / 'b.txt')
+    assert (second['video_start'], second['data_start'], second['data_duration']) == (0.0, 2.5, 10.0)
+    assert second['name'].startswith('b_') and second['columns'] == []
+
+def test_default_name_follows_the_job():
+    job = {'video': 'v.mp4', 'sensor': 's.txt', 'video_start': 1, 'data_start': 3, 'data_duration': 5}
+    name = batch.parse_job(job)['name']
+    assert name.startswith('v_')
+    assert batch.parse_job(dict(job))['name'] == name
+    assert batch.parse_job({**job, 'columns': 'AccX(g)'})['name'] == name
+    assert batch.parse_job({**job, 'data_start': 4})['name'] != name
+    assert batch.parse_job({**job, 'sensor': 'other.txt'})['name'] != name
+    assert batch.parse_job({**job, 'name': 'mine'})['name'] == 'mine'
+
+def test_reordered_manifest_resumes(tmp_path):
+    sensor = benchmark.make_synthetic_log(str(tmp_path / 'log.txt'), 4000, rate=200)
+    rows = [{'sensor': 'log.txt', 'data_start': start, 'data_duration': 5, 'columns': 'AccX(g)'}
+            for start in (0, 5)]
+    out = str(tmp_path / 'out')
+    dropped = [col for col in sensordataIO.METADATA_COLUMNS if col in sensordataIO.read_header(sensor)]
+    rows_read = len(sensordataIO.read_data(sensor, *dropped))
+    jobs = batch.read_manifest(write_csv(tmp_path / 'jobs.csv', rows))
+    assert len({job['name'] for job in jobs}) == 2
+    assert batch.run_batch(jobs, out, workers=1, video=False) == []
+    for job in jobs:
+        done = json.load(open(os.path.join(out, job['name'], batch.DONE_FILE), encoding='utf-8'))
+        assert done['sensor_rows'] == rows_read
+        cut = pd.read_csv(done['outputs']['sensor'])
+        assert cut['seconds_passed'].iloc[0] == pytest.approx(0, abs=0.03)
+        assert cut['seconds_passed'].iloc[-1] == pytest.approx(5, abs=0.03)
+        assert os.path.exists(done['outputs']['plot'])
+
+    # A new job added first: only it runs
+    rows.insert(0, {'sensor': 'log.txt', 'data_start': 10, 'data_duration': 5, 'columns': 'AccX(g)'})
+    jobs = batch.read_manifest(write_csv(tmp_path / 'jobs.csv', rows))
+    assert [batch.is_done(out, job) for job in jobs] == [False, True, True]
+
+def test_failed_job_is_reported(tmp_path):
+    jobs = [batch.parse_job({'sensor': 'missing.txt', 'data_start': 0}, str(tmp_path))]
+    failures = batch.run_batch(jobs, str(tmp_path / 'out'), workers=1)
+    assert [name for name, _ in failures] == [jobs[0]['name']]
+    assert not batch.is_done(str(tmp_path / 'out'), jobs[0])
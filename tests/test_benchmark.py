@@ -0,0 +1,81 @@
+# Tests of the benchmark helpers: synthetic data, legacy baselines and saved run comparison
+
+import json
+
+import cv2
+import numpy as np
+import pandas as pd
+import pytest
+
+import baseline
+import benchmark
+import sensordataIO
+import videoindex
+
+@pytest.fixture
+def results(monkeypatch):
+    monkeypatch.setattr(benchmark, 'results', {})
+    return benchmark.results
+
+def test_synthetic_log(sensor_log):
+    assert sensordataIO.read_header(sensor_log) == benchmark.WIT_COLUMNS
+    raw = pd.read_csv(sensor_log, sep='\t')
+    assert len(raw) == 5000
+    # Milliseconds without zero padding, like the sensor writes them
+    assert raw['time'][1] == '2024-05-20 10:15:30:5' and raw['time'][20] == '2024-05-20 10:15:30:100'
+    df = sensordataIO.read_data(sensor_log, *benchmark.DROPPED_COLUMNS, groupMethod='noGroup', cache=False)
+    assert np.allclose(np.diff(df['seconds_passed']), 1 / 200)
+
+def test_synthetic_frame():
+    df = benchmark.make_synthetic_frame(1000, rate=100)
+    assert list(df.columns) == ['seconds_passed', *benchmark.features.CHANNELS]
+    assert df['seconds_passed'].iloc[-1] == pytest.approx(9.99)
+    pd.testing.assert_frame_equal(df, benchmark.make_synthetic_frame(1000, rate=100))
+
+def test_legacy_paths_match_the_baseline(sensor_log):
+    legacy = benchmark.legacy_read_data(sensor_log, *benchmark.DROPPED_COLUMNS)
+    pd.testing.assert_frame_equal(legacy, baseline.read_data(sensor_log, *benchmark.DROPPED_COLUMNS,
+                                                             groupMethod='noGroup'))
+    pd.testing.assert_frame_equal(benchmark.legacy_resample(legacy.drop(columns='time'), 30),
+                                  baseline.read_data(sensor_log, *benchmark.DROPPED_COLUMNS, camera_freq=30))
+
+def test_bench_read_records(sensor_log, results):
+    df = benchmark.bench_read(sensor_log, 5000)
+    assert len(df) == 5000
+    assert set(results) == {'read_data (C engine)', 'legacy (python engine + apply)'}
+    assert results['read_data (C engine)']['rows_per_s'] == pytest.approx(5000 / results['read_data (C engine)']['seconds'])
+
+def test_timeit_keeps_the_best():
+    calls = []
+    seconds, result = benchmark.timeit(lambda x: calls.append(x) or len(calls), 1, repeat=3)
+    assert result == 3 and len(calls) == 3 and seconds >= 0
+
+def test_stage_stats():
+    stats = benchmark.stage_stats(np.arange(1, 101) / 1000)
+    assert stats['p50_ms'] == pytest.approx(50.5) and stats['mean_ms'] == pytest.approx(50.5)
+    assert stats['p99_ms'] == pytest.approx(99.01)
+
+def test_compare_results(results, tmp_path):
+    benchmark.record('read', seconds=1.0, rows_per_s=100.0)
+    benchmark.record('plot', p50_ms=10.0, p99_ms=20.0)
+    path = str(tmp_path / 'run.json')
+    benchmark.save_results(path, benchmark.argparse.Namespace(rows=10))
+    saved = json.load(open(path))
+    assert saved['results'] == results and saved['meta']['args'] == {'rows': 10}
+
+    # Slower by more than the tolerance (rows_per_s is not a time metric)
+    benchmark.record('read', seconds=1.1, rows_per_s=1.0)
+    benchmark.record('plot', p50_ms=13.0, p99_ms=19.0)
+    benchmark.record('new', seconds=5.0)
+    assert benchmark.compare_results(path, tolerance=0.2) == [('plot', 'p50_ms', 10.0, 13.0)]
+    assert benchmark.compare_results(path, tolerance=0.05) == [('read', 'seconds', 1.0, 1.1),
+                                                              ('plot', 'p50_ms', 10.0, 13.0)]
+
+def test_synthetic_video(tmp_path):
+    path = benchmark.make_synthetic_video(str(tmp_path / 'video.mp4'), 2, fps=25, size='96x64', gop=10)
+    index = videoindex.build_frame_index(path)
+    assert len(index) == 50 and index.fps == pytest.approx(25)
+    assert list(index.keyframe_numbers) == [0, 10, 20, 30, 40]
+    cap = cv2.VideoCapture(path)
+    assert (cap.get(cv2.CAP_PROP_FRAME_WIDTH), cap.get(cv2.CAP_PROP_FRAME_HEIGHT)) == (96, 64)
+    cap.release()
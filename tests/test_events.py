@@ -0,0 +1,125 @@
+# Tests of the impact detection (hysteresis runs, peak prominence, splitting) and of EventIndex
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import events
+
+RATE = 100
+
+def signal_with(*bumps, seconds=10.0):
+    """
+    Zero signal with piecewise linear bumps: each bump is a list of (time, value) vertices
+    """
+    t = np.arange(int(seconds * RATE)) / RATE
+    signal = np.zeros(len(t))
+    for vertices in bumps:
+        times, values = zip(*vertices)
+        inside = (t >= times[0]) & (t <= times[-1])
+        signal[inside] = np.interp(t[inside], times, values)
+    return t, signal
+
+def brute_prominence(signal, peak):
+    value = signal[peak]
+    left = peak
+    while left > 0 and signal[left - 1] <= value:
+        left -= 1
+    right = peak
+    while right < len(signal) - 1 and signal[right + 1] <= value:
+        right += 1
+    return value - max(signal[left:peak + 1].min(), signal[peak:right + 1].min())
+
+def test_separate_impacts():
+    t, signal = signal_with([(1.0, 0), (1.1, 2.0), (1.2, 0)], [(5.0, 0), (5.1, 1.5), (5.2, 0)])
+    index = events.detect_events(t, signal)
+
+    assert len(index) == 2
+    np.testing.assert_allclose(index.peak, [1.1, 5.1])
+    np.testing.assert_allclose(index.magnitude, [2.0, 1.5])
+    np.testing.assert_allclose(index.prominence, [2.0, 1.5])
+
+def test_run_below_high_is_not_an_event():
+    t, signal = signal_with([(1.0, 0), (1.1, 0.9), (1.2, 0)])
+    assert len(events.detect_events(t, signal)) == 0
+
+def test_small_peak_rejected_on_prominence():
+    # Second peak stands only 0.3 above the valley (0.9, still above 'low') that joins it to the first
+    t, signal = signal_with([(1.0, 0), (1.1, 2.0), (1.3, 0.9), (1.4, 1.2), (1.6, 0)])
+    index = events.detect_events(t, signal, min_prominence=0.5)
+
+    assert len(index) == 1
+    np.testing.assert_allclose(index.peak, [1.1])
+    np.testing.assert_allclose([index.start[0], index.end[0]], [t[signal > 0.3][0], t[signal > 0.3][-1]])
+
+    # With a lower threshold the same run holds two events
+    assert len(events.detect_events(t, signal, min_prominence=0.2)) == 2
+
+def test_run_with_two_prominent_peaks_is_split():
+    t, signal = signal_with([(1.0, 0), (1.1, 2.0), (1.3, 0.5), (1.5, 1.8), (1.7, 0)])
+    index = events.detect_events(t, signal)
+
+    assert len(index) == 2
+    np.testing.assert_allclose(index.peak, [1.1, 1.5])
+    np.testing.assert_allclose(index.prominence, [2.0, 1.3])
+    # Split at the valley: the first event ends right before it, the second starts on it
+    assert index.end[0] < 1.3 <= index.start[1]
+    assert index.start[0] < index.peak[0] and index.peak[1] < index.end[1]
+
+def test_close_runs_are_merged():
+    # A run that does not reach 'high' 0.05 s after an event (below min_gap) extends it
+    t, signal = signal_with([(1.0, 0), (1.1, 2.0), (1.2, 0)], [(1.25, 0), (1.3, 0.8), (1.4, 0)])
+    index = events.detect_events(t, signal, min_gap=0.1)
+    assert len(index) == 1
+    assert index.end[0] > 1.3
+
+    index = events.detect_events(t, signal, min_gap=0.0)
+    assert len(index) == 1
+    assert index.end[0] < 1.2
+
+def test_close_prominent_peaks_stay_apart():
+    # Merged runs are still split when both peaks are prominent (the valley between them is 0)
+    t, signal = signal_with([(1.0, 0), (1.1, 2.0), (1.2, 0)], [(1.25, 0), (1.3, 1.2), (1.4, 0)])
+    index = events.detect_events(t, signal, min_gap=0.1)
+    np.testing.assert_allclose(index.peak, [1.1, 1.3])
+    np.testing.assert_allclose(index.prominence, [2.0, 1.2])
+
+def test_min_duration():
+    t, signal = signal_with([(1.0, 0), (1.02, 2.0), (1.04, 0)], [(5.0, 0), (5.5, 2.0), (6.0, 0)])
+    index = events.detect_events(t, signal, min_duration=0.2)
+    np.testing.assert_allclose(index.peak, [5.5])
+
+def test_empty_and_flat_signals():
+    assert len(events.detect_events(np.empty(0), np.empty(0))) == 0
+    t = np.arange(100) / RATE
+    assert len(events.detect_events(t, np.zeros(100))) == 0
+    # A constant signal above 'high' has no prominent peak
+    assert len(events.detect_events(t, np.full(100, 2.0))) == 0
+
+@pytest.mark.parametrize('seed', range(5))
+def test_prominence_matches_brute_force(seed):
+    rng = np.random.default_rng(seed)
+    signal = np.round(rng.random(400) * 3, 1)
+    padded = np.concatenate([[-np.inf], signal, [-np.inf]])
+    peaks = np.flatnonzero((signal >= 1) & (signal > padded[:-2]) & (signal >= padded[2:]))
+    np.testing.assert_allclose(events.peak_prominence(signal, peaks),
+                               [brute_prominence(signal, peak) for peak in peaks])
+
+def test_find_events_on_acceleration():
+    t = np.arange(10 * RATE) / RATE
+    acc_z = np.ones(len(t))
+    acc_z[300:305] += [0.5, 1.5, 3.0, 1.5, 0.5]
+    df = pd.DataFrame({'seconds_passed': t, 'AccX(g)': 0.0, 'AccY(g)': 0.0, 'AccZ(g)': acc_z})
+    index = events.find_events(df)
+    np.testing.assert_allclose(index.peak, [3.02])
+    np.testing.assert_allclose(index.magnitude, [3.0])
+
+def test_index_queries():
+    index = events.EventIndex([1, 5, 9], [1.5, 5.5, 9.5], [2, 6, 10], [2, 2, 2], [1, 1, 1])
+    assert index.between(2.5, 5.2) == (1, 2)
+    assert index.between(0, 100) == (0, 3)
+    assert index.next_after(1.5) == 1
+    assert index.next_after(9.5) is None
+    assert index.previous_before(5.5) == 0
+    assert index.previous_before(1.5) is None
+    np.testing.assert_allclose(index.shifted(1).peak, [0.5, 4.5, 8.5])
@@ -0,0 +1,71 @@
+# Tests of the sliding window features against a plain per-window computation
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import features
+
+RATE = 100.0
+
+def reference(x, rate, window, step, bands):
+    """
+    Features computed one window at a time
+    """
+    taper = np.hanning(window)
+    freqs = np.fft.rfftfreq(window, 1 / rate)
+    scale = 2 / (rate * np.sum(taper ** 2)) * (rate / window)
+    out = {}
+    for c, channel in enumerate(x):
+        for w, start in enumerate(range(0, len(channel) - window + 1, step)):
+            v = channel[start:start + window].astype(np.float64)
+            power = np.abs(np.fft.rfft((v - v.mean()) * taper)) ** 2 * scale
+            values = {'rms': np.sqrt(np.mean(v ** 2)), 'peak': np.abs(v).max(),
+                      'jerk': np.sqrt(np.mean(np.diff(v) ** 2)) * rate,
+                      'dom_freq': freqs[1:][power[1:].argmax()]}
+            for low, high in bands:
+                values[f'band_{low:g}-{high:g}Hz'] = power[(freqs >= low) & (freqs < high)].sum()
+            for name, value in values.items():
+                out.setdefault(name, {})[(c, w)] = value
+    return out
+
+@pytest.fixture
+def signals():
+    t = np.arange(2000) / RATE
+    rng = np.random.default_rng(0)
+    return np.stack([np.sin(2 * np.pi * 5 * t) + 0.1 * rng.normal(size=len(t)),
+                     1 + 0.5 * np.sin(2 * np.pi * 12 * t),
+                     rng.normal(size=len(t)).astype(np.float32)])
+
+@pytest.mark.parametrize('window, step, batch', [(200, 100, 2048), (200, 200, 3), (151, 37, 1)])
+def test_matches_per_window(signals, window, step, batch):
+    result = features.window_features(signals, RATE, window, step, batch_windows=batch)
+    expected = reference(signals, RATE, window, step, features.BANDS)
+    assert set(result) == set(expected)
+    for name, values in expected.items():
+        for (c, w), value in values.items():
+            assert result[name][c, w] == pytest.approx(value, rel=1e-5, abs=1e-9), (name, c, w)
+
+def test_dominant_frequency(signals):
+    result = features.window_features(signals, RATE, 200, 100)
+    assert np.all(result['dom_freq'][0] == 5)
+    assert np.all(result['dom_freq'][1] == 12)
+    # The 5 Hz sine puts its power on the 3-8 Hz band
+    assert np.all(result['band_3-8Hz'][0] > 10 * result['band_8-20Hz'][0])
+
+def test_extract_features(signals):
+    df = pd.DataFrame({'seconds_passed': np.arange(signals.shape[1]) / RATE,
+                       'AccX(g)': signals[0], 'AccY(g)': signals[1]})
+    single = features.extract_features(df, window=2.0, step=1.0, workers=1)
+    assert list(single['start']) == list(np.arange(19, dtype=float))
+    assert single['AccY(g)_dom_freq'].to_numpy() == pytest.approx(12)
+    direct = features.window_features(signals[:2], RATE, 200, 100)
+    assert np.allclose(single['AccX(g)_jerk'], direct['jerk'][0])
+
+    pooled = features.extract_features(df, window=2.0, step=1.0, workers=2)
+    pd.testing.assert_frame_equal(single, pooled)
+
+def test_window_longer_than_data():
+    df = pd.DataFrame({'seconds_passed': np.arange(10) / RATE, 'AccX(g)': np.zeros(10)})
+    with pytest.raises(ValueError):
+        features.extract_features(df, window=2.0, workers=1)
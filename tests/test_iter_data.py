@@ -0,0 +1,42 @@
+# Tests of the chunked ingestion: concatenated chunks equal the data read at once
+
+import pandas as pd
+import pytest
+
+import baseline
+import benchmark
+import sensordataIO
+
+OPTIONS = [{}, {'groupMethod': 'NbyN', 'groupN': 3}, {'groupMethod': 'noGroup'}, {'groupMethod': 'seconds_passed'},
+           {'camera_freq': 30}, {'camera_freq': 29.97, 'resampleMethod': 'nearest'},
+           {'camera_freq': 60, 'resampleMethod': 'zoh'}]
+
+@pytest.fixture(scope='module')
+def short_log(tmp_path_factory):
+    return benchmark.make_synthetic_log(str(tmp_path_factory.mktemp('logs') / 'short.txt'), 150, rate=200)
+
+@pytest.mark.parametrize('options', OPTIONS)
+@pytest.mark.parametrize('log, chunksize', [('short_log', 1), ('short_log', 7), ('sensor_log', 1000),
+                                            ('sensor_log', 10_000)])
+def test_chunks_equal_whole_read(request, metadata, options, log, chunksize):
+    path = request.getfixturevalue(log)
+    whole = sensordataIO.read_data(path, *metadata, cache=False, **options)
+    chunks = list(sensordataIO.iter_data(path, *metadata, chunksize=chunksize, **options))
+    assert all(len(chunk) for chunk in chunks)
+    pd.testing.assert_frame_equal(pd.concat(chunks), whole)
+
+@pytest.mark.parametrize('options', OPTIONS[:4])
+def test_chunked_read_data_matches_baseline(sensor_log, metadata, options):
+    df = sensordataIO.read_data(sensor_log, *metadata, chunksize=777, cache=False, **options)
+    pd.testing.assert_frame_equal(df, baseline.read_data(sensor_log, *metadata, **options),
+                                  check_exact=False, rtol=1e-12)
+
+def test_chunk_index_is_global(sensor_log, metadata):
+    chunks = list(sensordataIO.iter_data(sensor_log, *metadata, chunksize=1000, groupMethod='NbyN', groupN=3))
+    assert chunks[0].index[0] == 0
+    for previous, chunk in zip(chunks, chunks[1:]):
+        assert chunk.index[0] == previous.index[-1] + 1
+
+def test_invalid_group_method(sensor_log):
+    with pytest.raises(Exception, match='groupMethod'):
+        next(sensordataIO.iter_data(sensor_log, groupMethod='other'))
@@ -0,0 +1,167 @@
+# Tests of the incremental WIT parser and of LiveStream fed by a growing file and by a pty
+
+import os
+import time
+import tty
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import benchmark
+import livestream
+
+COLUMNS = ['AccX(g)', 'AccY(g)', 'AccZ(g)']
+
+@pytest.fixture
+def sensor_log(tmp_path):
+    path = tmp_path / 'sensor.txt'
+    benchmark.make_synthetic_log(str(path), 3000)
+    return str(path)
+
+def expected(path):
+    """
+    Seconds since the first sample and channels of a log, parsed by pandas
+    """
+    df = pd.read_csv(path, sep='\t', dtype={'Version()': str})
+    time_parts = df['time'].str.rsplit(':', n=1, expand=True)
+    t = pd.to_datetime(time_parts[0]) + pd.to_timedelta(time_parts[1].str.zfill(3).astype(int), unit='ms')
+    return (t - t[0]).dt.total_seconds().to_numpy(), df
+
+def feed_all(parser, data, chunk):
+    times, values = [], []
+    for i in range(0, len(data), chunk):
+        t, v = parser.feed(data[i:i + chunk])
+        if t is not None:
+            times.append(t)
+            values.append(v)
+    return np.concatenate(times), np.concatenate(values)
+
+def wait_for(condition, timeout=10.0):
+    end = time.perf_counter() + timeout
+    while not condition():
+        if time.perf_counter() > end:
+            raise AssertionError("Tempo esgotado")
+        time.sleep(0.02)
+
+@pytest.mark.parametrize('chunk', [1 << 16, 997, 13])
+def test_parser_matches_pandas(sensor_log, chunk):
+    with open(sensor_log, 'rb') as f:
+        data = f.read()
+    parser = livestream.WitParser()
+    t, values = feed_all(parser, data, chunk)
+    t_ref, df = expected(sensor_log)
+
+    assert parser.dropped == 0
+    assert 'DeviceName' not in parser.channels and 'Version()' not in parser.channels
+    np.testing.assert_allclose(t, t_ref)
+    for col in COLUMNS:
+        np.testing.assert_allclose(values[:, parser.channels.index(col)], df[col].to_numpy())
+
+def test_parser_header_with_trailing_tab():
+    lines = ["time\tDeviceName\tAccX(g)\tAccY(g)\t",
+             "2024-05-20 10:15:30:0\tWT901BLE68\t0.5\t-1.0\t",
+             "2024-05-20 10:15:30:5\tWT901BLE68\t0.25\t2.0\t"]
+    parser = livestream.WitParser()
+    t, values = parser.feed(('\n'.join(lines) + '\n').encode('utf-8'))
+
+    assert parser.channels == ['AccX(g)', 'AccY(g)']
+    assert parser.dropped == 0
+    np.testing.assert_allclose(t, [0.0, 0.005])
+    np.testing.assert_allclose(values, [[0.5, -1.0], [0.25, 2.0]])
+
+def test_parser_drops_malformed_lines():
+    header = "time\tDeviceName\tAccX(g)\n"
+    lines = ["2024-05-20 10:15:30:0\tWT901BLE68\t1.0",
+             header.strip(),
+             "2024-05-20 10:15:30:5\tWT901BLE68",
+             "2024-05-20 10:15:30:10\tWT901BLE68\tabc",
+             "2024-05-20 10:15:30:15\tWT901BLE68\t2.0"]
+    parser = livestream.WitParser()
+    t, values = parser.feed((header + '\n'.join(lines) + '\n').encode('utf-8'))
+
+    assert parser.dropped == 3
+    np.testing.assert_allclose(t, [0.0, 0.015])
+    np.testing.assert_allclose(values[:, 0], [1.0, 2.0])
+
+def test_parser_drops_single_malformed_value():
+    parser = livestream.WitParser(['time', 'DeviceName', 'AccX(g)'])
+    assert parser.feed(b"2024-05-20 10:15:30:0\tWT901BLE68\tabc\n") == (None, None)
+    assert parser.dropped == 1
+
+@pytest.mark.parametrize('field', [b'1_0', b'1.0x', b'--1', b'0x10'])
+def test_parser_drops_values_numpy_reads_partially(field):
+    parser = livestream.WitParser(['time', 'DeviceName', 'AccX(g)', 'AccY(g)'])
+    lines = [b"2024-05-20 10:15:30:0\tWT901BLE68\t" + field + b"\t1.0",
+             b"2024-05-20 10:15:30:5\tWT901BLE68\t2.0\t3.0"]
+    t, values = parser.feed(b'\n'.join(lines) + b'\n')
+
+    assert parser.dropped == 1
+    np.testing.assert_allclose(t, [0.0])
+    np.testing.assert_allclose(values, [[2.0, 3.0]])
+
+def test_stream_survives_malformed_lines(tmp_path):
+    path = tmp_path / 'recording.txt'
+    path.write_bytes(b"time\tDeviceName\tAccX(g)\n"
+                     b"2024-05-20 10:15:30:0\tWT901BLE68\t1_0\n"
+                     b"2024-05-20 10:15:30:5\tWT901BLE68\t2.0\n")
+    stream = livestream.LiveStream(livestream.FileTail(str(path), poll=0.01))
+    stream.start()
+    try:
+        wait_for(lambda: stream.ring is not None and stream.ring.total == 1)
+    finally:
+        stream.stop()
+    assert stream.error is None
+    assert stream.parser.dropped == 1
+
+def test_parser_without_header_needs_columns():
+    with pytest.raises(ValueError):
+        livestream.WitParser().feed(b"2024-05-20 10:15:30:0\tWT901BLE68\t1.0\n")
+    parser = livestream.WitParser(['time', 'DeviceName', 'AccX(g)'])
+    t, values = parser.feed(b"2024-05-20 10:15:30:0\tWT901BLE68\t1.0\n")
+    np.testing.assert_allclose(values, [[1.0]])
+
+def test_stream_tails_growing_file(sensor_log, tmp_path):
+    with open(sensor_log, 'rb') as f:
+        data = f.read()
+    path = tmp_path / 'recording.txt'
+    path.write_bytes(b'')
+    stream = livestream.LiveStream(livestream.FileTail(str(path), poll=0.01), capacity=1000)
+    stream.start()
+    try:
+        # Written in pieces that cut lines in the middle, like a sensor still recording
+        with open(path, 'ab') as f:
+            for i in range(0, len(data), 4099):
+                f.write(data[i:i + 4099])
+                f.flush()
+        wait_for(lambda: stream.ring is not None and stream.ring.total == 3000)
+    finally:
+        stream.stop()
+
+    assert stream.error is None
+    assert stream.parser.dropped == 0
+    t_ref, df = expected(sensor_log)
+    out_t, out_values = np.empty(1000), np.empty((len(stream.parser.channels), 1000))
+    assert stream.ring.latest(out_t, out_values) == 1000
+    np.testing.assert_allclose(out_t, t_ref[-1000:])
+    np.testing.assert_allclose(out_values[stream.parser.channels.index('AccX(g)')], df['AccX(g)'].to_numpy()[-1000:])
+
+def test_stream_reads_pty(sensor_log):
+    with open(sensor_log, 'rb') as f:
+        data = f.read()
+    master, slave = os.openpty()
+    tty.setraw(slave)
+    stream = livestream.LiveStream(livestream.FdSource(slave, poll=0.01))
+    stream.start()
+    try:
+        for i in range(0, len(data), 1024):
+            os.write(master, data[i:i + 1024])
+        wait_for(lambda: stream.ring is not None and stream.ring.total == 3000)
+    finally:
+        os.close(master)
+        # The closed master ends the stream (EOFError on the slave side)
+        wait_for(lambda: not stream.running())
+        stream.stop()
+
+    assert stream.error is None
+    assert stream.parser.dropped == 0
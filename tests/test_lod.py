@@ -0,0 +1,78 @@
+# Tests of the level-of-detail pyramids and of the plots drawn through them
+
+import gc
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+import pytest
+
+import lod
+import plotting
+
+@pytest.fixture
+def figure():
+    fig, ax = plt.subplots()
+    yield fig, ax
+    plt.close(fig)
+
+def test_query_keeps_the_extremes():
+    rng = np.random.default_rng(0)
+    t = np.arange(100_000) / 200
+    y = rng.standard_normal(len(t))
+    y[12_345], y[54_321] = 50.0, -50.0
+    pyramid = lod.MinMaxPyramid(t, y)
+
+    qt, qy = pyramid.query(t[0], t[-1], 1000)
+    assert len(qt) <= 4 * 1000
+    assert qy.max() == 50.0 and qy.min() == -50.0
+    assert np.all(np.diff(qt) >= 0)
+
+    # A zoomed range keeps every sample once there are fewer than the points asked for
+    qt, qy = pyramid.query(t[1000], t[1100], 1000)
+    np.testing.assert_array_equal(qy[(qt >= t[1000]) & (qt <= t[1100])], y[1000:1101])
+
+def test_short_series_are_not_reduced():
+    t = np.arange(100.0)
+    pyramid = lod.MinMaxPyramid(t, np.sin(t))
+    qt, qy = pyramid.query(0, 99, 10)
+    np.testing.assert_array_equal(qt, t)
+
+def test_empty_frame_draws_empty_lines(figure):
+    fig, ax = figure
+    df = pd.DataFrame({'seconds_passed': np.empty(0), 'AccX(g)': np.empty(0)})
+    lines = lod.plot_columns(ax, df, ['AccX(g)'])
+    assert len(lines) == 1 and len(lines[0].get_xdata()) == 0
+    ax.set_xlim(0, 5)
+    fig.canvas.draw()
+
+    cursor = plotting.CursorPlot(ax, fig.canvas)
+    cursor.plot(df, ['AccX(g)'])
+    cursor.move(1.0)
+
+def test_empty_frame_saves_a_plot(tmp_path):
+    df = pd.DataFrame({'seconds_passed': np.empty(0), 'AccX(g)': np.empty(0)})
+    plotting.plot_graph(df, 'AccX(g)', plot_path=str(tmp_path / 'plot.png'))
+    assert (tmp_path / 'plot.png').stat().st_size > 0
+
+def test_refined_on_zoom(figure):
+    fig, ax = figure
+    t = np.arange(200_000) / 200
+    df = pd.DataFrame({'seconds_passed': t, 'AccX(g)': np.sin(t)})
+    line, = lod.plot_columns(ax, df, ['AccX(g)'])
+    full = len(line.get_xdata())
+    ax.set_xlim(10, 11)
+    x = np.asarray(line.get_xdata())
+    assert x.min() < 10.1 and x.max() > 10.9
+    assert len(x) <= full
+
+def test_cache_drops_collected_frames():
+    cache = lod.PyramidCache()
+    df = pd.DataFrame({'seconds_passed': np.arange(1000.0), 'AccX(g)': np.arange(1000.0)})
+    pyramid = cache.get(df, 'AccX(g)')
+    assert cache.get(df, 'AccX(g)') is pyramid
+    del df
+    gc.collect()
+    assert cache.ref is None and not cache.pyramids
@@ -0,0 +1,108 @@
+# Tests of the synchronized overlay export (frame timing, layouts, ffmpeg errors)
+
+import subprocess
+import tempfile
+
+import cv2
+import numpy as np
+import pandas as pd
+import pytest
+
+import benchmark
+import overlay
+import videoindex
+
+@pytest.fixture(scope='module')
+def cfr_video(tmp_path_factory):
+    return benchmark.make_synthetic_video(str(tmp_path_factory.mktemp('video') / 'cfr.mp4'), 2, fps=20, size='160x120')
+
+@pytest.fixture
+def sensor_frame():
+    t = np.arange(0, 6, 0.01)
+    return pd.DataFrame({'seconds_passed': t, 'AccX(g)': np.sin(t), 'AccY(g)': np.cos(t)})
+
+def read_frames(path):
+    cap = cv2.VideoCapture(path)
+    frames = []
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame.astype(np.int16))
+    cap.release()
+    return frames
+
+def assert_frames_follow_timestamps(source_path, output_path, video_start=0.0):
+    """
+    Each output frame shows (in its video area) the source frame on screen at its time
+    """
+    source_index, output_index = videoindex.build_frame_index(source_path), videoindex.build_frame_index(output_path)
+    source, output = read_frames(source_path), read_frames(output_path)
+    height, width = source[0].shape[:2]
+    for k, frame in enumerate(output):
+        # (a tick on a source timestamp shows that frame: the microsecond absorbs the float rounding)
+        expected = source[int(source_index.frame_at(output_index.pts[k] + video_start + 1e-6))]
+        others = [np.abs(frame[:height, :width] - candidate).mean() for candidate in source]
+        assert np.abs(frame[:height, :width] - expected).mean() == min(others)
+
+def test_constant_rate_export(cfr_video, sensor_frame, tmp_path):
+    output = str(tmp_path / 'out.mp4')
+    overlay.export_overlay(cfr_video, sensor_frame, ['AccX(g)', 'AccY(g)'], output, workers=2)
+
+    index = videoindex.build_frame_index(output)
+    assert len(index) == 40
+    assert index.fps == pytest.approx(20)
+    width = cv2.VideoCapture(output).get(cv2.CAP_PROP_FRAME_WIDTH)
+    assert width == 160 + overlay.even(120 * 1.2)
+    assert_frames_follow_timestamps(cfr_video, output)
+
+def test_variable_rate_keeps_timing(vfr_video, sensor_frame, tmp_path):
+    source = videoindex.build_frame_index(vfr_video)
+    output = str(tmp_path / 'out.mp4')
+    overlay.export_overlay(vfr_video, sensor_frame, ['AccX(g)'], output, workers=2)
+
+    index = videoindex.build_frame_index(output)
+    # Constant rate output covering the source duration
+    step = (index.pts[-1] - index.pts[0]) / (len(index) - 1)
+    assert np.diff(index.pts) == pytest.approx(step, abs=2e-3)
+    assert len(index) * step == pytest.approx(source.duration, abs=1e-3)
+    assert_frames_follow_timestamps(vfr_video, output)
+
+def test_cut_and_overlay_layout(cfr_video, sensor_frame, tmp_path):
+    output = str(tmp_path / 'out.mp4')
+    overlay.export_overlay(cfr_video, sensor_frame, ['AccX(g)'], output, video_start=0.5, video_duration=1.0,
+                           layout='overlay', workers=1)
+    index = videoindex.build_frame_index(output)
+    assert len(index) == 20
+    cap = cv2.VideoCapture(output)
+    assert (cap.get(cv2.CAP_PROP_FRAME_WIDTH), cap.get(cv2.CAP_PROP_FRAME_HEIGHT)) == (160, 120)
+
+def test_encoder_error_is_raised(cfr_video, sensor_frame, tmp_path):
+    output = str(tmp_path / 'missing' / 'out.mp4')
+    with pytest.raises(RuntimeError, match='ffmpeg falhou ao gravar'):
+        overlay.export_overlay(cfr_video, sensor_frame, ['AccX(g)'], output, workers=1)
+
+def test_decoder_error_is_reported(tmp_path):
+    with tempfile.TemporaryFile() as log:
+        missing = str(tmp_path / 'missing.mp4')
+        process = subprocess.run([videoindex.ffmpeg_exe(), '-hide_banner', '-i', missing], stderr=log)
+        with pytest.raises(RuntimeError, match='ffmpeg falhou ao ler .*missing.mp4'):
+            overlay.check_exit(process, log, f'ler {missing}')
+
+def test_unreadable_video(cfr_video, sensor_frame, tmp_path):
+    broken = tmp_path / 'broken.mp4'
+    broken.write_bytes(b'not a video')
+    with pytest.raises(ValueError):
+        overlay.export_overlay(str(broken), sensor_frame, ['AccX(g)'], str(tmp_path / 'out.mp4'),
+                               frame_index=videoindex.build_frame_index(cfr_video), workers=1)
+
+def test_empty_cut(cfr_video, sensor_frame, tmp_path):
+    with pytest.raises(ValueError):
+        overlay.export_overlay(cfr_video, sensor_frame, ['AccX(g)'], str(tmp_path / 'out.mp4'), video_start=10.0)
+
+def test_cursor_moves_with_time(sensor_frame):
+    panel = overlay.PlotPanel(sensor_frame, ['AccX(g)'], (300, 200))
+    columns = [panel.cursor_column(seconds) for seconds in (0.0, 1.0, 3.0, 5.99, 100.0)]
+    assert columns == sorted(columns)
+    assert columns[-1] == panel.columns[1]
+    assert panel.image.shape == (200, 300, 3)
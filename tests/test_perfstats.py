@@ -0,0 +1,61 @@
+# Tests of the playback stage profiler (rings, percentiles and Chrome trace)
+
+import json
+import threading
+
+import numpy as np
+import pytest
+
+import perfstats
+
+def test_disabled_records_nothing():
+    profiler = perfstats.Profiler(['decode'])
+    assert profiler.start() == 0.0
+    profiler.stop('decode', 0.0)
+    profiler.add('decode', 1.0)
+    assert profiler.counts.sum() == 0 and len(profiler.samples('decode')) == 0
+    assert all(np.isnan(profiler.percentiles('decode')))
+    assert profiler.summary() == []
+
+def test_ring_keeps_the_last_durations():
+    profiler = perfstats.Profiler(['decode', 'plot'], capacity=100, enabled=True)
+    for ms in range(1, 251):
+        profiler.add('decode', ms / 1000)
+    assert profiler.counts[0] == 250 and profiler.counts[1] == 0
+    assert sorted(profiler.samples('decode') * 1000) == pytest.approx(range(151, 251))
+    p50, p99 = profiler.percentiles('decode')
+    assert p50 == pytest.approx(200.5) and p99 == pytest.approx(249.01)
+    assert profiler.summary() == [f"{'decode':<8} p50  200.5 ms  p99  249.0 ms"]
+
+def test_start_stop_measures():
+    profiler = perfstats.Profiler(['convert'], enabled=True)
+    start = profiler.start()
+    sum(range(10000))
+    profiler.stop('convert', start)
+    (duration,) = profiler.samples('convert')
+    assert 0 < duration < 1
+    assert profiler.starts[0, 0] == pytest.approx(start - profiler.origin)
+
+def test_reset():
+    profiler = perfstats.Profiler(['decode'], enabled=True)
+    profiler.add('decode', 0.01)
+    profiler.reset()
+    assert len(profiler.samples('decode')) == 0
+
+def test_dump_trace(tmp_path):
+    profiler = perfstats.Profiler(['decode', 'photo'], capacity=4, enabled=True)
+    worker = threading.Thread(target=lambda: [profiler.add('decode', 0.002) for _ in range(6)])
+    worker.start()
+    worker.join()
+    profiler.add('photo', 0.001)
+
+    path = str(tmp_path / 'trace.json')
+    assert profiler.dump_trace(path) == 5
+    trace = json.load(open(path))
+    events = trace['traceEvents']
+    assert [event['name'] for event in events] == ['decode'] * 4 + ['photo']
+    assert {event['ph'] for event in events} == {'X'}
+    assert events[0]['tid'] == worker.ident and events[-1]['tid'] == threading.get_ident()
+    assert events[0]['dur'] == pytest.approx(2000) and events[-1]['dur'] == pytest.approx(1000)
+    starts = [event['ts'] for event in events[:4]]
+    assert starts == sorted(starts)
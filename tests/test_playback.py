@@ -0,0 +1,113 @@
+# Tests of the display frame conversion and of the background playback against the baseline path
+
+import time
+
+import cv2
+import numpy as np
+import pytest
+
+import benchmark
+import playback
+import videoindex
+
+def baseline_display(frame, size):
+    """
+    Display path of the baseline GUI: RGB conversion of the full frame, then a bilinear resize
+    """
+    return cv2.resize(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB), size)
+
+@pytest.fixture
+def frame():
+    return np.random.default_rng(0).integers(0, 256, (720, 1280, 3), dtype=np.uint8)
+
+def buffers(width, height):
+    return np.empty((height, width, 3), dtype=np.uint8), np.empty((height, width, 3), dtype=np.uint8)
+
+@pytest.mark.parametrize('size', [(400, 300), (640, 360), (320, 180)])
+def test_large_downscales_match_the_baseline(frame, size):
+    resized, out = buffers(*size)
+    result = playback.convert_frame(frame, resized, out)
+    assert result is out
+    np.testing.assert_array_equal(out, baseline_display(frame, size))
+
+def test_small_downscales_average(frame):
+    resized, out = buffers(1000, 600)
+    playback.convert_frame(frame, resized, out)
+    expected = cv2.resize(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB), (1000, 600), interpolation=cv2.INTER_AREA)
+    np.testing.assert_array_equal(out, expected)
+
+def test_same_size_and_rgb_input(frame):
+    resized, out = buffers(1280, 720)
+    playback.convert_frame(frame, resized, out)
+    np.testing.assert_array_equal(out, frame[..., ::-1])
+    playback.convert_frame(frame, resized, out, bgr=False)
+    np.testing.assert_array_equal(out, frame)
+
+def test_buffers_are_reused(frame):
+    resized, out = buffers(400, 300)
+    before = out.__array_interface__['data'][0]
+    for _ in range(3):
+        playback.convert_frame(frame, resized, out)
+    assert out.__array_interface__['data'][0] == before
+
+def test_frame_ring():
+    ring = playback.FrameRing(2, 4, 4)
+    for number in (10, 11):
+        slot = ring.acquire_write()
+        ring.frames[slot] = number
+        ring.commit_write(number)
+    assert ring.ready() == 2 and ring.number_at(0) == 10 and ring.number_at(1) == 11
+    assert ring.frames[ring.read_slot()][0, 0, 0] == 10
+    ring.release_read()
+    assert ring.ready() == 1 and ring.number_at(0) == 11
+    ring.close()
+    assert ring.acquire_write() is None
+
+def test_player_shows_the_converted_frames(tmp_path):
+    path = benchmark.make_synthetic_video(str(tmp_path / 'video.mp4'), 1, fps=30, size='320x240', gop=10)
+    cap = cv2.VideoCapture(path)
+    source = []
+    while True:
+        ret, decoded = cap.read()
+        if not ret:
+            break
+        source.append(baseline_display(decoded, (160, 120)))
+    cap.release()
+
+    player = playback.Player(path, videoindex.build_frame_index(path), (160, 120), capacity=4)
+    player.start(5)
+    shown = []
+    deadline = time.perf_counter() + 10
+    while not player.done() and time.perf_counter() < deadline:
+        due = player.next_frame()
+        if due is None:
+            time.sleep(0.002)
+            continue
+        slot, number = due
+        np.testing.assert_array_equal(player.ring.frames[slot], source[number])
+        shown.append(number)
+        player.release()
+    player.stop()
+
+    assert player.done()
+    assert shown == sorted(shown) and shown[0] >= 5 and shown[-1] == 29
+    assert player.displayed + player.dropped_frames() == 25
+
+def test_frame_view():
+    tk = pytest.importorskip('tkinter')
+    try:
+        root = tk.Tk()
+    except tk.TclError:
+        pytest.skip("no display")
+    try:
+        import gui
+        label = tk.Label(root)
+        view = gui.FrameView(label, (160, 120))
+        frame = np.random.default_rng(1).integers(0, 256, (480, 640, 3), dtype=np.uint8)
+        view.show(frame, bgr=True)
+        photo = view.photo
+        view.show(frame, bgr=True)
+        assert view.photo is photo
+        np.testing.assert_array_equal(view.rgb, baseline_display(frame, (160, 120)))
+    finally:
+        root.destroy()
@@ -0,0 +1,106 @@
+# Tests of the process pool plot export against in-process rendering and the baseline pyplot plot_graph
+
+import os
+import subprocess
+import sys
+
+import matplotlib.image
+import matplotlib.pyplot as plt
+import numpy as np
+import pytest
+from matplotlib.figure import Figure
+
+import benchmark
+import plotexport
+import plotting
+import sensordataIO
+
+COLUMNS = ['AccX(g)', 'AccY(g)', 'AccZ(g)']
+
+@pytest.fixture(scope='module')
+def df(sensor_log, metadata):
+    return sensordataIO.read_data(sensor_log, *metadata, groupMethod='noGroup', cache=False)
+
+@pytest.fixture
+def data_limits(monkeypatch):
+    """
+    Data limits of the axes of every figure saved, taken just before saving
+    """
+    limits = []
+    savefig = Figure.savefig
+
+    def recording(fig, *args, **kwargs):
+        limits.append([ax.dataLim.bounds for ax in fig.axes])
+        return savefig(fig, *args, **kwargs)
+
+    monkeypatch.setattr(Figure, 'savefig', recording)
+    return limits
+
+def test_shared_frame(df):
+    compact = sensordataIO.compact_frame(df[['seconds_passed', *COLUMNS]].copy())
+    frame = plotexport.SharedFrame(compact)
+    try:
+        assert frame.spec['columns'] == COLUMNS and np.dtype(frame.spec['dtype']) == np.float32
+        t, values = plotexport.attached(frame.spec)
+        np.testing.assert_array_equal(t, compact['seconds_passed'])
+        for row, col in enumerate(COLUMNS):
+            np.testing.assert_array_equal(values[row], compact[col])
+    finally:
+        plotexport._attached.pop(frame.spec['name'])[0].close()
+        frame.close()
+
+def test_render_job_matches_render_figure(df, tmp_path):
+    frame = plotexport.SharedFrame(df, COLUMNS)
+    try:
+        job = {'data': frame.spec, 'columns': COLUMNS[:2], 'path': str(tmp_path / 'job.png'), 'start': 5.0, 'end': 10.0,
+               'layout': 'tiled', 'title': 'janela'}
+        path, seconds = plotexport.render_job(job)
+        assert path == job['path'] and seconds > 0
+        window = df[(df['seconds_passed'] >= 5) & (df['seconds_passed'] < 10)]
+        expected = plotting.render_figure(window['seconds_passed'].to_numpy(), {col: window[col].to_numpy() for col in COLUMNS[:2]},
+                                          str(tmp_path / 'expected.png'), layout='tiled', title='janela')
+        np.testing.assert_array_equal(matplotlib.image.imread(path), matplotlib.image.imread(expected))
+    finally:
+        plotexport._attached.pop(frame.spec['name'])[0].close()
+        frame.close()
+
+def test_export_windows_on_the_pool(df, tmp_path):
+    with plotexport.PlotExporter(workers=2) as exporter:
+        n = plotexport.export_windows(exporter, df, COLUMNS, str(tmp_path), 'log', window=10, fmt='svg')
+        rendered = exporter.wait()
+    # 25 s of data in 10 s windows
+    assert n == 3 and [path for path, _ in rendered] == [str(tmp_path / f'log_{k:04d}.svg') for k in range(3)]
+    assert all(open(path).read().lstrip().startswith('<?xml') for path, _ in rendered)
+    assert exporter.frames == []
+
+def test_submit_checks_the_job(df):
+    with plotexport.PlotExporter(workers=1) as exporter:
+        data = exporter.share(df, COLUMNS)
+        with pytest.raises(ValueError):
+            exporter.submit(data, ['Nope'], 'x.png')
+        with pytest.raises(ValueError):
+            exporter.submit(data, COLUMNS, 'x.png', layout='grid')
+        assert exporter.wait() == []
+
+def test_same_data_limits_as_baseline(df, tmp_path, data_limits):
+    """
+    The reduced lines span the same time and value range as the baseline plot of every sample, and
+    no pyplot figure is left open
+    """
+    open_before = len(plt.get_fignums())
+    plotting.plot_graph(df, *COLUMNS, plot_path=str(tmp_path / 'new.png'))
+    assert len(plt.get_fignums()) == open_before
+
+    benchmark.legacy_plot_graph(df, *COLUMNS, plot_path=str(tmp_path / 'baseline.png'))
+    baseline_fig = plt.gcf()
+    np.testing.assert_allclose(data_limits[0][0], data_limits[1][0])
+    assert len(baseline_fig.axes[0].lines[0].get_xdata()) == len(df)
+    plt.close(baseline_fig)
+
+def test_cli(sensor_log, tmp_path):
+    env = dict(os.environ, VIDEOSYNC_CACHE_DIR=str(tmp_path / 'cache'), MPLBACKEND='Agg')
+    script = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'plotexport.py')
+    result = subprocess.run([sys.executable, script, sensor_log, '--out', str(tmp_path / 'plots'), '--window', '10',
+                             '--layout', 'tiled', '--workers', '2'], env=env, capture_output=True, text=True, check=True)
+    assert result.stdout.startswith('3 figuras')
+    assert sorted(os.listdir(tmp_path / 'plots')) == [f'log_{k:04d}.png' for k in range(3)]
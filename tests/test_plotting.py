@@ -0,0 +1,88 @@
+# Tests of the blitted sync plot cursor and of the saved plots
+
+import numpy as np
+import pandas as pd
+import pytest
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+import plotting
+
+@pytest.fixture
+def df():
+    t = np.arange(0, 10, 0.01)
+    return pd.DataFrame({'seconds_passed': t, 'AccX(g)': np.sin(t), 'AccY(g)': np.cos(t)})
+
+@pytest.fixture
+def cursor_plot():
+    fig = Figure(figsize=(4, 3), dpi=80)
+    canvas = FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    cursor = plotting.CursorPlot(ax, canvas)
+    yield cursor
+    fig.clear()
+
+def count_draws(canvas):
+    draws = []
+    draw = canvas.draw
+    canvas.draw = lambda: (draws.append(1), draw())
+    return draws
+
+def test_plot_draws_the_columns(cursor_plot, df):
+    cursor_plot.plot(df, ['AccX(g)', 'AccY(g)'], title='log')
+    lines = [line for line in cursor_plot.ax.get_lines() if line is not cursor_plot.cursor]
+    assert [line.get_label() for line in lines] == ['AccX(g)', 'AccY(g)']
+    # Longer than the axes width: the min/max envelope keeps the extremes
+    assert lines[0].get_ydata().max() == df['AccX(g)'].max() and lines[0].get_ydata().min() == df['AccX(g)'].min()
+    assert cursor_plot.ax.get_title() == 'log'
+    assert cursor_plot.is_plotted(df, ['AccX(g)', 'AccY(g)'])
+    assert not cursor_plot.is_plotted(df, ['AccX(g)'])
+    assert not cursor_plot.is_plotted(df.copy(), ['AccX(g)', 'AccY(g)'])
+
+def test_short_series_keep_every_sample(cursor_plot, df):
+    short = df.iloc[:100]
+    cursor_plot.plot(short, ['AccY(g)'])
+    line = cursor_plot.ax.get_lines()[0]
+    # Like the baseline ax.plot of the columns
+    np.testing.assert_array_equal(line.get_xdata(), short['seconds_passed'])
+    np.testing.assert_array_equal(line.get_ydata(), short['AccY(g)'])
+
+def test_move_blits_without_full_draws(cursor_plot, df):
+    cursor_plot.plot(df, ['AccX(g)'])
+    assert cursor_plot.background is not None
+    draws = count_draws(cursor_plot.canvas)
+    for seconds in np.linspace(0, 10, 50):
+        cursor_plot.move(seconds)
+        assert list(cursor_plot.cursor.get_xdata()) == [seconds, seconds]
+    assert draws == []
+
+def test_blitted_frame_equals_full_draw(cursor_plot, df):
+    cursor_plot.plot(df, ['AccX(g)', 'AccY(g)'])
+    cursor_plot.move(6.5)
+    cursor_plot.move(2.0)
+    blitted = np.array(cursor_plot.canvas.buffer_rgba())
+
+    # Reference: the cursor drawn by a full draw, as a regular artist (on_draw no longer draws it again)
+    cursor, cursor_plot.cursor = cursor_plot.cursor, None
+    cursor.set_animated(False)
+    cursor_plot.canvas.draw()
+    np.testing.assert_array_equal(blitted, np.asarray(cursor_plot.canvas.buffer_rgba()))
+
+def test_background_is_refreshed_on_draw(cursor_plot, df):
+    cursor_plot.plot(df, ['AccX(g)'])
+    background = cursor_plot.background
+    cursor_plot.ax.set_xlim(2, 4)
+    cursor_plot.canvas.draw()
+    assert cursor_plot.background is not background
+
+def test_move_before_plot(cursor_plot):
+    cursor_plot.move(1.0)
+    assert cursor_plot.cursor is None
+
+@pytest.mark.parametrize('layout', plotting.LAYOUTS)
+def test_plot_graph(df, tmp_path, layout):
+    path = str(tmp_path / f'{layout}.png')
+    plotting.plot_graph(df, 'AccX(g)', 'AccY(g)', plot_path=path, layout=layout)
+    assert open(path, 'rb').read(8) == b'\x89PNG\r\n\x1a\n'
+    with pytest.raises(ValueError):
+        plotting.render_figure(df['seconds_passed'].to_numpy(), {}, path, layout='grid')
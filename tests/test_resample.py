@@ -0,0 +1,80 @@
+# Tests of the resampling onto the camera timebase against direct per-target computations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import baseline
+import benchmark
+import sensordataIO
+
+@pytest.fixture
+def irregular():
+    rng = np.random.default_rng(0)
+    t = np.cumsum(rng.uniform(0.001, 0.01, 500))
+    return pd.DataFrame({'seconds_passed': t, 'a': np.sin(t * 7), 'b': rng.normal(size=500).astype(np.float32),
+                         'n': np.arange(500), 'label': ['x'] * 500})
+
+def targets(t):
+    return np.concatenate([[t[0] - 0.5, t[0]], np.linspace(t[0], t[-1], 333), t[10:20], [t[-1], t[-1] + 1]])
+
+def test_camera_timebase():
+    timebase = sensordataIO.camera_timebase(2.0, 7.5, 30)
+    assert len(timebase) == int(5.5 * 30) + 1
+    assert timebase[0] == 2.0 and timebase[-1] <= 7.5
+    assert np.allclose(np.diff(timebase), 1 / 30)
+    assert np.array_equal(sensordataIO.camera_timebase(0, 1, 4), [0, 0.25, 0.5, 0.75, 1])
+
+def test_linear(irregular):
+    timebase = np.sort(targets(irregular['seconds_passed'].to_numpy()))
+    df = sensordataIO.resample(irregular, timebase)
+    assert list(df.columns) == ['seconds_passed', 'a', 'b', 'n']
+    assert np.array_equal(df['seconds_passed'], timebase)
+    for col in ['a', 'b', 'n']:
+        expected = np.interp(timebase, irregular['seconds_passed'], irregular[col].astype(np.float64))
+        assert np.allclose(df[col], expected, rtol=1e-6, atol=1e-6), col
+    assert (df['a'].dtype, df['b'].dtype, df['n'].dtype) == (np.float64, np.float32, np.float64)
+
+@pytest.mark.parametrize('method', ['nearest', 'zoh'])
+def test_gather_methods(irregular, method):
+    t = irregular['seconds_passed'].to_numpy()
+    timebase = np.sort(targets(t))
+    df = sensordataIO.resample(irregular, timebase, method=method)
+    for k, target in enumerate(timebase):
+        if method == 'nearest':
+            source = int(np.argmin(np.abs(t - target)))
+        else:
+            source = max(int(np.searchsorted(t, target, side='right')) - 1, 0)
+        assert df['a'][k] == irregular['a'][source] and df['n'][k] == irregular['n'][source]
+    assert df['n'].dtype == np.int64 and df['b'].dtype == np.float32
+
+def test_duplicated_times():
+    df = pd.DataFrame({'seconds_passed': [0.0, 0.0, 1.0, 1.0, 2.0], 'x': [5.0, 1.0, 2.0, 4.0, 6.0]})
+    assert sensordataIO.resample(df, [0.0, 0.5, 1.0, 1.5, 2.0])['x'].tolist() == [1.0, 1.5, 4.0, 5.0, 6.0]
+    assert sensordataIO.resample(df, [0.0, 0.9, 1.0], method='zoh')['x'].tolist() == [1.0, 1.0, 4.0]
+
+def test_positions_shared_by_channels(irregular):
+    t = irregular['seconds_passed'].to_numpy()
+    timebase = np.linspace(t[0], t[-1], 100)
+    positions = sensordataIO.resample_positions(t, timebase)
+    out = np.empty((2, 100))
+    for row, col in enumerate(['a', 'n']):
+        sensordataIO.resample_into(irregular[col].to_numpy(), positions, out[row])
+    resampled = sensordataIO.resample(irregular, timebase)
+    assert np.array_equal(out[0], resampled['a']) and np.array_equal(out[1], resampled['n'])
+
+def test_invalid_method(irregular):
+    with pytest.raises(Exception, match='reamostragem'):
+        sensordataIO.resample(irregular, [0.1], method='cubic')
+
+def test_read_data_on_sample_times_matches_baseline(tmp_path, metadata):
+    # 20 s at 200 Hz and a 50 Hz camera: every frame falls on a sample, where the baseline merge is exact
+    log = benchmark.make_synthetic_log(str(tmp_path / 'log.txt'), 4001, rate=200)
+    df = sensordataIO.read_data(log, *metadata, camera_freq=50, cache=False)
+    expected = baseline.read_data(log, *metadata, camera_freq=50)
+    assert np.allclose(df['seconds_passed'], expected['seconds_passed'], rtol=0, atol=1e-9)
+    # The baseline merged on float equality, filling the frames it missed by row: only exact matches compare
+    times = sensordataIO.read_data(log, *metadata, groupMethod='noGroup', cache=False)['seconds_passed']
+    matched = np.isin(expected['seconds_passed'], times)
+    assert matched.mean() > 0.5
+    pd.testing.assert_frame_equal(df[matched], expected.loc[matched, df.columns], check_exact=False, rtol=1e-9)
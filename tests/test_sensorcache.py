@@ -0,0 +1,86 @@
+# Tests of the columnar store and of the LRU cache of parsed sensor logs
+
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import baseline
+import columnar
+import sensorcache
+import sensordataIO
+
+def test_columnar_round_trip(tmp_path):
+    df = pd.DataFrame({'time': pd.date_range('2024-05-20', periods=5, freq='5ms'),
+                       'AccX(g)': np.arange(5, dtype=np.float64), 'count': np.arange(5),
+                       'AccY(g)': np.linspace(0, 1, 5), 'small': np.ones(5, dtype=np.float32),
+                       'DeviceName': ['WT'] * 5}, index=[4, 3, 2, 1, 0])
+    nbytes = columnar.save_frame(df, str(tmp_path / 'frame'))
+    assert nbytes >= df.select_dtypes(include='number').memory_usage(index=False).sum()
+
+    pd.testing.assert_frame_equal(columnar.load_frame(str(tmp_path / 'frame'), mmap=False), df)
+    loaded = columnar.load_frame(str(tmp_path / 'frame'))
+    assert np.array_equal(loaded['AccY(g)'], df['AccY(g)']) and list(loaded.index) == list(df.index)
+    # Copy-on-write maps: changing the loaded frame does not change the files
+    loaded['AccX(g)'].to_numpy()[0] = 100
+    assert columnar.load_frame(str(tmp_path / 'frame'), mmap=False)['AccX(g)'][4] == 0
+
+def test_cached_read_matches_baseline(sensor_log, metadata, tmp_path):
+    cache = sensorcache.SensorCache(str(tmp_path))
+    first = sensordataIO.read_data(sensor_log, *metadata, cache=cache)
+    assert len(cache.entries()) == 1
+    second = sensordataIO.read_data(sensor_log, *metadata, cache=cache)
+    assert isinstance(second['AccX(g)'].to_numpy().base, np.memmap)
+    pd.testing.assert_frame_equal(second, first)
+    pd.testing.assert_frame_equal(second, baseline.read_data(sensor_log, *metadata), check_exact=False, rtol=1e-12)
+
+def test_key_follows_file_and_options(sensor_log, metadata, tmp_path):
+    cache = sensorcache.SensorCache(str(tmp_path))
+    key = cache.key(sensor_log, *metadata, groupMethod='noGroup')
+    assert cache.key(sensor_log, *metadata, groupMethod='noGroup', engine='pyarrow', cache=cache) == key
+    assert cache.key(sensor_log, *metadata, groupMethod='NbyN') != key
+    assert cache.key(sensor_log, groupMethod='noGroup') != key
+
+    copy = tmp_path / 'copy.txt'
+    copy.write_bytes(open(sensor_log, 'rb').read())
+    assert cache.key(str(copy), *metadata) != cache.key(sensor_log, *metadata)
+    hashed = sensorcache.SensorCache(str(tmp_path), content_hash=True)
+    assert hashed.key(str(copy), *metadata) == hashed.key(sensor_log, *metadata)
+
+def test_modified_file_is_parsed_again(tmp_path):
+    path = tmp_path / 'log.txt'
+    path.write_text("time\tAccX(g)\n2024-05-20 10:15:30:0\t1.0\n2024-05-20 10:15:30:5\t2.0\n")
+    cache = sensorcache.SensorCache(str(tmp_path / 'cache'))
+    assert sensordataIO.read_data(str(path), groupMethod='noGroup', cache=cache)['AccX(g)'].tolist() == [1.0, 2.0]
+    path.write_text("time\tAccX(g)\n2024-05-20 10:15:30:0\t3.0\n2024-05-20 10:15:30:5\t4.0\n")
+    os.utime(path, ns=(time.time_ns(), time.time_ns() + 10**9))
+    assert sensordataIO.read_data(str(path), groupMethod='noGroup', cache=cache)['AccX(g)'].tolist() == [3.0, 4.0]
+
+def test_lru_eviction(tmp_path):
+    cache = sensorcache.SensorCache(str(tmp_path / 'cache'), max_bytes=2500)
+    df = pd.DataFrame({'x': np.zeros(100)})
+    for i, key in enumerate(['a', 'b', 'c']):
+        cache.put(key, df, f'log_{key}.txt')
+        os.utime(os.path.join(cache.entry_path(key), sensorcache.ENTRY_FILE), (i, i))
+    # 'a' is used again: 'b' is now the least recently used
+    assert cache.get('a') is not None
+    cache.put('d', df, 'log_d.txt')
+    assert sorted(entry['key'] for entry in cache.entries()) == ['a', 'c', 'd']
+    assert cache.get('b') is None
+
+def test_invalidate(sensor_log, metadata, tmp_path):
+    cache = sensorcache.SensorCache(str(tmp_path))
+    sensordataIO.read_data(sensor_log, *metadata, cache=cache)
+    sensordataIO.read_data(sensor_log, *metadata, groupMethod='noGroup', cache=cache)
+    cache.put('other', pd.DataFrame({'x': [1.0]}), str(tmp_path / 'other.txt'))
+    assert cache.invalidate(sensor_log) == 2
+    assert [entry['key'] for entry in cache.entries()] == ['other']
+    assert cache.invalidate() == 1
+
+def test_resolve():
+    assert sensorcache.resolve(True) is sensorcache.default_cache()
+    assert sensorcache.resolve(False) is None and sensorcache.resolve(None) is None
+    cache = sensorcache.SensorCache('unused')
+    assert sensorcache.resolve(cache) is cache
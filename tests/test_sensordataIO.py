@@ -0,0 +1,87 @@
+# Tests of the WIT log parser (millisecond fix, explicit dtypes, compact mode) against the baseline read_data
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import baseline
+import sensordataIO
+
+def baseline_time(values):
+    fixed = [f"{head}:{ms.zfill(3)}" for head, _, ms in (value.rpartition(':') for value in values)]
+    return pd.to_datetime(pd.Series(fixed), format='%Y-%m-%d %H:%M:%S:%f')
+
+@pytest.mark.parametrize('values', [
+    ['2024-05-20 10:15:30:0', '2024-05-20 10:15:30:5', '2024-05-20 10:15:30:50', '2024-05-20 10:15:30:500',
+     '2024-05-20 10:15:30:999'],
+    # Layouts differing from row to row (the slow path)
+    ['2024-05-20 10:15:59:995', '2024-05-20 10:16:00:5', '2024-5-20 10:16:00:15', '2024-05-20 10:16:01:1234'],
+    ['2024-05-20 10:15:30:7'],
+])
+def test_parse_time_matches_zfill(values):
+    parsed = sensordataIO.parse_time(pd.Series(values, name='time'))
+    pd.testing.assert_series_equal(parsed, baseline_time(values).rename('time'))
+
+def test_parse_time_keeps_index():
+    column = pd.Series(['2024-05-20 10:15:30:5', '2024-05-20 10:15:30:10'], index=[7, 3], name='time')
+    parsed = sensordataIO.parse_time(column)
+    assert list(parsed.index) == [7, 3]
+    assert parsed[3] - parsed[7] == pd.Timedelta(milliseconds=5)
+
+def test_read_txt_dtypes(sensor_log):
+    df = sensordataIO.read_txt(sensor_log)
+    assert df['time'].dtype == object and df['DeviceName'].dtype == object
+    assert df['AccX(g)'].dtype == np.float64
+    assert sensordataIO.read_txt(sensor_log, float_dtype='float32')['AccX(g)'].dtype == np.float32
+
+def test_read_txt_falls_back_on_text_channels(tmp_path):
+    path = tmp_path / 'log.txt'
+    path.write_text("time\tAccX(g)\tAccY(g)\n2024-05-20 10:15:30:0\t1.5\tn/d\n2024-05-20 10:15:30:5\t2.5\t1\n")
+    df = sensordataIO.read_txt(str(path))
+    assert df['AccX(g)'].tolist() == [1.5, 2.5]
+    assert df['AccY(g)'].tolist() == ['n/d', '1']
+
+@pytest.mark.parametrize('options', [{}, {'groupMethod': 'NbyN', 'groupN': 3}, {'groupMethod': 'noGroup'},
+                                     {'groupMethod': 'seconds_passed'}])
+def test_read_data_matches_baseline(sensor_log, metadata, options):
+    df = sensordataIO.read_data(sensor_log, *metadata, cache=False, **options)
+    expected = baseline.read_data(sensor_log, *metadata, **options)
+    pd.testing.assert_frame_equal(df, expected, check_exact=False, rtol=1e-12)
+
+def test_invalid_group_method(sensor_log, metadata):
+    with pytest.raises(Exception, match='groupMethod'):
+        sensordataIO.read_data(sensor_log, *metadata, groupMethod='other', cache=False)
+
+def test_compact_frame():
+    df = pd.DataFrame({'time': pd.to_datetime(['2024-05-20 10:15:30.005', '2024-05-20 10:15:30.010']),
+                       'AccX(g)': [0.25, -1.5], 'seconds_passed': [0.0, 0.005], 'Count': [1, 2]})
+    compact = sensordataIO.compact_frame(df.copy())
+    assert compact['time'].dtype == 'datetime64[us]' and compact['AccX(g)'].dtype == np.float32
+    assert compact['seconds_passed'].dtype == np.float64 and compact['Count'].dtype == np.int64
+    assert (compact['time'] == df['time']).all() and compact['AccX(g)'].tolist() == [0.25, -1.5]
+    pd.testing.assert_frame_equal(sensordataIO.compact_frame(compact.copy()), compact)
+
+@pytest.mark.parametrize('options', [{}, {'groupMethod': 'noGroup'}, {'groupMethod': 'seconds_passed'},
+                                     {'camera_freq': 30, 'resampleMethod': 'linear'}])
+def test_compact_read_data_matches_baseline(sensor_log, metadata, options):
+    df = sensordataIO.read_data(sensor_log, *metadata, compact=True, cache=False, **options)
+    full = sensordataIO.read_data(sensor_log, *metadata, cache=False, **options)
+    expected = full if 'camera_freq' in options else baseline.read_data(sensor_log, *metadata, **options)
+    assert list(df.columns) == list(expected.columns) and len(df) == len(expected)
+
+    channels = [col for col in df.columns if col not in ('time', 'seconds_passed')]
+    assert all(df[col].dtype == np.float32 for col in channels)
+    for col in channels:
+        np.testing.assert_allclose(df[col], expected[col], rtol=1e-5, atol=1e-6)
+    assert df['seconds_passed'].dtype == np.float64
+    np.testing.assert_allclose(df['seconds_passed'], expected['seconds_passed'], rtol=0, atol=1e-6)
+    if 'time' in df:
+        assert df['time'].dtype == 'datetime64[us]'
+        assert (abs(df['time'] - expected['time']) <= pd.Timedelta(microseconds=1)).all()
+
+def test_compact_chunks_and_columns(sensor_log, metadata):
+    df = sensordataIO.read_data(sensor_log, *metadata, compact=True, cache=False)
+    chunked = sensordataIO.read_data(sensor_log, *metadata, compact=True, chunksize=1000, cache=False)
+    pd.testing.assert_frame_equal(chunked, df)
+    columns = sensordataIO.read_columns(sensor_log, ['AccX(g)', 'HZ(uT)'], compact=True, cache=False)
+    pd.testing.assert_frame_equal(columns, df[['AccX(g)', 'HZ(uT)']])
@@ -0,0 +1,74 @@
+# Tests of the binary search sensor cuts (SensorStore and actionstart.make_cuts_sensor)
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import actionstart
+import columnar
+import sensorstore
+
+def recording(n=1000, rate=50):
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({'time': pd.date_range('2024-05-20 10:15:30', periods=n, freq=f'{1000 // rate}ms'),
+                         'AccX(g)': rng.standard_normal(n), 'AccZ(g)': rng.standard_normal(n).astype(np.float32),
+                         'seconds_passed': np.arange(n) / rate})
+
+def baseline_cut(df, start_time, video_length):
+    # The cut before the sensor store: boolean filters and the times restarted at 0
+    df = df[df['seconds_passed'] > start_time]
+    df = df[df['seconds_passed'] < (start_time + video_length)].copy()
+    df['seconds_passed'] = df['seconds_passed'] - df['seconds_passed'].min()
+    return df.reset_index(drop=True)
+
+@pytest.mark.parametrize('start, length', [(1.0, 5.0), (0.0, 3.3), (2.01, 0.5), (15.0, 100.0), (30.0, 5.0), (1.0, 0.0)])
+def test_cut_matches_baseline(start, length):
+    df = recording()
+    cut = actionstart.make_cuts_sensor(df, start, length)
+    pd.testing.assert_frame_equal(cut, baseline_cut(df, start, length), check_index_type=False)
+
+def test_no_cut_returns_the_frame():
+    df = recording()
+    assert actionstart.make_cuts_sensor(df) is df
+
+def test_cut_shares_read_only_memory():
+    df = recording()
+    source = df['AccX(g)'].to_numpy().copy()
+    cut = actionstart.make_cuts_sensor(df, 1.0, 5.0)
+    assert np.shares_memory(cut['AccX(g)'].to_numpy(), df['AccX(g)'].to_numpy())
+
+    with pytest.raises(ValueError):
+        cut.loc[0, 'AccX(g)'] = 100.0
+    with pytest.raises(ValueError):
+        cut['AccX(g)'].to_numpy()[0] = 100.0
+    np.testing.assert_array_equal(df['AccX(g)'].to_numpy(), source)
+    assert df['AccX(g)'].to_numpy().flags.writeable
+
+    # New columns and copies work as usual
+    cut['AccX(g)'] = cut['AccX(g)'] * 2
+    changed = cut.copy()
+    changed.loc[0, 'AccZ(g)'] = 100.0
+    np.testing.assert_array_equal(df['AccX(g)'].to_numpy(), source)
+
+def test_store_queries():
+    df = recording(n=100, rate=10)
+    store = sensorstore.SensorStore.from_frame(df)
+    assert len(store) == 100
+    assert store.index_range(1.0, 2.0) == (11, 20)
+    assert store.index_range(None, 0.55) == (0, 6)
+    assert store.index_range(5.0, 1.0) == (51, 51)
+
+    window = store.window(1.0, 2.0)
+    np.testing.assert_allclose(window['seconds_passed'], df['seconds_passed'][11:20])
+    cut = store.cut(1.0, 1.0)
+    np.testing.assert_allclose(cut['seconds_passed'], np.arange(9) / 10)
+    np.testing.assert_array_equal(cut['AccX(g)'], df['AccX(g)'].to_numpy()[11:20])
+    assert len(store.cut(50.0, 1.0)) == 0
+
+def test_store_over_memory_map(tmp_path):
+    df = recording()
+    path = str(tmp_path / 'recording')
+    columnar.save_frame(df, path)
+    store = sensorstore.SensorStore.open(path)
+    cut = store.cut(1.0, 5.0).to_frame()
+    pd.testing.assert_frame_equal(cut, baseline_cut(df, 1.0, 5.0), check_index_type=False)
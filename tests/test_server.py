@@ -0,0 +1,103 @@
+# Tests of the job server HTTP API, run against localhost on an ephemeral port
+
+import asyncio
+import json
+import os
+
+import pytest
+
+import benchmark
+import sensorcache
+import server
+
+@pytest.fixture
+def sensor_log(tmp_path, monkeypatch):
+    # Parsed logs go to a temporary cache instead of the user's one
+    monkeypatch.setattr(sensorcache, '_default_cache', sensorcache.SensorCache(str(tmp_path / 'cache')))
+    path = tmp_path / 'sensor.txt'
+    benchmark.make_synthetic_log(str(path), 2000)
+    return str(path)
+
+async def request(port, method, path, body=b''):
+    """
+    Sends one request to the server on localhost; returns (status, JSON body)
+    """
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(body)}\r\n\r\n".encode('ascii') + body)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, payload = response.partition(b'\r\n\r\n')
+    return int(head.split()[1]), json.loads(payload)
+
+def run_server(test, tmp_path, start=True, **kwargs):
+    """
+    Runs 'test(port, job_server)' with a JobServer listening on 127.0.0.1
+    """
+    async def main():
+        job_server = server.JobServer(str(tmp_path / 'out'), **kwargs)
+        if start:
+            job_server.start()
+        http = await asyncio.start_server(job_server.handle, '127.0.0.1', 0)
+        try:
+            async with http:
+                return await test(http.sockets[0].getsockname()[1], job_server)
+        finally:
+            await job_server.close()
+    return asyncio.run(main())
+
+def test_health(tmp_path):
+    async def test(port, job_server):
+        return await request(port, 'GET', '/health')
+    status, body = run_server(test, tmp_path, workers=1, max_queue=4)
+    assert status == 200
+    assert body['workers'] == 1
+    assert body['queue_size'] == 4
+    assert body['queued'] == 0
+
+def test_job_runs_to_done(tmp_path, sensor_log):
+    spec = {'sensor': sensor_log, 'data_start': 1.0, 'data_duration': 5.0, 'columns': ['AccX(g)']}
+
+    async def test(port, job_server):
+        status, job = await request(port, 'POST', '/jobs', json.dumps(spec).encode())
+        assert status == 202
+        assert job['status'] == 'queued'
+        for _ in range(600):
+            status, job = await request(port, 'GET', f"/jobs/{job['id']}")
+            assert status == 200
+            if job['status'] not in ('queued', 'running'):
+                return job
+            await asyncio.sleep(0.1)
+        raise AssertionError("O job não terminou")
+
+    job = run_server(test, tmp_path, workers=1, max_queue=4)
+    assert job['status'] == 'done', job.get('error')
+    assert job['sensor_rows'] > 0
+    assert set(job['outputs']) == {'sensor', 'plot'}
+    assert all(os.path.exists(path) for path in job['outputs'].values())
+
+def test_full_queue_is_refused(tmp_path, sensor_log):
+    body = json.dumps({'sensor': sensor_log}).encode()
+
+    async def test(port, job_server):
+        return [await request(port, 'POST', '/jobs', body) for _ in range(3)]
+
+    # Without workers nothing leaves the queue
+    responses = run_server(test, tmp_path, start=False, workers=1, max_queue=2)
+    assert [status for status, _ in responses] == [202, 202, 503]
+    assert responses[2][1]['queued'] == 2
+
+@pytest.mark.parametrize('body', [b'{"sensor": ', b'[1, 2]', b'{"video": "video.mp4"}'])
+def test_invalid_job(tmp_path, body):
+    async def test(port, job_server):
+        return await request(port, 'POST', '/jobs', body), len(job_server.jobs)
+    (status, response), jobs = run_server(test, tmp_path, workers=1)
+    assert status == 400
+    assert response['error'].startswith('Job inválido')
+    assert jobs == 0
+
+def test_unknown_job(tmp_path):
+    async def test(port, job_server):
+        return await request(port, 'GET', '/jobs/missing')
+    status, _ = run_server(test, tmp_path, workers=1)
+    assert status == 404
@@ -0,0 +1,60 @@
+# Tests of multi-sensor sessions (common timebase, clock offsets, channel matrix)
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import benchmark
+import sensordataIO
+import session
+
+@pytest.fixture
+def logs(tmp_path):
+    paths = [str(tmp_path / 'left.txt'), str(tmp_path / 'right.txt')]
+    benchmark.make_synthetic_log(paths[0], 4000, rate=200, seed=1)
+    benchmark.make_synthetic_log(paths[1], 2500, rate=100, seed=2)
+    return paths
+
+@pytest.mark.parametrize('method', ['linear', 'nearest', 'zoh'])
+@pytest.mark.parametrize('span', ['overlap', 'union'])
+def test_rows_match_resample(logs, method, span):
+    result = session.load_session(logs, offsets=[0.0, 0.37], method=method, span=span, rate=50)
+    frames = session.read_logs(logs)
+    epoch = frames[0]['time'].iloc[0]
+    t0 = (result.start - epoch).total_seconds()
+
+    assert result.devices() == ['left', 'right']
+    assert result.values.flags.c_contiguous
+    np.testing.assert_allclose(np.diff(result.time), 1 / 50)
+    for label, df, offset in zip(['left', 'right'], frames, [0.0, 0.37]):
+        t = session.clock_times(df, epoch) + offset
+        expected = sensordataIO.resample(pd.DataFrame({'seconds_passed': t, 'AccX(g)': df['AccX(g)']}),
+                                         result.time + t0, method=method)['AccX(g)'].to_numpy()
+        outside = (result.time + t0 < t[0]) | (result.time + t0 > t[-1])
+        expected[outside] = np.nan
+        np.testing.assert_allclose(result[f'{label}/AccX(g)'], expected, equal_nan=True)
+        if span == 'overlap':
+            assert not outside.any()
+
+def test_overlap_span(logs):
+    result = session.load_session(logs, offsets=[0.0, 0.37])
+    assert not np.isnan(result.values).any()
+    # The second log starts 0.37 s later and lasts 25 s: the overlap is 0.37 s .. 20 s of the first
+    assert result.time[0] == 0
+    assert result.time[-1] == pytest.approx(20 - 0.37 - 1 / 200, abs=1 / 200)
+
+def test_compact_session(logs):
+    result = session.load_session(logs, compact=True)
+    full = session.load_session(logs)
+    assert result.values.dtype == np.float32
+    np.testing.assert_allclose(result.values, full.values, rtol=1e-5, atol=1e-6)
+
+def test_frame_views(logs):
+    result = session.load_session(logs)
+    df = result.to_frame()
+    assert list(df.columns) == ['seconds_passed'] + result.names()
+    assert np.shares_memory(df['left/AccX(g)'].to_numpy(), result.values)
+
+def test_logs_without_overlap(logs):
+    with pytest.raises(ValueError):
+        session.load_session(logs, offsets=[0.0, 100.0])
@@ -0,0 +1,44 @@
+# Tests of the saved thumbnail strip (reuse and invalidation of the .npy cache)
+
+import shutil
+
+import numpy as np
+
+import benchmark
+import thumbnails
+import videoindex
+
+def make_cache(path, size=(32, 24)):
+    return thumbnails.ThumbnailCache(path, videoindex.build_frame_index(path), size=size, interval=0.5)
+
+def test_saved_strip_is_reused(tmp_path):
+    video = benchmark.make_synthetic_video(str(tmp_path / 'video.mp4'), 2, fps=10, size='160x120', gop=5)
+    cache = make_cache(video)
+    assert not cache.complete()
+    cache.generate()
+    assert cache.complete()
+    assert thumbnails.saved_shape(cache.path) == cache.frames.shape
+
+    reloaded = make_cache(video)
+    assert reloaded.complete()
+    assert np.array_equal(reloaded.frames, cache.frames)
+    number, frame = reloaded.nearest(7)
+    assert frame.shape == (24, 32, 3) and abs(number - 7) <= 2
+
+def test_saved_strip_is_invalidated(tmp_path):
+    video = benchmark.make_synthetic_video(str(tmp_path / 'video.mp4'), 2, fps=10, size='160x120', gop=5)
+    make_cache(video).generate()
+    # Other size: the saved shape does not match
+    assert not make_cache(video, size=(48, 36)).complete()
+
+    # Other video on the same path: size and mtime do not match
+    other = benchmark.make_synthetic_video(str(tmp_path / 'other.mp4'), 3, fps=10, size='160x120', gop=5)
+    shutil.copy(other, video)
+    assert not make_cache(video).complete()
+
+def test_saved_shape_of_other_dtypes(tmp_path):
+    path = str(tmp_path / 'array.npy')
+    np.save(path, np.zeros((2, 3), dtype=np.float32))
+    assert thumbnails.saved_shape(path) is None
+    np.save(path, np.zeros((2, 3), dtype=np.uint8))
+    assert thumbnails.saved_shape(path) == (2, 3)
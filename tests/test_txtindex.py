@@ -0,0 +1,74 @@
+# Tests of the .txt row index and of the column projection (read_data 'columns', read_columns) against the baseline read_data
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import baseline
+import sensordataIO
+import txtindex
+
+CHANNELS = ['AccX(g)', 'AsZ(°/s)', 'HY(uT)']
+
+@pytest.mark.parametrize('block_rows', [1, 7, 4096, txtindex.BLOCK_ROWS])
+def test_columns_match_pandas(sensor_log, block_rows):
+    index = txtindex.build_index(sensor_log, block_rows=block_rows)
+    df = pd.read_csv(sensor_log, sep='\t', dtype={'time': str, 'DeviceName': str, 'Version()': str})
+    assert len(index) == len(df) and index.columns == list(df.columns)
+    for col in CHANNELS + ['Battery level(%)']:
+        np.testing.assert_array_equal(index.read_column(col), df[col].to_numpy())
+    np.testing.assert_array_equal(index.read_column('AccX(g)', dtype=np.float32), df['AccX(g)'].to_numpy(np.float32))
+    np.testing.assert_array_equal(index.read_times().astype('U'), df['time'].to_numpy(dtype='U'))
+
+def test_irregular_lines(tmp_path):
+    path = tmp_path / 'log.txt'
+    # CRLF line ends, a blank line, an empty field and no newline at the end
+    path.write_bytes(b"time\tA\tB\r\n2024-05-20 10:15:30:0\t1.5\t2\r\n\r\n2024-05-20 10:15:30:5\t\t3\r\n"
+                     b"2024-05-20 10:15:30:10\t-4e-3\t5")
+    index = txtindex.build_index(str(path), block_rows=2)
+    assert len(index) == 3
+    np.testing.assert_array_equal(index.read_column('A'), [1.5, np.nan, -4e-3])
+    np.testing.assert_array_equal(index.read_column('B'), [2, 3, 5])
+    assert index.read_times().astype('U').tolist() == ['2024-05-20 10:15:30:0', '2024-05-20 10:15:30:5',
+                                                       '2024-05-20 10:15:30:10']
+
+def test_file_without_data(tmp_path):
+    path = tmp_path / 'log.txt'
+    path.write_text("time\tA\tB")
+    with pytest.raises(ValueError):
+        txtindex.build_index(str(path))
+
+def test_index_is_rebuilt_when_the_file_changes(tmp_path):
+    path = tmp_path / 'log.txt'
+    path.write_text("time\tA\n2024-05-20 10:15:30:0\t1\n")
+    assert len(txtindex.load_index(str(path))) == 1
+    assert txtindex.load_index(str(path)) is txtindex.load_index(str(path))
+    path.write_text("time\tA\n2024-05-20 10:15:30:0\t1\n2024-05-20 10:15:30:5\t2\n")
+    assert len(txtindex.load_index(str(path))) == 2
+
+@pytest.mark.parametrize('options', [{}, {'groupMethod': 'NbyN', 'groupN': 3}, {'groupMethod': 'noGroup'},
+                                     {'groupMethod': 'seconds_passed'}])
+def test_projection_matches_baseline(sensor_log, metadata, options):
+    expected = baseline.read_data(sensor_log, *metadata, **options)
+    df = sensordataIO.read_data(sensor_log, *metadata, columns=CHANNELS[:1], cache=False, **options)
+    assert sorted(df.columns) == sorted(['time', CHANNELS[0], 'seconds_passed'])
+    pd.testing.assert_frame_equal(df, expected[list(df.columns)], check_exact=False, rtol=1e-12)
+
+    later = sensordataIO.read_columns(sensor_log, CHANNELS[1:], columns=CHANNELS[:1], cache=False, **options)
+    pd.testing.assert_frame_equal(later, expected[CHANNELS[1:]], check_exact=False, rtol=1e-12)
+
+def test_read_columns_on_the_camera_timebase(sensor_log, metadata):
+    options = {'camera_freq': 30, 'resampleMethod': 'nearest'}
+    expected = sensordataIO.read_data(sensor_log, *metadata, cache=False, **options)
+    df = sensordataIO.read_columns(sensor_log, CHANNELS, cache=False, **options)
+    pd.testing.assert_frame_equal(df, expected[CHANNELS])
+
+def test_read_columns_cache(sensor_log):
+    first = sensordataIO.read_columns(sensor_log, CHANNELS)
+    pd.testing.assert_frame_equal(sensordataIO.read_columns(sensor_log, CHANNELS), first)
+
+def test_unknown_columns(sensor_log):
+    with pytest.raises(ValueError):
+        sensordataIO.read_data(sensor_log, columns=['Nope'], cache=False)
+    with pytest.raises(ValueError):
+        sensordataIO.read_columns(sensor_log, ['Nope'], cache=False)
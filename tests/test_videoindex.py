@@ -0,0 +1,75 @@
+# Tests of the frame timestamp index against the frames OpenCV decodes
+
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+import benchmark
+import videoindex
+
+@pytest.fixture(scope='module')
+def cfr_video(tmp_path_factory):
+    return benchmark.make_synthetic_video(str(tmp_path_factory.mktemp('video') / 'cfr.mp4'), 3, fps=30,
+                                          size='160x120', gop=15)
+
+def decoded_times(path):
+    cap = cv2.VideoCapture(path)
+    times = []
+    while cap.grab():
+        times.append(cap.get(cv2.CAP_PROP_POS_MSEC) / 1000)
+    cap.release()
+    return np.array(times)
+
+def test_constant_rate(cfr_video):
+    index = videoindex.build_frame_index(cfr_video)
+    assert len(index) == 90
+    assert np.allclose(index.pts, np.arange(90) / 30, atol=1e-3)
+    assert index.fps == pytest.approx(30) and index.duration == pytest.approx(3)
+    assert list(index.keyframe_numbers) == [0, 15, 30, 45, 60, 75]
+
+def test_variable_rate_matches_decoder(vfr_video):
+    index = videoindex.build_frame_index(vfr_video)
+    times = decoded_times(vfr_video)
+    assert len(index) == len(times)
+    assert np.allclose(index.pts, times - times[0], atol=1e-3)
+    assert np.allclose(np.diff(index.pts)[:39], 0.05) and np.allclose(np.diff(index.pts)[40:], 0.1)
+
+def test_fallback_scan_agrees(vfr_video):
+    pts, keyframes = videoindex.scan_frames(vfr_video)
+    index = videoindex.build_frame_index(vfr_video)
+    assert np.allclose(pts, index.pts, atol=1e-3)
+    assert keyframes[0] and not keyframes[1:].any()
+
+def test_conversions(vfr_video):
+    index = videoindex.build_frame_index(vfr_video)
+    # 2.0 s is frame 40, then one frame each 0.1 s
+    assert index.frame_at(2.0) == 40 and index.frame_at(2.09) == 40 and index.frame_at(2.1) == 41
+    assert index.frame_from(2.01) == 41 and index.frame_from(2.0) == 40
+    assert index.frame_at(-1) == 0 and index.frame_at(100) == len(index) - 1
+    assert index.frame_from(100) == len(index)
+    assert index.time_of(41) == pytest.approx(2.1) and index.time_of(10_000) == index.pts[-1]
+    assert np.array_equal(index.frame_at(index.pts), np.arange(len(index)))
+    assert index.keyframe_before(45) == 40 and index.keyframe_after(41) == 50
+    assert index.keyframe_after(len(index) - 1) == len(index)
+
+def test_saved_index(cfr_video, tmp_path):
+    video = str(tmp_path / 'video.mp4')
+    with open(cfr_video, 'rb') as src, open(video, 'wb') as dst:
+        dst.write(src.read())
+    index = videoindex.load_frame_index(video)
+    assert os.path.exists(video + videoindex.INDEX_SUFFIX)
+
+    # The saved index is used while the video is unchanged
+    with np.load(video + videoindex.INDEX_SUFFIX) as saved:
+        fields = dict(saved)
+    np.savez(video + videoindex.INDEX_SUFFIX, **{**fields, 'pts': fields['pts'] * 2})
+    assert np.allclose(videoindex.load_frame_index(video).pts, index.pts * 2)
+    assert np.allclose(videoindex.load_frame_index(video, cache=False).pts, index.pts)
+
+    os.utime(video, ns=(0, 0))
+    assert np.allclose(videoindex.load_frame_index(video).pts, index.pts)
+
+def test_probe_video(cfr_video):
+    assert videoindex.probe_video(cfr_video) == ('h264', 'yuv420p')
@@ -0,0 +1,231 @@
+# This module keeps small preview frames of a video for scrubbing, and decodes exact frames off the Tk thread
+
+import os
+import subprocess
+import threading
+import warnings
+
+import cv2
+import numpy as np
+
+import playback
+import videoindex
+
+THUMBS_SUFFIX = '.thumbs.npy'
+THUMBS_META_SUFFIX = '.thumbs.npz'
+
+class ThumbnailCache:
+    """
+    Downscaled RGB frames of a video at every keyframe and every 'interval' seconds, stored as one
+    memory-mapped array beside the video ('<video>.thumbs.npy').
+
+    A background thread fills it in two passes: first the keyframes (decoded alone, fast), then the
+    other frames from one sequential decode. nearest works meanwhile with the frames already filled,
+    and once complete the array is reused while the video size and modification time match.
+
+    params:
+
+    size : tuple -> (width, height) of the thumbnails;
+    interval : float -> seconds between thumbnails (raised so there are at most 'max_thumbs')
+    """
+
+    def __init__(self, video_path, frame_index, size=(200, 150), interval=1.0, max_thumbs=2000):
+        self.video_path = video_path
+        self.frame_index = frame_index
+        self.width, self.height = size
+        interval = max(interval, frame_index.duration / max_thumbs)
+        timed = frame_index.frame_from(np.arange(0, frame_index.duration, interval))
+        self.numbers = np.union1d(frame_index.keyframe_numbers, timed[timed < len(frame_index)]).astype(np.int64)
+        self.available = np.zeros(len(self.numbers), dtype=bool)
+        self.stopped = False
+        self.thread = None
+
+        self.path = video_path + THUMBS_SUFFIX
+        self.meta_path = video_path + THUMBS_META_SUFFIX
+        stat = os.stat(video_path)
+        self.stat = (stat.st_size, stat.st_mtime_ns)
+        shape = (len(self.numbers), self.height, self.width, 3)
+        if self.is_saved(shape):
+            self.frames = np.load(self.path, mmap_mode='r')
+            self.available[:] = True
+            return
+        try:
+            self.frames = np.lib.format.open_memmap(self.path, mode='w+', dtype=np.uint8, shape=shape)
+        except OSError as e:
+            warnings.warn(f"Não foi possível salvar as miniaturas de {video_path}: {e}")
+            self.frames = np.zeros(shape, dtype=np.uint8)
+
+    def is_saved(self, shape):
+        try:
+            with np.load(self.meta_path) as meta:
+                return (meta['size'] == self.stat[0] and meta['mtime_ns'] == self.stat[1]
+                        and np.array_equal(meta['numbers'], self.numbers)
+                        and saved_shape(self.path) == shape)
+        except (OSError, KeyError, ValueError):
+            return False
+
+    def complete(self):
+        return bool(self.available.all())
+
+    def start(self):
+        """
+        Starts filling the cache on a background thread (nothing to do if it is complete)
+        """
+        if not self.complete() and self.thread is None:
+            self.thread = threading.Thread(target=self.generate, daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        self.stopped = True
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def decode(self, skip_frame=None):
+        """
+        Yields the frames of the video (or only the keyframes, skip_frame='nokey') at the thumbnail size
+        """
+        skip = ['-skip_frame', skip_frame] if skip_frame else []
+        proc = subprocess.Popen([videoindex.ffmpeg_exe(), '-hide_banner', '-loglevel', 'error', *skip,
+                                 '-skip_loop_filter', 'all', '-i', self.video_path, '-map', '0:v:0',
+                                 '-fps_mode', 'passthrough', '-vf', f'scale={self.width}:{self.height}:flags=area',
+                                 '-pix_fmt', 'rgb24', '-f', 'rawvideo', '-'], stdout=subprocess.PIPE)
+        frame_bytes = self.width * self.height * 3
+        try:
+            while not self.stopped:
+                data = proc.stdout.read(frame_bytes)
+                if len(data) < frame_bytes:
+                    break
+                yield np.frombuffer(data, dtype=np.uint8).reshape(self.height, self.width, 3)
+        finally:
+            proc.kill()
+            proc.stdout.close()
+            proc.wait()
+
+    def generate(self):
+        # Keyframes first: the decoder can skip everything else, so a coarse strip is ready quickly.
+        # The keyframes seen by the decoder must be the ones of the index, else this pass is dropped.
+        slots = np.searchsorted(self.numbers, self.frame_index.keyframe_numbers)
+        keyframes = list(self.decode('nokey'))
+        if len(keyframes) == len(slots):
+            for slot, frame in zip(slots, keyframes):
+                self.frames[slot] = frame
+                self.available[slot] = True
+        del keyframes
+
+        slot_of = {int(number): slot for slot, number in enumerate(self.numbers)}
+        for number, frame in enumerate(self.decode()):
+            slot = slot_of.get(number)
+            if slot is not None and not self.available[slot]:
+                self.frames[slot] = frame
+                self.available[slot] = True
+        if self.stopped or not self.complete():
+            return
+
+        if isinstance(self.frames, np.memmap):
+            self.frames.flush()
+            try:
+                with open(self.meta_path, 'wb') as f:
+                    np.savez(f, numbers=self.numbers, size=self.stat[0], mtime_ns=self.stat[1])
+            except OSError as e:
+                warnings.warn(f"Não foi possível salvar as miniaturas de {self.video_path}: {e}")
+
+    def nearest(self, frame):
+        """
+        Returns (frame number, RGB thumbnail) of the filled thumbnail closest to 'frame', or None
+        """
+        filled = self.numbers[self.available]
+        if not len(filled):
+            return None
+        i = int(np.searchsorted(filled, frame))
+        if i == len(filled) or (i > 0 and frame - filled[i - 1] <= filled[i] - frame):
+            i -= 1
+        number = int(filled[i])
+        return number, self.frames[np.searchsorted(self.numbers, number)]
+
+def saved_shape(path):
+    """
+    Shape of the uint8 array saved on the .npy 'path', read from its header (None for other dtypes)
+    """
+    with open(path, 'rb') as f:
+        major, _ = np.lib.format.read_magic(f)
+        read_header = np.lib.format.read_array_header_1_0 if major == 1 else np.lib.format.read_array_header_2_0
+        shape, fortran_order, dtype = read_header(f)
+    return shape if dtype == np.uint8 and not fortran_order else None
+
+class FrameFetcher:
+    """
+    Decodes single frames on a worker thread. Only the latest request is kept, so fast scrubbing
+    never queues decodes; requests ahead on the same GOP read forward instead of seeking.
+    With a 'size' (width, height), frames are returned at that size (converted on the worker thread).
+    """
+
+    def __init__(self, video_path, frame_index, size=None):
+        self.video_path = video_path
+        self.frame_index = frame_index
+        self.size = size
+        self.cond = threading.Condition()
+        self.requested = None
+        self.result = None
+        self.closed = False
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def request(self, frame):
+        with self.cond:
+            self.requested = int(frame)
+            self.cond.notify()
+
+    def take(self):
+        """
+        Returns the last decoded (frame number, RGB frame) once, or None
+        """
+        with self.cond:
+            result, self.result = self.result, None
+            return result
+
+    def busy(self):
+        with self.cond:
+            return self.requested is not None
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify()
+        self.thread.join()
+
+    def run(self):
+        cap = cv2.VideoCapture(self.video_path)
+        position = 0
+        frame = None
+        if self.size is not None:
+            width, height = self.size
+            resized = np.empty((height, width, 3), dtype=np.uint8)
+        while True:
+            with self.cond:
+                while self.requested is None and not self.closed:
+                    self.cond.wait()
+                if self.closed:
+                    break
+                frame_number = self.requested
+
+            if not (position <= frame_number and self.frame_index.keyframe_before(frame_number) <= position):
+                cap.set(cv2.CAP_PROP_POS_FRAMES, frame_number)
+                position = frame_number
+            while position < frame_number and cap.grab():
+                position += 1
+            ret, frame = cap.read(frame)
+            position += 1
+            if ret:
+                # The result is a new array: the Tk thread may still hold the previous one
+                if self.size is not None:
+                    rgb = playback.convert_frame(frame, resized, np.empty_like(resized))
+                else:
+                    rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+
+            with self.cond:
+                if ret:
+                    self.result = (frame_number, rgb)
+                if self.requested == frame_number:
+                    self.requested = None
+        cap.release()
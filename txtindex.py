@@ -0,0 +1,175 @@
+# This module indexes the rows of WIT sensor .txt logs by byte offset, to parse single columns later
+
+import functools
+import io
+import os
+import warnings
+
+import numpy as np
+import pandas as pd
+
+# Rows per indexed block (one byte offset is kept per block)
+BLOCK_ROWS = 65536
+
+# Bytes scanned at a time while building the index
+SCAN_BYTES = 1 << 24
+
+TAB, NEWLINE, SPACE = 9, 10, 32
+
+class TxtIndex:
+    """
+    Byte offsets of every BLOCK_ROWS-th row of a WIT .txt log plus its header, so one column can be
+    parsed without tokenizing the others: each block is read straight from a memory map, its field
+    boundaries found with one vectorized scan, and only the bytes of the wanted field are parsed.
+
+    params:
+
+    fpath : string -> wit sensor .txt file path;
+    columns : list -> header names, in field order;
+    offsets : array -> byte offset of the first row of each block, plus the end of the data;
+    n_rows : int -> rows of data (blank lines are not counted, like pandas does)
+    """
+
+    def __init__(self, fpath, columns, offsets, n_rows, block_rows=BLOCK_ROWS):
+        self.fpath = fpath
+        self.columns = list(columns)
+        self.fields = {col: i for i, col in enumerate(self.columns) if col}
+        self.offsets = offsets
+        self.n_rows = n_rows
+        self.block_rows = block_rows
+
+    def __len__(self):
+        return self.n_rows
+
+    def blocks(self):
+        """
+        Yields (first byte, end byte, rows) of each block
+        """
+        for b in range(len(self.offsets) - 1):
+            yield int(self.offsets[b]), int(self.offsets[b + 1]), min(self.block_rows, self.n_rows - b * self.block_rows)
+
+    def field_bytes(self, data, field, n_rows, fill=SPACE):
+        """
+        Bytes of field number 'field' of the 'n_rows' lines of 'data' as a rows x width matrix padded
+        with 'fill', or None when the lines do not all have the same fields (blank or ragged lines)
+        """
+        separators = np.flatnonzero((data == TAB) | (data == NEWLINE))
+        n_fields = len(self.columns)
+        if len(separators) != n_rows * n_fields:
+            return None
+        separators = separators.reshape(n_rows, n_fields)
+        if not np.all(data[separators[:, -1]] == NEWLINE):
+            return None
+
+        if field:
+            lo = separators[:, field - 1] + 1
+        else:
+            lo = np.empty(n_rows, dtype=separators.dtype)
+            lo[0], lo[1:] = 0, separators[:-1, -1] + 1
+        hi = separators[:, field]
+        # One byte wider than the longest field, so every field ends with the fill byte
+        width = int((hi - lo).max()) + 1 if n_rows else 1
+        positions = lo[:, None] + np.arange(width)
+        chars = data[np.minimum(positions, len(data) - 1)]
+        chars[positions >= hi[:, None]] = fill
+        return chars
+
+    def read_column(self, col, dtype=np.float64):
+        """
+        Values of the numeric column 'col' on every row
+        """
+        field = self.fields[col]
+        out = np.empty(self.n_rows, dtype=dtype)
+        data = np.memmap(self.fpath, dtype=np.uint8, mode='r')
+        row = 0
+        for first, end, n in self.blocks():
+            block = data[first:end]
+            chars = self.field_bytes(block, field, n)
+            values = None
+            if chars is not None:
+                # Fields are separated by spaces and parsed by one C call; empty or malformed fields
+                # change the count and send the block to pandas
+                with warnings.catch_warnings():
+                    warnings.simplefilter('ignore', DeprecationWarning)
+                    values = np.fromstring(chars.tobytes(), dtype=dtype, sep=' ')
+            if values is None or len(values) != n:
+                values = self.parse_block(block, field, n, dtype)
+            out[row:row + n] = values
+            row += n
+        return out
+
+    def read_times(self):
+        """
+        Raw 'time' strings (bytes) of every row
+        """
+        field = self.fields['time']
+        data = np.memmap(self.fpath, dtype=np.uint8, mode='r')
+        parts = []
+        for first, end, n in self.blocks():
+            block = data[first:end]
+            chars = self.field_bytes(block, field, n, fill=0)
+            if chars is None:
+                parts.append(self.parse_block(block, field, n, str).astype('S'))
+            else:
+                parts.append(np.ascontiguousarray(chars).view(f'S{chars.shape[1]}').ravel())
+        width = max((part.dtype.itemsize for part in parts), default=1)
+        return np.concatenate([part.astype(f'S{width}') for part in parts]) if parts else np.empty(0, 'S1')
+
+    def parse_block(self, block, field, n_rows, dtype):
+        """
+        Field 'field' of a block parsed by pandas (fallback for irregular lines)
+        """
+        values = pd.read_csv(io.BytesIO(block.tobytes()), sep='\t', header=None, usecols=[field],
+                             dtype={field: dtype}, skip_blank_lines=True)[field].to_numpy()
+        if len(values) != n_rows:
+            raise ValueError(f"Não foi possível ler a coluna {self.columns[field]} de {self.fpath}")
+        return values
+
+def build_index(fpath, block_rows=BLOCK_ROWS):
+    """
+    Scans 'fpath' once (SCAN_BYTES at a time) and returns its TxtIndex
+    """
+    data = np.memmap(fpath, dtype=np.uint8, mode='r') if os.path.getsize(fpath) else np.empty(0, np.uint8)
+    header_end = int(np.argmax(data[:SCAN_BYTES] == NEWLINE)) if len(data) else 0
+    if not len(data) or data[header_end] != NEWLINE:
+        raise ValueError(f"Arquivo sem dados: {fpath}")
+    columns = bytes(data[:header_end]).decode('utf-8-sig').rstrip('\r').split('\t')
+
+    # Start of each non blank line; the offset of every block_rows-th one is kept
+    offsets = []
+    n_rows = 0
+    line_start = header_end + 1
+    for chunk_start in range(line_start, len(data), SCAN_BYTES):
+        newlines = np.flatnonzero(data[chunk_start:chunk_start + SCAN_BYTES] == NEWLINE) + chunk_start
+        if not len(newlines):
+            continue
+        starts = np.concatenate([[line_start], newlines[:-1] + 1])
+        lengths = newlines - starts
+        blank = (lengths == 0) | ((lengths == 1) & (data[np.minimum(starts, len(data) - 1)] == ord('\r')))
+        starts = starts[~blank]
+        first = (-n_rows) % block_rows
+        offsets.extend(starts[first::block_rows].tolist())
+        n_rows += len(starts)
+        line_start = int(newlines[-1]) + 1
+
+    # Last line without a newline
+    if line_start < len(data) and bytes(data[line_start:]).strip():
+        if n_rows % block_rows == 0:
+            offsets.append(line_start)
+        n_rows += 1
+        end = len(data)
+    else:
+        end = line_start
+    offsets.append(end)
+    return TxtIndex(fpath, columns, np.asarray(offsets, dtype=np.int64), n_rows, block_rows)
+
+@functools.lru_cache(maxsize=8)
+def cached_index(fpath, size, mtime_ns):
+    return build_index(fpath)
+
+def load_index(fpath):
+    """
+    TxtIndex of 'fpath', built once per process while the file size and modification time match
+    """
+    stat = os.stat(fpath)
+    return cached_index(os.path.abspath(fpath), stat.st_size, stat.st_mtime_ns)
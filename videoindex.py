@@ -0,0 +1,190 @@
+# This module builds a frame-accurate timestamp index for videos (frame -> presentation time, keyframe)
+
+import os
+import re
+import subprocess
+import warnings
+
+import cv2
+import numpy as np
+
+INDEX_SUFFIX = '.frameidx.npz'
+
+class FrameIndex:
+    """
+    Presentation timestamps (seconds, starting at 0) and keyframe flags of every frame of a video,
+    in display order. Time <-> frame conversions are binary searches, so they stay exact on
+    variable frame rate footage.
+    """
+
+    def __init__(self, pts, keyframes):
+        self.pts = np.asarray(pts, dtype=np.float64)
+        self.keyframes = np.asarray(keyframes, dtype=bool)
+        self.keyframe_numbers = np.flatnonzero(self.keyframes)
+
+    def __len__(self):
+        return len(self.pts)
+
+    @property
+    def duration(self):
+        """
+        Time of the last frame plus one average frame duration
+        """
+        if len(self.pts) < 2:
+            return 0.0
+        return self.pts[-1] + (self.pts[-1] - self.pts[0]) / (len(self.pts) - 1)
+
+    @property
+    def fps(self):
+        """
+        Average frame rate (only for display, conversions use the timestamps)
+        """
+        return len(self.pts) / self.duration if self.duration else 0.0
+
+    def time_of(self, frame):
+        """
+        Presentation time (s) of 'frame' (clipped to the video)
+        """
+        return self.pts[np.clip(frame, 0, len(self.pts) - 1)]
+
+    def frame_at(self, seconds):
+        """
+        Frame on screen at 'seconds': last frame whose timestamp is not after it
+        """
+        return np.clip(np.searchsorted(self.pts, seconds, side='right') - 1, 0, len(self.pts) - 1)
+
+    def frame_from(self, seconds):
+        """
+        First frame whose timestamp is at or after 'seconds' (len(self) if there is none), for cut points
+        """
+        return np.searchsorted(self.pts, seconds, side='left')
+
+    def keyframe_before(self, frame):
+        """
+        Last keyframe at or before 'frame'
+        """
+        i = np.searchsorted(self.keyframe_numbers, frame, side='right') - 1
+        return self.keyframe_numbers[max(i, 0)] if len(self.keyframe_numbers) else 0
+
+    def keyframe_after(self, frame):
+        """
+        First keyframe at or after 'frame' (len(self) if there is none)
+        """
+        i = np.searchsorted(self.keyframe_numbers, frame, side='left')
+        return self.keyframe_numbers[i] if i < len(self.keyframe_numbers) else len(self.pts)
+
+def ffmpeg_exe():
+    """
+    ffmpeg binary shipped with imageio-ffmpeg (moviepy dependency), or the one on PATH
+    """
+    try:
+        import imageio_ffmpeg
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except (ImportError, RuntimeError):
+        return 'ffmpeg'
+
+def probe_video(video_path):
+    """
+    Codec and pixel format of the first video stream (read from the 'ffmpeg -i' stream summary)
+
+    returns:
+
+    codec : str -> e.g. 'h264' (None if unknown);
+    pix_fmt : str -> e.g. 'yuv420p' (None if unknown)
+    """
+    result = subprocess.run([ffmpeg_exe(), '-hide_banner', '-i', video_path], capture_output=True, text=True)
+    match = re.search(r'Stream #\S+: Video: (\w+)[^,]*, (\w+)', result.stderr)
+    return (match.group(1), match.group(2)) if match else (None, None)
+
+def scan_packets(video_path):
+    """
+    Reads the timestamps and keyframe flags of the video packets with ffmpeg, without decoding.
+
+    returns:
+
+    pts : array -> presentation timestamps (s) in display order, the first one at 0;
+    keyframes : array -> True where the frame is a keyframe
+    """
+    result = subprocess.run([ffmpeg_exe(), '-hide_banner', '-loglevel', 'error', '-i', video_path,
+                             '-map', '0:v:0', '-c', 'copy', '-f', 'framecrc', '-'],
+                            capture_output=True, text=True, check=True)
+
+    time_base = None
+    pts, keyframes, discarded = [], [], []
+    for line in result.stdout.splitlines():
+        if line.startswith('#tb 0:'):
+            num, den = line.split(':', 1)[1].split('/')
+            time_base = int(num) / int(den)
+        elif line and not line.startswith('#'):
+            # stream, dts, pts, duration, size, checksum[, F=flags] (flags omitted for plain keyframes)
+            fields = [field.strip() for field in line.split(',')]
+            flags = int(fields[6][2:], 16) if len(fields) > 6 else 0x1
+            pts.append(int(fields[2]))
+            keyframes.append(bool(flags & 0x1))
+            discarded.append(bool(flags & 0x4))
+
+    if time_base is None or not pts:
+        raise ValueError(f"Nenhum frame encontrado em {video_path}")
+
+    pts = np.array(pts, dtype=np.int64)
+    keyframes = np.array(keyframes, dtype=bool)
+    # Packets come in decode order and the ones out of the edit list (before its start, or flagged
+    # as discarded after its end) are never shown
+    order = np.argsort(pts, kind='stable')
+    pts, keyframes = pts[order], keyframes[order]
+    shown = (pts >= 0) & ~np.array(discarded, dtype=bool)[order]
+    pts, keyframes = pts[shown], keyframes[shown]
+    return (pts - pts[0]) * time_base, keyframes
+
+def scan_frames(video_path):
+    """
+    Fallback of scan_packets using OpenCV (slower: every frame is grabbed). Keyframes are unknown,
+    only the first frame is flagged.
+    """
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise ValueError(f"Erro ao abrir o vídeo {video_path}")
+    pts = []
+    while cap.grab():
+        pts.append(cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0)
+    cap.release()
+
+    pts = np.array(pts, dtype=np.float64)
+    keyframes = np.zeros(len(pts), dtype=bool)
+    keyframes[:1] = True
+    return pts - (pts[0] if len(pts) else 0), keyframes
+
+def build_frame_index(video_path):
+    """
+    Scans 'video_path' once and returns its FrameIndex
+    """
+    try:
+        pts, keyframes = scan_packets(video_path)
+    except (OSError, subprocess.CalledProcessError, ValueError, IndexError):
+        pts, keyframes = scan_frames(video_path)
+    return FrameIndex(pts, keyframes)
+
+def load_frame_index(video_path, cache=True):
+    """
+    Returns the FrameIndex of 'video_path', reusing the index saved beside the video
+    ('<video>.frameidx.npz') while the video size and modification time match.
+    """
+    stat = os.stat(video_path)
+    index_path = video_path + INDEX_SUFFIX
+    if cache:
+        try:
+            with np.load(index_path) as saved:
+                if saved['size'] == stat.st_size and saved['mtime_ns'] == stat.st_mtime_ns:
+                    return FrameIndex(saved['pts'], saved['keyframes'])
+        except (OSError, KeyError, ValueError):
+            pass
+
+    index = build_frame_index(video_path)
+    if cache:
+        try:
+            with open(index_path, 'wb') as f:
+                np.savez(f, pts=index.pts, keyframes=index.keyframes,
+                         size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+        except OSError as e:
+            warnings.warn(f"Não foi possível salvar o índice de {video_path}: {e}")
+    return index